@@ -0,0 +1,61 @@
+"""
+Redraw cost of the action group editor filter (`properties.filter_actions`) before and after pattern caching.
+
+Usage:
+    blender -b --factory-startup --python benchmarks/filter_actions.py -- [--items 5000] [--redraws 50]
+"""
+
+import argparse
+import os
+import sys
+from fnmatch import fnmatch
+from time import perf_counter
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dlg_blender_addon.properties import filter_actions
+
+
+def filter_actions_legacy(filter_name, items):
+    "`filter_actions` as it was before the compiled matcher"
+    bitflag_filter_item = 1 << 30
+    flt_flags = [bitflag_filter_item] * len(items)
+
+    if filter_name:
+        for i, item in enumerate(items):
+            if not fnmatch(item.action.name, f'*{filter_name}*'):
+                flt_flags[i] &= ~bitflag_filter_item
+
+    return flt_flags
+
+
+def time_redraws(function, filter_name, items, redraws) -> float:
+    start = perf_counter()
+    for _ in range(redraws):
+        function(filter_name, items)
+    return (perf_counter() - start) / redraws
+
+
+def main(argv):
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--redraws', type=int, default=50)
+    parser.add_argument('--filter', default='walk')
+    args = parser.parse_args(argv)
+
+    moves = ('walk', 'run', 'crouch', 'prone', 'reload', 'fire', 'idle')
+    items = [SimpleNamespace(action=SimpleNamespace(name=f'{moves[i % len(moves)]}_{i:05d}')) for i in range(args.items)]
+
+    assert filter_actions(args.filter, items) == filter_actions_legacy(args.filter, items)
+
+    before = time_redraws(filter_actions_legacy, args.filter, items, args.redraws)
+    after = time_redraws(filter_actions, args.filter, items, args.redraws)
+
+    print(f'filter_actions on {args.items} items, {args.redraws} redraws')
+    print(f'  before: {before * 1000:.3f} ms per redraw')
+    print(f'  after:  {after * 1000:.3f} ms per redraw ({before / after:.1f}x)')
+
+
+if __name__ == '__main__':
+    main(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else [])
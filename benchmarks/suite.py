@@ -0,0 +1,526 @@
+"""
+Headless benchmark suite on synthetic rigs, actions and NLA tracks.
+
+Usage:
+    blender -b --factory-startup --python-exit-code 1 --python benchmarks/suite.py -- [options]
+
+Builds a source and a target armature with --bones bones (all of them in the target's RETARGET collection),
+--actions actions of --frames frames and --tracks NLA tracks of --strips strips, then times retargeting, the
+per-frame bake step with and without isolated evaluation (next to --heavy-objects deformed meshes), group push,
+marker generation, strip rename, the action list filters and the import of a PSA file of --psa-sequences
+sequences. Every case reports the median of --repeat runs in seconds. Results are printed as JSON (or written to
+--output). With --baseline, every metric is compared to a previous result file and the exit code is 1 when any
+metric got slower by more than --tolerance.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import statistics
+import sys
+import tempfile
+from time import perf_counter
+
+from collections.abc import Callable
+
+import bpy
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dlg_blender_addon.retarget import operators as retarget_ops
+from dlg_blender_addon.retarget.bake import ensure_fcurve, get_active_fcurves, get_action_fcurves, write_fcurve
+from dlg_blender_addon.retarget.cli import ensure_registered, setup_retarget
+from dlg_blender_addon.nla.markers import generate_markers
+from dlg_blender_addon.nla.operators import sync_data_action_group_items
+from dlg_blender_addon.nla.rename import apply_renames, get_owner_strips, get_strip_names, plan_renames
+from dlg_blender_addon.properties import filter_actions
+from dlg_blender_addon.psa.importer import import_psa
+from dlg_blender_addon.psa.reader import BONE, KEY, SEQUENCE, XYZW
+from dlg_blender_addon.psa.writer import PsaWriter, encode_name
+from dlg_blender_addon.cache import invalidate_actions
+from dlg_blender_addon.instrument import clear_samples, get_samples
+
+import numpy as np
+
+
+BONE_COLLECTION = 'RETARGET'
+MOVES = ('walk', 'run', 'crouch', 'prone', 'reload', 'fire', 'idle')
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(prog='blender -b --python suite.py --')
+    parser.add_argument('--bones', type=int, default=64, help='Bones per armature (default: %(default)s)')
+    parser.add_argument('--actions', type=int, default=20, help='Synthetic actions (default: %(default)s)')
+    parser.add_argument('--frames', type=int, default=120, help='Frames per action (default: %(default)s)')
+    parser.add_argument('--tracks', type=int, default=4, help='NLA tracks on the target (default: %(default)s)')
+    parser.add_argument('--strips', type=int, default=250, help='Strips per NLA track (default: %(default)s)')
+    parser.add_argument('--heavy-objects', type=int, default=8,
+                        help='Subdivided meshes deformed by the target in the isolation case (default: %(default)s)')
+    parser.add_argument('--psa-sequences', type=int, default=200,
+                        help='Sequences in the synthetic PSA file of the import case (default: %(default)s)')
+    parser.add_argument('--redraws', type=int, default=50, help='Filter calls per filter sample (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per case, the median is reported (default: %(default)s)')
+    parser.add_argument('--cases', nargs='+', choices=tuple(CASES), default=list(CASES),
+                        help='Cases to run (default: all)')
+    parser.add_argument('--engine', choices=('NATIVE', 'DIRECT', 'OPERATOR'), default='NATIVE',
+                        help='Bake engine for the retarget case (default: %(default)s)')
+    parser.add_argument('--parity', action='store_true',
+                        help='Also bake one action with both engines and report the largest difference')
+    parser.add_argument('--parity-tolerance', type=float, default=1e-4,
+                        help='Largest allowed difference between the engines (default: %(default)s)')
+    parser.add_argument('--output', help='Write the results to this JSON file instead of printing them')
+    parser.add_argument('--baseline', help='Compare against a results file from an earlier run')
+    parser.add_argument('--tolerance', type=float, default=0.15,
+                        help='Allowed slowdown against the baseline as a fraction (default: %(default)s)')
+
+    return parser.parse_args(argv)
+
+
+def median_time(function: Callable[[], None], repeat: int, setup: Callable[[], None] | None = None) -> float:
+    durations = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = perf_counter()
+        function()
+        durations.append(perf_counter() - start)
+
+    return statistics.median(durations)
+
+
+def new_action(name: str, object: bpy.types.Object) -> bpy.types.Action:
+    action = bpy.data.actions.new(name)
+    if hasattr(action, 'slots'):
+        action.slots.new(id_type='OBJECT', name=object.name)
+    return action
+
+
+def build_armature(name: str, bone_count: int) -> bpy.types.Object:
+    "Armature with a balanced binary tree of bones"
+    armature = bpy.data.armatures.new(name)
+    object = bpy.data.objects.new(name, armature)
+    bpy.context.scene.collection.objects.link(object)
+    bpy.context.view_layer.objects.active = object
+
+    bpy.ops.object.mode_set(mode='EDIT')
+    edit_bones = []
+    for i in range(bone_count):
+        edit_bone = armature.edit_bones.new(f'bone_{i:04d}')
+        parent = edit_bones[(i - 1) // 2] if i else None
+        head = parent.tail if parent else (0.0, 0.0, 0.0)
+        edit_bone.head = head
+        edit_bone.tail = (head[0] + 0.1 * ((i % 3) - 1), head[1] + 0.05, head[2] + 0.2)
+        edit_bone.parent = parent
+        edit_bones.append(edit_bone)
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    object.animation_data_create()
+    return object
+
+
+def build_scene(args) -> tuple[bpy.types.Object, bpy.types.Object, list[bpy.types.Action]]:
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    ensure_registered()
+
+    scene = bpy.context.scene
+    scene.frame_start, scene.frame_end = 0, args.frames
+
+    source = build_armature('Source', args.bones)
+    target = build_armature('Target', args.bones)
+
+    collection = target.data.collections.new(BONE_COLLECTION)
+    for bone in target.data.bones:
+        collection.assign(bone)
+
+    for pose_bone in target.pose.bones:
+        constraint = pose_bone.constraints.new('COPY_TRANSFORMS')
+        constraint.target = source
+        constraint.subtarget = pose_bone.name
+
+    # Smooth random motion, keyed every 4 frames on the source bones.
+    rng = np.random.default_rng(0)
+    frames = np.arange(0, args.frames + 1, 4, dtype=np.float64)
+    actions = []
+
+    for a in range(args.actions):
+        action = new_action(f'{MOVES[a % len(MOVES)]}_{a:04d}', source)
+        retarget_ops.set_action(source, action)
+        fcurves = get_active_fcurves(source)
+
+        for pose_bone in source.pose.bones:
+            phase, speed = rng.uniform(0, math.tau, 2)
+            angle = 0.3 * np.sin(frames * speed * 0.05 + phase)
+            axis = rng.normal(size=3)
+            axis /= np.linalg.norm(axis)
+
+            rotation = np.column_stack((np.cos(angle / 2), *(np.sin(angle / 2)[:, None] * axis).T))
+            location = 0.02 * np.sin(frames[:, None] * 0.1 + rng.uniform(0, math.tau, 3))
+
+            for path, values in (('rotation_quaternion', rotation), ('location', location)):
+                for index in range(values.shape[1]):
+                    fcurve = ensure_fcurve(fcurves, pose_bone.path_from_id(path), index, pose_bone.name)
+                    write_fcurve(fcurve, frames, values[:, index])
+
+        action.use_fake_user = True
+        actions.append(action)
+
+    # Strip layout for the NLA cases, cycling through the actions.
+    for t in range(args.tracks):
+        track = target.animation_data.nla_tracks.new()
+        track.name = f'track_{t:02d}'
+        start = 0
+        for s in range(args.strips):
+            action = actions[(t * args.strips + s) % len(actions)]
+            strip = track.strips.new(name=f'{action.name}_{t}_{s}', start=start, action=action)
+            start = math.ceil(strip.frame_end) + 1
+
+    setup_retarget(bpy.context, source.name, target.name, BONE_COLLECTION, args.engine, skip_unchanged=False)
+    bpy.context.scene.dlg_props.bulk_mode = True
+
+    return source, target, actions
+
+
+def case_retarget(args, source, target, actions) -> dict[str, float]:
+    retarget_ops.deselect_all_actions(bpy.data.actions)
+
+    def run():
+        for action in actions:
+            action.dlg_is_selected = True
+        retarget_ops.retarget_selected_actions()
+
+    duration = median_time(run, args.repeat)
+    return {'retarget_batch': duration, 'retarget_per_action': duration / len(actions)}
+
+
+def case_push(args, source, target, actions) -> dict[str, float]:
+    pg = bpy.context.scene.dlg_props
+    group = pg.anim_groups.add()
+    group.name = 'Benchmark'
+    for action in actions:
+        group.actions.add().action = action
+    pg.anim_groups_index = len(pg.anim_groups) - 1
+    pg.push_placement = 'TRACK_END'
+
+    track = target.animation_data.nla_tracks.new()
+
+    def run():
+        with bpy.context.temp_override(object=target, active_nla_track=track):
+            bpy.ops.dlg_nla.action_group_push()
+
+    def clear():
+        for strip in list(track.strips):
+            track.strips.remove(strip)
+
+    duration = median_time(run, args.repeat, setup=clear)
+    target.animation_data.nla_tracks.remove(track)
+    return {'group_push': duration}
+
+
+def get_track_strip_pairs(target):
+    return [(strip, strip.frame_start) for track in target.animation_data.nla_tracks for strip in track.strips]
+
+
+def build_heavy_objects(count: int, target: bpy.types.Object) -> list[bpy.types.Object]:
+    "Subdivided grids deformed by the target armature, so every frame change re-evaluates them"
+    size = 32
+    vertices = [(x / size, y / size, 0.0) for y in range(size) for x in range(size)]
+    faces = [(y * size + x, y * size + x + 1, (y + 1) * size + x + 1, (y + 1) * size + x)
+             for y in range(size - 1) for x in range(size - 1)]
+    bone_name = target.data.bones[0].name
+
+    objects = []
+    for i in range(count):
+        mesh = bpy.data.meshes.new(f'heavy_{i:02d}')
+        mesh.from_pydata(vertices, [], faces)
+
+        object = bpy.data.objects.new(mesh.name, mesh)
+        bpy.context.scene.collection.objects.link(object)
+        object.vertex_groups.new(name=bone_name).add(range(len(vertices)), 1.0, 'REPLACE')
+        object.modifiers.new('Armature', 'ARMATURE').object = target
+        object.modifiers.new('Subdivision', 'SUBSURF').levels = 2
+        objects.append(object)
+
+    return objects
+
+
+def case_isolation(args, source, target, actions) -> dict[str, float]:
+    "Per-frame step of a native bake with the whole scene evaluated and with evaluation isolated to the rigs"
+    pg = bpy.context.scene.dlg_props
+    settings = pg.bake_engine, pg.isolate_evaluation
+    heavy_objects = build_heavy_objects(args.heavy_objects, target)
+    results = {}
+
+    try:
+        pg.bake_engine = 'NATIVE'
+
+        for isolate, name in ((False, 'frame_step_shared'), (True, 'frame_step_isolated')):
+            pg.isolate_evaluation = isolate
+            clear_samples()
+
+            for _ in range(args.repeat):
+                with retarget_ops.RetargetSession(bpy.context) as session:
+                    session.bake_action(actions[0])
+
+            results[name] = statistics.median(sample.duration for sample in get_samples()
+                                              if sample.category == 'bake' and sample.name == 'frame step')
+    finally:
+        pg.bake_engine, pg.isolate_evaluation = settings
+        for object in heavy_objects:
+            mesh = object.data
+            bpy.data.objects.remove(object)
+            bpy.data.meshes.remove(mesh)
+
+    return results
+
+
+def case_markers(args, source, target, actions) -> dict[str, float]:
+    scene = bpy.context.scene
+    pairs = get_track_strip_pairs(target)
+    frame_ranges = [(min(frame for _, frame in pairs), max(strip.frame_end for strip, _ in pairs))]
+
+    create = median_time(lambda: generate_markers(scene, pairs, frame_ranges), args.repeat,
+                         setup=scene.timeline_markers.clear)
+    # Second run over existing markers, where everything is skipped.
+    rerun = median_time(lambda: generate_markers(scene, pairs, frame_ranges, replace=True), args.repeat)
+    scene.timeline_markers.clear()
+
+    return {'markers_create': create, 'markers_rerun': rerun}
+
+
+def case_rename(args, source, target, actions) -> dict[str, float]:
+    forward = re.compile(r'^(.*)$'), r'\1_x'
+    backward = re.compile(r'_x$'), ''
+    durations = []
+
+    for i in range(args.repeat * 2):
+        regex, replace = forward if i % 2 == 0 else backward
+        start = perf_counter()
+        plan = plan_renames([(get_strip_names(target), get_owner_strips(target))], regex, replace)
+        apply_renames(plan)
+        durations.append(perf_counter() - start)
+
+    # Every strip of an action renamed to the action name, so nearly all of them need a numbered suffix.
+    collide = re.compile(r'_\d+_\d+$'), ''
+    plan_collide = median_time(lambda: plan_renames([(get_strip_names(target), get_owner_strips(target))], *collide),
+                               args.repeat)
+
+    return {'strip_rename': statistics.median(durations), 'strip_rename_plan_collide': plan_collide}
+
+
+def case_filter(args, source, target, actions) -> dict[str, float]:
+    context = bpy.context
+    pg = context.scene.dlg_props
+    sync_data_action_group_items(context)
+    items = pg.data_action_group_items
+
+    def retarget_list():
+        for _ in range(args.redraws):
+            retarget_ops.filter_actions_by_name(bpy.data.actions)
+
+    def group_list():
+        for _ in range(args.redraws):
+            filter_actions('walk', items)
+
+    pg.filter_name = 'walk'
+    retarget = median_time(retarget_list, args.repeat) / args.redraws
+    pg.filter_name = ''
+
+    # Cold: the action cache is dropped before every call, like after an edit.
+    def group_list_cold():
+        for _ in range(args.redraws):
+            invalidate_actions()
+            filter_actions('walk', items)
+
+    return {
+        'filter_retarget_list': retarget,
+        'filter_group_list': median_time(group_list, args.repeat) / args.redraws,
+        'filter_group_list_cold': median_time(group_list_cold, args.repeat) / args.redraws,
+    }
+
+
+def write_synthetic_psa(filepath: str, armature: bpy.types.Object, sequence_count: int, frame_count: int) -> None:
+    "PSA file with smooth random keys for every bone of the armature, written sequence by sequence"
+    names = [bone.name for bone in armature.data.bones]
+    bone_indices = {name: i for i, name in enumerate(names)}
+
+    bones = np.zeros(len(names), dtype=BONE)
+    for i, bone in enumerate(armature.data.bones):
+        bones['name'][i] = encode_name(bone.name)
+        bones['parent_index'][i] = bone_indices[bone.parent.name] if bone.parent else 0
+
+    sequences = np.zeros(sequence_count, dtype=SEQUENCE)
+    for i in range(sequence_count):
+        sequences['name'][i] = encode_name(f'psa_{MOVES[i % len(MOVES)]}_{i:04d}')
+    sequences['bone_count'] = len(names)
+    sequences['fps'] = bpy.context.scene.render.fps
+    sequences['frame_count'] = frame_count
+    sequences['first_frame'] = np.arange(sequence_count) * frame_count
+
+    rng = np.random.default_rng(0)
+    time = np.arange(frame_count)[:, None, None]
+    keys = np.zeros((frame_count, len(names)), dtype=KEY)
+
+    with PsaWriter(filepath, bones, sequences) as writer:
+        for _ in range(sequence_count):
+            rotation = np.concatenate((np.ones((frame_count, len(names), 1)),
+                                       0.2 * np.sin(time * 0.1 + rng.uniform(0, math.tau, (1, len(names), 3)))), axis=-1)
+            rotation /= np.linalg.norm(rotation, axis=-1, keepdims=True)
+            keys['rotation'] = rotation[..., XYZW]
+            keys['location'] = 0.02 * np.sin(time * 0.1 + rng.uniform(0, math.tau, (1, len(names), 3)))
+            writer.write_keys(keys.ravel())
+
+
+def case_psa_import(args, source, target, actions) -> dict[str, float]:
+    "Import of a synthetic PSA file of --psa-sequences sequences onto the source armature"
+    with tempfile.TemporaryDirectory() as directory:
+        filepath = os.path.join(directory, 'synthetic.psa')
+        write_synthetic_psa(filepath, source, args.psa_sequences, args.frames + 1)
+
+        imported = []
+
+        def run():
+            imported.extend(import_psa(filepath, source, select_actions=False).actions)
+
+        def remove():
+            for action in imported:
+                bpy.data.actions.remove(action)
+            imported.clear()
+
+        duration = median_time(run, args.repeat, setup=remove)
+        remove()
+
+    return {'psa_import': duration, 'psa_import_per_sequence': duration / args.psa_sequences}
+
+
+CASES = {
+    'retarget': case_retarget,
+    'isolation': case_isolation,
+    'push': case_push,
+    'markers': case_markers,
+    'rename': case_rename,
+    'filter': case_filter,
+    'psa_import': case_psa_import,
+}
+
+
+def bake_copy(action: bpy.types.Action, engine: str) -> bpy.types.Action:
+    pg = bpy.context.scene.dlg_props
+    pg.bake_engine = engine
+    pg.reduce_curves = False
+
+    copy = action.copy()
+    copy.name = f'{action.name}_{engine.lower()}'
+    with retarget_ops.RetargetSession(bpy.context) as session:
+        session.bake_action(copy)
+
+    return copy
+
+
+def check_parity(args, source, target, actions) -> float:
+    "Largest difference between the native bake of the first action and the operator (or direct) bake, across all baked channels"
+    native = bake_copy(actions[0], 'NATIVE')
+    operator = bake_copy(actions[0], 'DIRECT' if args.engine == 'DIRECT' else 'OPERATOR')
+    bpy.context.scene.dlg_props.bake_engine = args.engine
+
+    prefixes = tuple(pose_bone.path_from_id() for pose_bone in target.pose.bones)
+    frames = range(int(actions[0].frame_range[0]), int(actions[0].frame_range[1]) + 1)
+
+    def sample(action):
+        channels = {}
+        for fcurve in get_action_fcurves(action):
+            if fcurve.data_path.startswith(prefixes):
+                values = [fcurve.evaluate(frame) for frame in frames]
+                channels.setdefault(fcurve.data_path, {})[fcurve.array_index] = values
+        return {path: np.array([by_index[i] for i in sorted(by_index)]).T for path, by_index in channels.items()}
+
+    native_channels, operator_channels = sample(native), sample(operator)
+    difference = 0.0
+
+    for path, values in native_channels.items():
+        other = operator_channels.get(path)
+        if other is None or other.shape != values.shape:
+            return math.inf
+
+        error = np.abs(values - other)
+        if path.endswith('rotation_quaternion'):
+            # q and -q are the same rotation.
+            error = np.minimum(error, np.abs(values + other))
+        difference = max(difference, float(error.max()))
+
+    return difference
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], tolerance: float) -> list[str]:
+    "Print the comparison and return the metrics that got slower than the tolerance allows"
+    regressions = []
+    print(f'{"metric":<28}{"baseline":>14}{"current":>14}{"change":>10}')
+
+    for name, value in results.items():
+        previous = baseline.get(name)
+        if previous is None or not previous:
+            print(f'{name:<28}{"-":>14}{value:>14.6f}')
+            continue
+
+        change = value / previous - 1
+        flag = ''
+        if change > tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<28}{previous:>14.6f}{value:>14.6f}{change:>+10.1%}{flag}')
+
+    return regressions
+
+
+def main(argv) -> int:
+    args = parse_args(argv)
+
+    build_start = perf_counter()
+    source, target, actions = build_scene(args)
+    build_time = perf_counter() - build_start
+
+    results: dict[str, float] = {}
+    for name in args.cases:
+        results.update(CASES[name](args, source, target, actions))
+
+    report = {
+        'blender': bpy.app.version_string,
+        'config': {key: getattr(args, key) for key in ('bones', 'actions', 'frames', 'tracks', 'strips', 'redraws',
+                                                       'heavy_objects', 'psa_sequences', 'repeat', 'engine')},
+        'build_time': build_time,
+        'results': results,
+    }
+
+    exit_code = 0
+
+    if args.parity:
+        difference = check_parity(args, source, target, actions)
+        report['parity'] = {'max_difference': difference, 'tolerance': args.parity_tolerance}
+        if not difference <= args.parity_tolerance:
+            print(f'Engine parity failed: max difference {difference} > {args.parity_tolerance}', file=sys.stderr)
+            exit_code = 1
+
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=1)
+    else:
+        print(json.dumps(report, indent=1))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+
+        if baseline.get('config') != report['config']:
+            print('Baseline was recorded with a different configuration', file=sys.stderr)
+
+        regressions = compare(results, baseline['results'], args.tolerance)
+        if regressions:
+            print(f'{len(regressions)} metrics regressed: {", ".join(regressions)}', file=sys.stderr)
+            exit_code = 1
+
+    return exit_code
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []))
@@ -1,19 +1,32 @@
-from . import utils, properties
-from .nla import (operators as nla_operators,
+from . import utils, cache, properties, journal, instrument
+from .nla import (intervals as nla_intervals,
+                  markers as nla_markers,
+                  rename as nla_rename,
+                  operators as nla_operators,
                   ui as nla_ui)
-from .retarget import (operators as retarget_operators,
+from .retarget import (bake as retarget_bake,
+                  operators as retarget_operators,
                   ui as retarget_ui)
+from .psa import operators as psa_operators
 
 
 if 'bpy' in locals():
     import importlib
 
     importlib.reload(utils)
+    importlib.reload(cache)
     importlib.reload(properties)
+    importlib.reload(journal)
+    importlib.reload(instrument)
+    importlib.reload(nla_intervals)
+    importlib.reload(nla_markers)
+    importlib.reload(nla_rename)
     importlib.reload(nla_operators)
     importlib.reload(nla_ui)
+    importlib.reload(retarget_bake)
     importlib.reload(retarget_operators)
     importlib.reload(retarget_ui)
+    importlib.reload(psa_operators)
 
 
 import bpy
@@ -21,11 +34,17 @@ from bpy.props import PointerProperty, BoolProperty
 
 
 _modules = (
+    cache,
     properties,
+    journal,
+    instrument,
+    nla_intervals,
+    nla_markers,
     nla_operators,
     nla_ui,
     retarget_operators,
     retarget_ui,
+    psa_operators,
 )
 
 
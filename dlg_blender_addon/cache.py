@@ -0,0 +1,90 @@
+import bpy
+from bpy.app.handlers import persistent
+
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import TypeVar
+
+T = TypeVar('T')
+
+
+# Results that only depend on the actions in the file (and the key they are stored under). Everything is dropped
+# whenever an action is added, removed, renamed or otherwise updated.
+_action_cache: OrderedDict[Hashable, object] = OrderedDict()
+_action_cache_size = 64
+_actions_version = 0
+
+_msgbus_owner = object()
+
+
+def get_actions_version() -> int:
+    "Counter that changes every time cached action data is invalidated"
+    return _actions_version
+
+
+def invalidate_actions(*args) -> None:
+    global _actions_version
+    _actions_version += 1
+    _action_cache.clear()
+
+
+def get_cached(key: Hashable, compute: Callable[[], T]) -> T:
+    "Return the cached value for the key, computing and storing it if needed. Least recently used entries are evicted"
+    try:
+        _action_cache.move_to_end(key)
+        return _action_cache[key]  # pyright: ignore[reportReturnType]
+    except KeyError:
+        pass
+
+    value = compute()
+    _action_cache[key] = value
+
+    if len(_action_cache) > _action_cache_size:
+        _action_cache.popitem(last=False)
+
+    return value
+
+
+def subscribe_action_renames() -> None:
+    # Renames do not always reach the depsgraph handler.
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    bpy.msgbus.subscribe_rna(key=(bpy.types.Action, 'name'),
+                             owner=_msgbus_owner,
+                             args=(),
+                             notify=invalidate_actions)
+
+
+@persistent
+def on_depsgraph_update_post(scene, depsgraph) -> None:
+    if depsgraph.id_type_updated('ACTION'):
+        invalidate_actions()
+
+
+@persistent
+def on_undo_post(*args) -> None:
+    # Undo and redo can bring back removed actions or drop new ones without a depsgraph update for them.
+    invalidate_actions()
+
+
+@persistent
+def on_load_post(*args) -> None:
+    invalidate_actions()
+    # Message bus subscriptions are cleared when a file is loaded.
+    subscribe_action_renames()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update_post)
+    bpy.app.handlers.load_post.append(on_load_post)
+    bpy.app.handlers.undo_post.append(on_undo_post)
+    bpy.app.handlers.redo_post.append(on_undo_post)
+    subscribe_action_renames()
+
+
+def unregister():
+    bpy.msgbus.clear_by_owner(_msgbus_owner)
+    bpy.app.handlers.redo_post.remove(on_undo_post)
+    bpy.app.handlers.undo_post.remove(on_undo_post)
+    bpy.app.handlers.load_post.remove(on_load_post)
+    bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update_post)
+    invalidate_actions()
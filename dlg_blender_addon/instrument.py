@@ -0,0 +1,234 @@
+import bpy
+from bpy.props import EnumProperty, StringProperty
+from bpy.types import Operator, Panel
+from bpy_extras.io_utils import ExportHelper
+
+import csv
+import json
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from time import perf_counter
+from collections.abc import Iterable, Iterator
+
+
+# Number of samples kept. Older samples are dropped first.
+RING_SIZE = 4096
+
+
+@dataclass
+class Sample:
+    category: str
+    name: str
+    duration: float
+    label: str = ''
+    time: float = 0.0
+
+
+@dataclass
+class Summary:
+    category: str
+    name: str
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+_samples: deque[Sample] = deque(maxlen=RING_SIZE)
+
+
+def record(category: str, name: str, duration: float, label: str = '') -> None:
+    _samples.append(Sample(category, name, duration, label, time.time()))
+
+
+@contextmanager
+def timed(category: str, name: str, label: str = '') -> Iterator[None]:
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        record(category, name, perf_counter() - start, label)
+
+
+def get_samples() -> list[Sample]:
+    return list(_samples)
+
+
+def clear_samples() -> None:
+    _samples.clear()
+
+
+def summarize(samples: Iterable[Sample]) -> list[Summary]:
+    "Count, total and max duration per (category, name), slowest total first"
+    summaries: dict[tuple[str, str], Summary] = {}
+
+    for sample in samples:
+        key = (sample.category, sample.name)
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = Summary(sample.category, sample.name)
+
+        summary.count += 1
+        summary.total += sample.duration
+        summary.max = max(summary.max, sample.duration)
+
+    return sorted(summaries.values(), key=lambda summary: summary.total, reverse=True)
+
+
+def write_json(filepath: str, samples: list[Sample]) -> None:
+    with open(filepath, 'w') as file:
+        json.dump({
+            'blender': bpy.app.version_string,
+            'ring_size': RING_SIZE,
+            'summary': [dict(asdict(summary), mean=summary.mean) for summary in summarize(samples)],
+            'samples': [asdict(sample) for sample in samples],
+        }, file, indent=1)
+
+
+def write_csv(filepath: str, samples: list[Sample]) -> None:
+    with open(filepath, 'w', newline='') as file:
+        writer = csv.writer(file)
+        writer.writerow(('time', 'category', 'name', 'label', 'duration'))
+        for sample in samples:
+            writer.writerow((f'{sample.time:.6f}', sample.category, sample.name, sample.label, f'{sample.duration:.9f}'))
+
+
+def _wrap_execute(cls, function):
+    def execute(self, context):
+        with timed('operator', cls.bl_idname, 'execute'):
+            return function(self, context)
+    return execute
+
+
+def _wrap_invoke(cls, function):
+    def invoke(self, context, event):
+        with timed('operator', cls.bl_idname, 'invoke'):
+            return function(self, context, event)
+    return invoke
+
+
+def _wrap_modal(cls, function):
+    def modal(self, context, event):
+        with timed('operator', cls.bl_idname, 'modal'):
+            return function(self, context, event)
+    return modal
+
+
+def _wrap_filter_items(cls, function):
+    def filter_items(self, context, data, property):
+        with timed('filter', cls.__name__):
+            return function(self, context, data, property)
+    return filter_items
+
+
+_wrappers = {
+    'execute': _wrap_execute,
+    'invoke': _wrap_invoke,
+    'modal': _wrap_modal,
+    'filter_items': _wrap_filter_items,
+}
+
+
+def instrument_classes(classes: Iterable[type]) -> None:
+    "Time the execute, invoke and modal methods of operators and filter_items of UI lists. Call before registering"
+    for cls in classes:
+        for method, wrap in _wrappers.items():
+            # Only methods the class defines itself, inherited ones are wrapped where they are defined.
+            function = cls.__dict__.get(method)
+            if function is not None and not getattr(function, '_dlg_timed', False):
+                wrapped = wrap(cls, function)
+                wrapped._dlg_timed = True
+                setattr(cls, method, wrapped)
+
+
+class DLG_OT_instrumentation_export(Operator, ExportHelper):
+    bl_idname = 'dlg.instrumentation_export'
+    bl_label = 'Export Timings'
+    bl_description = 'Write the recorded timings to a JSON or CSV file'
+    bl_options = {'INTERNAL'}
+
+    filename_ext = '.json'
+
+    filter_glob: StringProperty(default='*.json;*.csv', options={'HIDDEN'})
+
+    format: EnumProperty(
+        name='Format',
+        items=(
+            ('JSON', 'JSON', 'Summary and all samples'),
+            ('CSV', 'CSV', 'One row per sample'),
+        ),
+        default='JSON'
+    )
+
+    def check(self, context):
+        self.filename_ext = '.' + self.format.lower()
+        return super().check(context)
+
+    def execute(self, context):
+        samples = get_samples()
+        filepath = bpy.path.ensure_ext(self.filepath, '.' + self.format.lower())
+
+        if self.format == 'CSV':
+            write_csv(filepath, samples)
+        else:
+            write_json(filepath, samples)
+
+        self.report({'INFO'}, f'Wrote {len(samples)} samples to {filepath}')
+        return {'FINISHED'}
+
+
+class DLG_OT_instrumentation_clear(Operator):
+    bl_idname = 'dlg.instrumentation_clear'
+    bl_label = 'Clear Timings'
+    bl_options = {'INTERNAL'}
+
+    def execute(self, context):
+        clear_samples()
+        return {'FINISHED'}
+
+
+class DLG_PT_instrumentation(Panel):
+    bl_label = 'Timings (Debug)'
+    bl_space_type = 'NLA_EDITOR'
+    bl_region_type = 'UI'
+    bl_category = 'Tools'
+    bl_options = {'DEFAULT_CLOSED'}
+
+    rows = 16
+
+    def draw(self, context):
+        layout = self.layout
+        samples = get_samples()
+        layout.label(text=f'{len(samples)} of {RING_SIZE} samples')
+
+        col = layout.column(align=True)
+        row = col.row()
+        for heading in ('Name', 'Count', 'Mean ms', 'Max ms'):
+            row.label(text=heading)
+
+        for summary in summarize(samples)[:self.rows]:
+            row = col.row()
+            row.label(text=f'{summary.category}: {summary.name}')
+            row.label(text=str(summary.count))
+            row.label(text=f'{summary.mean * 1000:.2f}')
+            row.label(text=f'{summary.max * 1000:.2f}')
+
+        row = layout.row(align=True)
+        row.operator(DLG_OT_instrumentation_export.bl_idname, icon='EXPORT')
+        row.operator(DLG_OT_instrumentation_clear.bl_idname, text='', icon='TRASH')
+
+
+_classes = (
+    DLG_OT_instrumentation_export,
+    DLG_OT_instrumentation_clear,
+    DLG_PT_instrumentation,
+)
+
+
+from bpy.utils import register_classes_factory
+register, unregister = register_classes_factory(_classes)
@@ -0,0 +1,306 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from bpy.types import Action, Context, FCurve, FModifier, NlaStrip, NlaTrack, Operator
+
+from collections.abc import Set
+
+from .retarget.bake import ensure_fcurve, get_action_fcurve_collections, get_bone_prefix
+from .retarget.fingerprint import FINGERPRINT_PROPERTY
+
+
+# Keyframe attributes saved per key, with the number of values each.
+KEYFRAME_ATTRIBUTES = (
+    ('co', 2, np.float32),
+    ('handle_left', 2, np.float32),
+    ('handle_right', 2, np.float32),
+    ('interpolation', 1, np.int32),
+    ('handle_left_type', 1, np.int32),
+    ('handle_right_type', 1, np.int32),
+    ('type', 1, np.int32),
+    ('easing', 1, np.int32),
+    ('back', 1, np.float32),
+    ('amplitude', 1, np.float32),
+    ('period', 1, np.float32),
+    ('select_control_point', 1, bool),
+    ('select_left_handle', 1, bool),
+    ('select_right_handle', 1, bool),
+)
+
+# F-Curve settings saved with the keys, so curves the change removed come back as they were.
+FCURVE_ATTRIBUTES = ('extrapolation', 'color_mode', 'color', 'auto_smoothing', 'select', 'lock', 'mute', 'hide')
+
+
+def read_keyframes(fcurve: FCurve) -> dict[str, np.ndarray]:
+    keyframe_points = fcurve.keyframe_points
+    keys = {}
+
+    for attribute, size, dtype in KEYFRAME_ATTRIBUTES:
+        keys[attribute] = np.empty(len(keyframe_points) * size, dtype=dtype)
+        keyframe_points.foreach_get(attribute, keys[attribute])
+
+    return keys
+
+
+def write_keyframes(fcurve: FCurve, keys: dict[str, np.ndarray]) -> None:
+    keyframe_points = fcurve.keyframe_points
+    keyframe_points.clear()
+    keyframe_points.add(len(keys['interpolation']))
+
+    for attribute, _, _ in KEYFRAME_ATTRIBUTES:
+        keyframe_points.foreach_set(attribute, keys[attribute])
+
+    fcurve.update()
+
+
+def read_modifier(modifier: FModifier) -> tuple[str, dict]:
+    "Type and settings of an F-Curve modifier. Collections, like envelope control points, are not included"
+    settings = {}
+    for prop in modifier.bl_rna.properties:
+        if prop.is_readonly or prop.type in {'POINTER', 'COLLECTION'}:
+            continue
+
+        value = getattr(modifier, prop.identifier)
+        settings[prop.identifier] = value[:] if getattr(prop, 'is_array', False) else value
+
+    return modifier.type, settings
+
+
+class CurveSnapshot:
+    "Keys of an F-Curve, plus its group, settings and modifiers to recreate it if it gets removed"
+
+    def __init__(self, fcurve: FCurve):
+        self.group_name = fcurve.group.name if fcurve.group is not None else ''
+        self.settings = {attribute: getattr(fcurve, attribute) for attribute in FCURVE_ATTRIBUTES}
+        self.settings['color'] = tuple(self.settings['color'])
+        self.modifiers = [read_modifier(modifier) for modifier in fcurve.modifiers]
+        self.keys = read_keyframes(fcurve)
+
+    def restore(self, fcurve: FCurve) -> None:
+        for attribute, value in self.settings.items():
+            setattr(fcurve, attribute, value)
+
+        write_keyframes(fcurve, self.keys)
+
+    def recreate(self, fcurves, data_path: str, index: int) -> FCurve:
+        fcurve = ensure_fcurve(fcurves, data_path, index, self.group_name)
+
+        for type, settings in self.modifiers:
+            modifier = fcurve.modifiers.new(type)
+            for attribute, value in settings.items():
+                setattr(modifier, attribute, value)
+
+        self.restore(fcurve)
+        return fcurve
+
+
+class ActionSnapshot:
+    "Curves of some bones in an action, keys as plain arrays instead of a copy of the whole action"
+
+    def __init__(self, action: Action, bone_prefixes: Set[str]):
+        self.bone_prefixes = bone_prefixes
+        self.fingerprint = action.get(FINGERPRINT_PROPERTY)
+        # Keyed by F-Curve collection too, since every slot can animate the same path.
+        self.curves = {(i, fcurve.data_path, fcurve.array_index): CurveSnapshot(fcurve)
+                       for i, fcurves in enumerate(get_action_fcurve_collections(action))
+                       for fcurve in fcurves
+                       if get_bone_prefix(fcurve.data_path) in bone_prefixes}
+
+    def restore(self, action: Action) -> None:
+        restored = set()
+
+        for i, fcurves in enumerate(get_action_fcurve_collections(action)):
+            for fcurve in list(fcurves):
+                if get_bone_prefix(fcurve.data_path) not in self.bone_prefixes:
+                    continue
+
+                key = (i, fcurve.data_path, fcurve.array_index)
+                curve = self.curves.get(key)
+                if curve is None:
+                    # Created by the change.
+                    fcurves.remove(fcurve)
+                else:
+                    curve.restore(fcurve)
+                    restored.add(key)
+
+        # Removed by the change.
+        collections = get_action_fcurve_collections(action)
+        for key, curve in self.curves.items():
+            i, data_path, index = key
+            if key not in restored and i < len(collections):
+                curve.recreate(collections[i], data_path, index)
+
+        if self.fingerprint is None:
+            action.pop(FINGERPRINT_PROPERTY, None)
+        else:
+            action[FINGERPRINT_PROPERTY] = self.fingerprint
+
+
+class BulkJournal:
+    "What bulk operations created or changed since the journal was last cleared, enough to revert all of it at once"
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        self.labels: list[str] = []
+        # (object name, track name, strip name) of created strips, in creation order.
+        self.created_strips: list[tuple[str, str, str]] = []
+        # Every changed action as it was before its first change, by action name.
+        self.action_snapshots: dict[str, ActionSnapshot] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.labels)
+
+    def __str__(self) -> str:
+        return (f'{len(self.labels)} operations: {len(self.created_strips)} strips, '
+                f'{len(self.action_snapshots)} actions')
+
+    def begin(self, label: str) -> None:
+        self.labels.append(label)
+
+    def record_strip(self, track: NlaTrack, strip: NlaStrip) -> None:
+        self.created_strips.append((track.id_data.name, track.name, strip.name))
+
+    def backup_action(self, action: Action, bone_prefixes: Set[str]) -> None:
+        "Save the curves of the bones about to be changed, unless an earlier operation of the batch already did"
+        if action.name not in self.action_snapshots:
+            self.action_snapshots[action.name] = ActionSnapshot(action, bone_prefixes)
+
+    def revert(self) -> list[str]:
+        "Undo everything in the journal, newest first. Returns the names of changed actions that no longer exist"
+        for object_name, track_name, strip_name in reversed(self.created_strips):
+            track = get_track(object_name, track_name)
+            strip = track.strips.get(strip_name) if track is not None else None
+            if strip is not None:
+                track.strips.remove(strip)
+
+        missing = []
+        for name, snapshot in self.action_snapshots.items():
+            action = bpy.data.actions.get(name)
+            if action is None:
+                missing.append(name)
+            else:
+                snapshot.restore(action)
+
+        self.reset()
+        return missing
+
+
+def get_track(object_name: str, track_name: str) -> NlaTrack | None:
+    object = bpy.data.objects.get(object_name)
+    if object is None or object.animation_data is None:
+        return None
+
+    return object.animation_data.nla_tracks.get(track_name)
+
+
+_journal = BulkJournal()
+
+
+def get_journal() -> BulkJournal:
+    return _journal
+
+
+def begin_operation(context: Context, label: str) -> BulkJournal | None:
+    "Journal to record into when bulk mode is on. Otherwise None, and the operator pushes its own undo step"
+    if not context.scene.dlg_props.bulk_mode:
+        return None
+
+    _journal.begin(label)
+    return _journal
+
+
+def end_operation(journal: BulkJournal | None, label: str) -> None:
+    # Without bulk mode the operators are still undoable, they just push the step themselves.
+    if journal is None:
+        bpy.ops.ed.undo_push(message=label)
+
+
+class DLG_OT_bulk_revert(Operator):
+    bl_idname = 'dlg.bulk_revert'
+    bl_label = 'Revert Bulk Changes'
+    bl_description = 'Revert everything done in bulk mode since the journal was last cleared'
+    bl_options = {'INTERNAL', 'UNDO'}
+
+    @classmethod
+    def poll(cls, context):
+        if not _journal:
+            cls.poll_message_set('Nothing to revert')
+            return False
+
+        return True
+
+    def execute(self, context):
+        summary = str(_journal)
+        missing = _journal.revert()
+
+        if missing:
+            self.report({'WARNING'}, f'Reverted {summary}, except {len(missing)} removed actions: '
+                                     f'{", ".join(missing[:5])}{", ..." if len(missing) > 5 else ""}')
+        else:
+            self.report({'INFO'}, f'Reverted {summary}')
+        return {'FINISHED'}
+
+
+class DLG_OT_bulk_clear(Operator):
+    bl_idname = 'dlg.bulk_clear'
+    bl_label = 'Keep Bulk Changes'
+    bl_description = 'Keep everything done in bulk mode and drop the revert journal'
+    bl_options = {'INTERNAL'}
+
+    @classmethod
+    def poll(cls, context):
+        return bool(_journal)
+
+    def execute(self, context):
+        _journal.reset()
+        return {'FINISHED'}
+
+
+def draw_bulk_controls(layout, context: Context) -> None:
+    col = layout.column(align=True)
+    col.prop(context.scene.dlg_props, 'bulk_mode')
+
+    if _journal:
+        col.label(text=str(_journal), icon='INFO')
+        row = col.row(align=True)
+        row.operator(DLG_OT_bulk_revert.bl_idname, icon='LOOP_BACK')
+        row.operator(DLG_OT_bulk_clear.bl_idname, icon='CHECKMARK')
+
+
+@persistent
+def on_load_post(*args) -> None:
+    # The journal belonged to the previous file.
+    _journal.reset()
+
+
+@persistent
+def on_undo_post(*args) -> None:
+    # Undo and redo swap the data the journal recorded, reverting it afterwards would mix up both states.
+    _journal.reset()
+
+
+_classes = (
+    DLG_OT_bulk_revert,
+    DLG_OT_bulk_clear,
+)
+
+
+from bpy.utils import register_classes_factory
+_register_classes, _unregister_classes = register_classes_factory(_classes)
+
+
+def register():
+    _register_classes()
+    bpy.app.handlers.load_post.append(on_load_post)
+    bpy.app.handlers.undo_post.append(on_undo_post)
+    bpy.app.handlers.redo_post.append(on_undo_post)
+
+
+def unregister():
+    bpy.app.handlers.redo_post.remove(on_undo_post)
+    bpy.app.handlers.undo_post.remove(on_undo_post)
+    bpy.app.handlers.load_post.remove(on_load_post)
+    _unregister_classes()
+    _journal.reset()
@@ -0,0 +1,166 @@
+import bpy
+import numpy as np
+from bpy.app.handlers import persistent
+from bpy.types import NlaTrack, NlaStrip
+
+from math import ceil
+from collections.abc import Iterator
+
+
+class MaxTree:
+    "Segment tree over an array that finds the first index from a position whose value reaches a threshold"
+
+    def __init__(self, values: np.ndarray):
+        self.size = 1
+        while self.size < len(values):
+            self.size *= 2
+
+        self.tree = np.full(2 * self.size, -np.inf)
+        self.tree[self.size:self.size + len(values)] = values
+
+        # Build one level at a time, bottom up.
+        level_start = self.size
+        while level_start > 1:
+            parents = slice(level_start // 2, level_start)
+            children = self.tree[level_start:2 * level_start]
+            self.tree[parents] = np.maximum(children[0::2], children[1::2])
+            level_start //= 2
+
+    def find_first(self, start: int, threshold: float) -> int:
+        "First index >= start with a value >= threshold, or -1"
+        tree = self.tree
+
+        def descend(node: int, low: int, high: int) -> int:
+            if high <= start or tree[node] < threshold:
+                return -1
+            if high - low == 1:
+                return low
+
+            middle = (low + high) // 2
+            index = descend(2 * node, low, middle)
+            return index if index != -1 else descend(2 * node + 1, middle, high)
+
+        return descend(1, 0, self.size)
+
+
+class TrackIntervals:
+    "Sorted frame ranges of the strips on one NLA track, for logarithmic overlap and gap queries"
+
+    def __init__(self, track: NlaTrack):
+        strips = track.strips
+        count = len(strips)
+
+        starts = np.empty(count, dtype=np.float32)
+        ends = np.empty(count, dtype=np.float32)
+        strips.foreach_get('frame_start', starts)
+        strips.foreach_get('frame_end', ends)
+
+        # Strips on a track never overlap, so sorting by start also sorts the ends.
+        self.order = np.argsort(starts, kind='stable')
+        self.starts = starts[self.order].astype(np.float64)
+        self.ends = ends[self.order].astype(np.float64)
+
+        self._gap_trees: dict[int, MaxTree] = {}
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    @property
+    def start(self) -> float | None:
+        return float(self.starts[0]) if len(self) else None
+
+    @property
+    def end(self) -> float | None:
+        "Frame where the last strip ends, or None for an empty track"
+        return float(self.ends[-1]) if len(self) else None
+
+    def iter_strips(self, track: NlaTrack) -> Iterator[tuple[NlaStrip, float]]:
+        "Strips of the indexed track with their start frames, in time order"
+        strips = track.strips
+        for index, start in zip(self.order.tolist(), self.starts.tolist()):
+            yield strips[index], start
+
+    def overlapping(self, start: float, end: float) -> np.ndarray:
+        "Indices into `track.strips` of strips overlapping [start, end]. Touching strips do not overlap"
+        first = np.searchsorted(self.ends, start, side='right')
+        last = np.searchsorted(self.starts, end, side='left')
+        return self.order[first:max(first, last)]
+
+    def overlaps(self, start: float, end: float) -> bool:
+        return len(self.overlapping(start, end)) > 0
+
+    def get_gap_tree(self, margin: int) -> MaxTree:
+        # Usable room between neighbouring strips when keeping `margin` frames away from both.
+        try:
+            return self._gap_trees[margin]
+        except KeyError:
+            widths = self.starts[1:] - np.ceil(self.ends[:-1]) - 2 * margin
+            tree = self._gap_trees[margin] = MaxTree(widths)
+            return tree
+
+    def first_gap(self, length: float, after: float, margin: int = 0) -> int:
+        "First whole frame at or after `after` where `length` frames fit, `margin` frames away from any strip"
+        start = ceil(after)
+
+        # First strip that is not already `margin` frames behind the start.
+        first = int(np.searchsorted(self.ends, start - margin, side='right'))
+
+        if first == len(self) or start + length + margin <= self.starts[first]:
+            return start
+
+        index = self.get_gap_tree(margin).find_first(first, length) if len(self) > 1 else -1
+
+        if index == -1 or index >= len(self) - 1:
+            return ceil(self.ends[-1]) + margin
+
+        return max(start, ceil(self.ends[index]) + margin)
+
+
+# Interval indices by (object session UID, track name). Dropped when the object is updated.
+_track_intervals: dict[tuple[int, str], TrackIntervals] = {}
+
+
+def get_track_intervals(track: NlaTrack) -> TrackIntervals:
+    "Interval index of the track, built on first use and reused until the track's strips change"
+    key = (track.id_data.session_uid, track.name)
+    intervals = _track_intervals.get(key)
+
+    if intervals is None or len(intervals) != len(track.strips):
+        intervals = _track_intervals[key] = TrackIntervals(track)
+
+    return intervals
+
+
+def invalidate_track_intervals(track: NlaTrack | None = None) -> None:
+    if track is None:
+        _track_intervals.clear()
+    else:
+        _track_intervals.pop((track.id_data.session_uid, track.name), None)
+
+
+@persistent
+def on_depsgraph_update_post(scene, depsgraph) -> None:
+    if not _track_intervals:
+        return
+
+    for update in depsgraph.updates:
+        id = update.id.original
+        if isinstance(id, bpy.types.Object):
+            for key in [key for key in _track_intervals if key[0] == id.session_uid]:
+                del _track_intervals[key]
+
+
+@persistent
+def on_load_post(*args) -> None:
+    invalidate_track_intervals()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update_post)
+    bpy.app.handlers.load_post.append(on_load_post)
+
+
+def unregister():
+    bpy.app.handlers.load_post.remove(on_load_post)
+    bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update_post)
+    invalidate_track_intervals()
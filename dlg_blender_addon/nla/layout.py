@@ -0,0 +1,56 @@
+from math import ceil
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .intervals import TrackIntervals
+
+
+class LayoutError(Exception):
+    pass
+
+
+PLACEMENT_ITEMS = (
+    ('CURRENT_FRAME', 'Current Frame', 'Start the strips at the current frame. Fails if they would overlap existing strips'),
+    ('TRACK_END', 'End of Track', 'Start the strips after the last strip on the track'),
+    ('FIRST_GAP', 'First Free Gap', 'Start the strips in the first gap at or after the current frame that fits all of them'),
+)
+
+
+def get_block_offsets(durations: Sequence[float], gap_frames: int) -> tuple[list[int], float]:
+    "Start offsets of strips laid out one after another, and the length of the whole block"
+    offsets = []
+    offset = 0.0
+
+    for duration in durations:
+        offsets.append(ceil(offset))
+        offset = ceil(offset) + duration + gap_frames
+
+    length = offset - gap_frames if durations else 0.0
+    return offsets, length
+
+
+def plan_strip_starts(durations: Sequence[float],
+                      intervals: 'TrackIntervals',
+                      current_frame: int,
+                      gap_frames: int,
+                      placement: str) -> list[int]:
+    "Start frame of every pushed strip, planned before anything is created"
+    offsets, length = get_block_offsets(durations, gap_frames)
+
+    if placement == 'CURRENT_FRAME':
+        start = current_frame
+    elif placement == 'TRACK_END':
+        start = current_frame if intervals.end is None else ceil(intervals.end) + gap_frames
+    elif placement == 'FIRST_GAP':
+        start = intervals.first_gap(length, current_frame, gap_frames)
+    else:
+        raise LayoutError(f'Unknown placement {placement}')
+
+    starts = [start + offset for offset in offsets]
+
+    for strip_start, duration in zip(starts, durations):
+        if intervals.overlaps(strip_start, strip_start + duration):
+            raise LayoutError(f'Strips would overlap existing strips at frame {strip_start}')
+
+    return starts
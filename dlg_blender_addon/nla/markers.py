@@ -0,0 +1,330 @@
+import bpy
+from bpy.app.handlers import persistent
+from bpy.types import NlaStrip, NlaTrack, Object, Scene, TimelineMarker
+
+from bisect import bisect_right
+from time import perf_counter
+from uuid import uuid4
+from dataclasses import dataclass
+from collections.abc import Iterable
+
+
+# Scene ID property linking generated markers to their strips: {object id: {'object': name, 'tracks': {track: 1},
+# 'strips': {strip: {'marker': name, 'frame': frame}}}}. Strip names are unique per object.
+LINKS_PROPERTY = 'dlg_marker_links'
+
+# Object ID property with the id its links are stored under, so renaming the object keeps them.
+LINK_ID_PROPERTY = 'dlg_marker_link_id'
+
+# Seconds without object updates before linked markers are synced, so dragging strips stays responsive.
+SYNC_DELAY = 0.25
+
+
+MARKER_MODE_ITEMS = (
+    ('ADD', 'Add Missing', 'Only add markers that do not exist yet (same name on the same frame)'),
+    ('REPLACE', 'Replace', 'Also remove other markers in the frame range covered by the strips'),
+)
+
+
+@dataclass
+class MarkerStats:
+    created: int = 0
+    updated: int = 0
+    skipped: int = 0
+    removed: int = 0
+
+    def __str__(self) -> str:
+        updated = f', updated {self.updated}' if self.updated else ''
+        return f'Created {self.created} markers{updated}, skipped {self.skipped} existing, removed {self.removed}'
+
+
+def get_marker_name(scene: Scene, strip: NlaStrip) -> str:
+    props = scene.dlg_props
+    name = strip.action.name if props.use_action_names_for_markers else strip.name
+
+    return name.replace(props.marker_name_replace, props.marker_name_replace_with)
+
+
+def index_markers(scene: Scene) -> dict[tuple[str, int], list[TimelineMarker]]:
+    "Existing timeline markers by (name, frame)"
+    index: dict[tuple[str, int], list[TimelineMarker]] = {}
+
+    for marker in scene.timeline_markers:
+        index.setdefault((marker.name, marker.frame), []).append(marker)
+
+    return index
+
+
+def merge_frame_ranges(frame_ranges: Iterable[tuple[float, float]]) -> tuple[list[float], list[float]]:
+    "Starts and ends of the sorted, non-overlapping ranges that cover the given (start, end) ranges"
+    starts: list[float] = []
+    ends: list[float] = []
+
+    for start, end in sorted(frame_ranges):
+        if ends and start <= ends[-1]:
+            ends[-1] = max(ends[-1], end)
+        else:
+            starts.append(start)
+            ends.append(end)
+
+    return starts, ends
+
+
+def generate_markers(scene: Scene,
+                     strips: Iterable[tuple[NlaStrip, float]],
+                     frame_ranges: Iterable[tuple[float, float]] = (),
+                     replace: bool = False) -> MarkerStats:
+    "Add missing markers for (strip, start frame) pairs. With `replace`, other markers in `frame_ranges` are removed"
+    stats = MarkerStats()
+    timeline_markers = scene.timeline_markers
+    existing = index_markers(scene)
+
+    wanted: dict[tuple[str, int], None] = {}
+    for strip, frame_start in strips:
+        wanted[(get_marker_name(scene, strip), int(frame_start))] = None
+
+    if replace:
+        starts, ends = merge_frame_ranges(frame_ranges)
+
+        for key, markers in list(existing.items()):
+            i = bisect_right(starts, key[1]) - 1
+            if i < 0 or key[1] > ends[i]:
+                continue
+
+            # Stale markers go, and so do duplicates left behind by earlier runs.
+            stale = markers if key not in wanted else markers[1:]
+            for marker in stale:
+                timeline_markers.remove(marker)
+                stats.removed += 1
+
+            if key in wanted:
+                existing[key] = markers[:1]
+            else:
+                del existing[key]
+
+    for key in wanted:
+        if key in existing:
+            stats.skipped += 1
+            continue
+
+        name, frame = key
+        existing[key] = [timeline_markers.new(name, frame=frame)]
+        stats.created += 1
+
+    return stats
+
+
+def link_markers(scene: Scene,
+                 strips: Iterable[tuple[NlaStrip, float]],
+                 tracks: Iterable[NlaTrack] = ()) -> None:
+    "Remember which marker belongs to which strip. Strips added later to linked tracks get markers as well"
+    links = scene.get(LINKS_PROPERTY)
+    if links is None:
+        scene[LINKS_PROPERTY] = {}
+        links = scene[LINKS_PROPERTY]
+
+    def get_entry(object: Object):
+        link_id = object.get(LINK_ID_PROPERTY, '')
+        if not link_id:
+            link_id = object[LINK_ID_PROPERTY] = uuid4().hex
+        if link_id not in links:
+            links[link_id] = {'object': object.name, 'tracks': {}, 'strips': {}}
+        return links[link_id]
+
+    for track in tracks:
+        get_entry(track.id_data)['tracks'][track.name] = 1
+
+    for strip, frame_start in strips:
+        get_entry(strip.id_data)['strips'][strip.name] = {'marker': get_marker_name(scene, strip),
+                                                          'frame': int(frame_start)}
+
+
+def unlink_markers(scene: Scene) -> None:
+    if LINKS_PROPERTY in scene:
+        del scene[LINKS_PROPERTY]
+
+
+def find_linked_objects(links) -> dict[str, Object]:
+    "Objects with linked markers by link id. Copies share the id, the one named as when linked wins"
+    objects: dict[str, Object] = {}
+
+    for object in bpy.data.objects:
+        link_id = object.get(LINK_ID_PROPERTY, '')
+        if link_id not in links:
+            continue
+        if link_id not in objects or object.name == links[link_id]['object']:
+            objects[link_id] = object
+
+    for link_id, object in objects.items():
+        if links[link_id]['object'] != object.name:
+            links[link_id]['object'] = object.name
+
+    return objects
+
+
+def get_linked_strips(object: Object, entry) -> dict[str, NlaStrip]:
+    "Strips of the object that should have a linked marker, by name"
+    strips = {}
+    ad = object.animation_data
+    if ad is None:
+        return strips
+
+    tracks = entry['tracks']
+    strip_links = entry['strips']
+
+    for track in ad.nla_tracks:
+        if track.name in tracks:
+            strips.update((strip.name, strip) for strip in track.strips)
+        else:
+            strips.update((strip.name, strip) for strip in track.strips if strip.name in strip_links)
+
+    return strips
+
+
+def sync_object_markers(scene: Scene, object: Object, markers: dict | None = None) -> MarkerStats:
+    "Update, add or remove the linked markers of the object's strips. Markers of unchanged strips are left alone"
+    stats = MarkerStats()
+    links = scene.get(LINKS_PROPERTY)
+    link_id = object.get(LINK_ID_PROPERTY, '')
+    if links is None or link_id not in links:
+        return stats
+
+    entry = links[link_id]
+    strip_links = entry['strips']
+    strips = get_linked_strips(object, entry)
+    timeline_markers = scene.timeline_markers
+
+    if markers is None:
+        markers = index_markers(scene)
+
+    def pop_marker(key: tuple[str, int]) -> TimelineMarker | None:
+        found = markers.get(key)
+        return found.pop() if found else None
+
+    for name in [name for name in strip_links.keys() if name not in strips]:
+        link = strip_links[name]
+        marker = pop_marker((link['marker'], link['frame']))
+        if marker is not None:
+            timeline_markers.remove(marker)
+            stats.removed += 1
+        del strip_links[name]
+
+    for name, strip in strips.items():
+        wanted = (get_marker_name(scene, strip), int(strip.frame_start))
+        link = strip_links.get(name)
+        old = (link['marker'], link['frame']) if link is not None else None
+
+        if old == wanted:
+            stats.skipped += 1
+            continue
+
+        marker = pop_marker(old) if old is not None else None
+        if marker is None:
+            marker = timeline_markers.new(wanted[0], frame=wanted[1])
+            stats.created += 1
+        else:
+            marker.name, marker.frame = wanted
+            stats.updated += 1
+
+        markers.setdefault(wanted, []).append(marker)
+        strip_links[name] = {'marker': wanted[0], 'frame': wanted[1]}
+
+    return stats
+
+
+def sync_scene_markers(scene: Scene) -> MarkerStats:
+    "Sync the linked markers of every object in the scene's links"
+    stats = MarkerStats()
+    links = scene.get(LINKS_PROPERTY)
+    if links is None:
+        return stats
+
+    markers = index_markers(scene)
+
+    for object in find_linked_objects(links).values():
+        object_stats = sync_object_markers(scene, object, markers)
+        stats.created += object_stats.created
+        stats.updated += object_stats.updated
+        stats.skipped += object_stats.skipped
+        stats.removed += object_stats.removed
+
+    return stats
+
+
+def on_live_sync_update(props, context) -> None:
+    # Catch up on everything that changed while live sync was off.
+    if props.marker_live_sync:
+        sync_scene_markers(context.scene)
+
+
+# Link ids of objects that changed since the last sync, by scene session uid.
+_dirty_objects: dict[int, set[str]] = {}
+_last_update = 0.0
+
+
+def sync_dirty_markers() -> float | None:
+    "Timer callback. Waits until objects stop changing, then syncs the markers of everything that changed"
+    remaining = SYNC_DELAY - (perf_counter() - _last_update)
+    if remaining > 0:
+        return remaining
+
+    dirty = _dirty_objects.copy()
+    _dirty_objects.clear()
+
+    for scene in bpy.data.scenes:
+        link_ids = dirty.get(scene.session_uid)
+        links = scene.get(LINKS_PROPERTY)
+        if not link_ids or links is None:
+            continue
+
+        markers = index_markers(scene)
+        for link_id, object in find_linked_objects(links).items():
+            if link_id in link_ids:
+                sync_object_markers(scene, object, markers)
+
+    return None
+
+
+@persistent
+def on_depsgraph_update_post(scene, depsgraph) -> None:
+    global _last_update
+
+    links = scene.get(LINKS_PROPERTY)
+    if not links or not scene.dlg_props.marker_live_sync:
+        return
+
+    dirty = None
+    for update in depsgraph.updates:
+        id = update.id.original
+        if not isinstance(id, Object):
+            continue
+
+        link_id = id.get(LINK_ID_PROPERTY, '')
+        if link_id in links:
+            if dirty is None:
+                dirty = _dirty_objects.setdefault(scene.session_uid, set())
+            dirty.add(link_id)
+
+    if dirty is not None:
+        _last_update = perf_counter()
+        if not bpy.app.timers.is_registered(sync_dirty_markers):
+            bpy.app.timers.register(sync_dirty_markers, first_interval=SYNC_DELAY)
+
+
+@persistent
+def on_load_post(*args) -> None:
+    _dirty_objects.clear()
+
+
+def register():
+    bpy.app.handlers.depsgraph_update_post.append(on_depsgraph_update_post)
+    bpy.app.handlers.load_post.append(on_load_post)
+
+
+def unregister():
+    if bpy.app.timers.is_registered(sync_dirty_markers):
+        bpy.app.timers.unregister(sync_dirty_markers)
+
+    bpy.app.handlers.load_post.remove(on_load_post)
+    bpy.app.handlers.depsgraph_update_post.remove(on_depsgraph_update_post)
+    _dirty_objects.clear()
@@ -1,28 +1,57 @@
 import bpy
-from bpy.types import Operator, NlaStrip
+from bpy.types import Operator, Context
 from bpy.props import EnumProperty, StringProperty, BoolProperty
 
 from ..properties import get_scene_properties
+from ..cache import get_actions_version
+from .layout import LayoutError, plan_strip_starts
+from .intervals import get_track_intervals, invalidate_track_intervals
+from .markers import generate_markers, link_markers, unlink_markers
+from ..journal import begin_operation, end_operation
+from ..instrument import instrument_classes
+from .rename import RENAME_SCOPE_ITEMS, RenamePlan, apply_renames, get_rename_groups, plan_renames
 
-from collections.abc import Iterable
 from re import (
     compile as regex_comp,
     error as regex_err
 )
 
 
-def get_marker_name(strip: NlaStrip) -> str:
-    props = bpy.context.scene.dlg_props
-    name = strip.action.name if props.use_action_names_for_markers else strip.name
+# (scene, actions version, item count) of the last action item sync, to skip it when nothing changed.
+_action_items_sync_state: tuple[int, int, int] | None = None
 
-    return name.replace(props.marker_name_replace, props.marker_name_replace_with)
 
+def sync_data_action_group_items(context: Context) -> None:
+    "Make the editor's action items mirror `bpy.data.actions`, adding and removing only the items that changed"
+    global _action_items_sync_state
 
-def generate_markers(strips: Iterable[NlaStrip]) -> None:
-    timeline_markers = bpy.context.scene.timeline_markers
+    scene = context.scene
+    pg = get_scene_properties(context)
+    items = pg.data_action_group_items
+    actions = bpy.data.actions
 
-    for strip in strips:
-        timeline_markers.new(get_marker_name(strip), frame=int(strip.frame_start))
+    sync_state = (scene.session_uid, get_actions_version(), len(actions))
+    if _action_items_sync_state == sync_state and len(items) == len(actions):
+        return
+
+    # Drop items of deleted actions (and duplicates), keeping the rest with their selection.
+    present: set[int] = set()
+    for i in reversed(range(len(items))):
+        action = items[i].action
+        if action is None or action.session_uid in present:
+            items.remove(i)
+        else:
+            present.add(action.session_uid)
+
+    for i, action in enumerate(actions):
+        if action.session_uid in present:
+            continue
+
+        item = items.add()
+        item.action = action
+        items.move(len(items) - 1, min(i, len(items) - 1))
+
+    _action_items_sync_state = (scene.session_uid, get_actions_version(), len(actions))
 
 
 class DLG_OT_action_group_add(Operator):
@@ -67,7 +96,8 @@ class DLG_OT_action_group_push(Operator):
     bl_idname = 'dlg_nla.action_group_push'
     bl_label = 'Add Actions to Selected Track'
     bl_description = 'Add actions in the active group to the selected NLA track'
-    bl_options = {'INTERNAL', 'UNDO'}
+    # Undo steps are pushed by the operator itself, so bulk mode can skip them.
+    bl_options = {'INTERNAL'}
 
     @classmethod
     def poll(cls, context):
@@ -105,36 +135,53 @@ class DLG_OT_action_group_push(Operator):
             return {'CANCELLED'}
 
         action_group = props.get_selected_anim_group()
+        actions = [action_item.action for action_item in action_group.actions if action_item.action is not None]
+
+        if not actions:
+            self.report({'INFO'}, f'No NLA strips were added')
+            return {'CANCELLED'}
 
         # Get the selected NLA track.
         track = context.active_nla_track
-        next_strip_frame: int = getattr(context.scene, 'frame_current')
 
-        push_count = 0
+        durations = []
+        for action in actions:
+            action_frame_start, action_frame_end = action.frame_range
+            durations.append(action_frame_end - action_frame_start)
 
         try:
-            for action_item in action_group.actions:
-                action = action_item.action
-
-                # TODO: Push to the end of the track
-                track.strips.new(
-                    name=action.name,
-                    start=int(next_strip_frame),
-                    action=action)
+            starts = plan_strip_starts(durations, get_track_intervals(track),
+                                       current_frame=scene.frame_current,
+                                       gap_frames=action_group.gap_frames,
+                                       placement=props.push_placement)
+        except LayoutError as e:
+            self.report({'ERROR'}, str(e))
+            return {'CANCELLED'}
 
-                push_count += 1
+        created = []
 
-                action_frame_start, action_frame_end = action.frame_range
-                next_strip_frame += action_frame_end - action_frame_start + action_group.gap_frames
+        try:
+            for action, start in zip(actions, starts):
+                created.append(track.strips.new(name=action.name, start=start, action=action))
 
         except BaseException as e:
-            self.report({'ERROR'}, str(e))
+            # Never leave a half-pushed group behind.
+            for strip in reversed(created):
+                track.strips.remove(strip)
 
-        if push_count < 0:
-            self.report({'INFO'}, f'No NLA strips were added')
+            self.report({'ERROR'}, str(e))
             return {'CANCELLED'}
 
-        self.report({'INFO'}, f'Added {push_count} NLA strips')
+        finally:
+            invalidate_track_intervals(track)
+
+        journal = begin_operation(context, self.bl_label)
+        if journal is not None:
+            for strip in created:
+                journal.record_strip(track, strip)
+
+        self.report({'INFO'}, f'Added {len(created)} NLA strips')
+        end_operation(journal, self.bl_label)
         return {'FINISHED'}
 
 
@@ -156,12 +203,7 @@ class DLG_OT_action_group_edit(Operator):
         return {'FINISHED'}
 
     def invoke(self, context, event):
-        pg = get_scene_properties(context)
-        pg.data_action_group_items.clear()
-
-        for action in bpy.data.actions:
-            item = pg.data_action_group_items.add()
-            item.action = action
+        sync_data_action_group_items(context)
 
         if context.window_manager is None:
             raise TypeError
@@ -319,48 +361,90 @@ class DLG_OT_rename_selected_nla_strips(Operator):
         description='Text to replace the found pattern with'
     )
 
+    scope: EnumProperty(
+        name='Scope',
+        items=RENAME_SCOPE_ITEMS,
+        default='SELECTED_STRIPS',
+        description='Which strips to rename'
+    )
+
     dry: BoolProperty(
         name='Dry Run',
         default=True,
         description='Do not apply changes, but show what would be changed'
     )
 
+    preview_rows = 20
+
     @classmethod
     def poll(cls, context):
-        if len(context.selected_nla_strips) == 0:
-            cls.poll_message_set('No NLA strips selected')
+        if len(context.selected_nla_strips) == 0 and len(context.selected_objects) == 0:
+            cls.poll_message_set('No NLA strips or objects selected')
             return False
 
         return True
 
+    def get_plan(self, context) -> RenamePlan:
+        regex = regex_comp(self.find_pattern)
+        return plan_renames(get_rename_groups(context, self.scope), regex, self.replace)
+
+    def update_preview(self, context) -> None:
+        try:
+            self.preview = self.get_plan(context)
+            self.preview_error = ''
+        except regex_err as e:
+            self.preview = None
+            self.preview_error = str(e)
+
     def invoke(self, context, event):
         if context.window_manager is None:
             raise TypeError
 
-        return context.window_manager.invoke_props_dialog(self)
+        self.update_preview(context)
+        return context.window_manager.invoke_props_dialog(self, width=400)
+
+    def check(self, context):
+        self.update_preview(context)
+        return True
+
+    def draw(self, context):
+        layout = self.layout
+        layout.prop(self, 'find_pattern')
+        layout.prop(self, 'replace')
+        layout.prop(self, 'scope')
+        layout.prop(self, 'dry')
+
+        box = layout.box()
+        plan = getattr(self, 'preview', None)
+
+        if plan is None:
+            box.label(text=getattr(self, 'preview_error', ''), icon='ERROR')
+            return
+
+        box.label(text=str(plan), icon='INFO')
+
+        col = box.column(align=True)
+        for entry in plan.entries[:self.preview_rows]:
+            row = col.row()
+            row.label(text=entry.old_name)
+            row.label(text=entry.new_name, icon='ERROR' if entry.resolved else 'FORWARD')
+
+        if len(plan.entries) > self.preview_rows:
+            col.label(text=f'... and {len(plan.entries) - self.preview_rows} more')
 
     def execute(self, context):
-        # Get selected NLA strips.
         try:
-            regex = regex_comp(self.find_pattern)
+            plan = self.get_plan(context)
         except regex_err as e:
             self.report({'ERROR_INVALID_INPUT'}, str(e))
             return {'CANCELLED'}
 
-        count = 0
-        for strip in context.selected_nla_strips:
-            # Check if the pattern is found in the strip name.
-            if not regex.search(strip.name):
-                continue
-            new_strip_name = regex.sub(self.replace, strip.name)
-            if self.dry:
-                print(f'{strip.name} -> {regex.sub(self.replace, strip.name)}')
-            else:
-                strip.name = new_strip_name
-            count += 1
-
         if self.dry:
-            self.report({'INFO'}, f'{count} NLA strips would be renamed')
+            self.report({'INFO'}, f'Dry run: {plan}')
+            return {'FINISHED'}
+
+        apply_renames(plan)
+        self.report({'INFO'}, str(plan))
 
         return {'FINISHED'}
 
@@ -375,8 +459,17 @@ class DLG_OT_markers_push_tracks(Operator):
         ad = context.object.animation_data
         selected_nla_tracks = [*filter(lambda x: x.select, ad.nla_tracks)]
 
+        strips = []
         for nla_track in selected_nla_tracks:
-            generate_markers(nla_track.strips)
+            strips += get_track_intervals(nla_track).iter_strips(nla_track)
+
+        # Only the frames the strips cover, gaps between them keep their markers.
+        frame_ranges = [(frame_start, strip.frame_end) for strip, frame_start in strips]
+
+        stats = generate_markers(context.scene, strips, frame_ranges,
+                                 replace=get_scene_properties(context).marker_mode == 'REPLACE')
+        link_markers(context.scene, strips, selected_nla_tracks)
+        self.report({'INFO'}, str(stats))
 
         return {'FINISHED'}
 
@@ -388,7 +481,15 @@ class DLG_OT_markers_push_strips(Operator):
     bl_options = {'INTERNAL', 'UNDO'}
 
     def execute(self, context):
-        generate_markers(context.selected_nla_strips)
+        selected_strips = context.selected_nla_strips
+        strips = [(strip, strip.frame_start) for strip in selected_strips]
+        # Each strip's own range, so markers between strips that are far apart are kept.
+        frame_ranges = [(strip.frame_start, strip.frame_end) for strip in selected_strips]
+
+        stats = generate_markers(context.scene, strips, frame_ranges,
+                                 replace=get_scene_properties(context).marker_mode == 'REPLACE')
+        link_markers(context.scene, strips)
+        self.report({'INFO'}, str(stats))
 
         return {'FINISHED'}
 
@@ -401,6 +502,7 @@ class DLG_OT_markers_clear_all(Operator):
 
     def execute(self, context):
         context.scene.timeline_markers.clear()
+        unlink_markers(context.scene)
         return {'FINISHED'}
 
 
@@ -418,6 +520,8 @@ _classes= (
     DLG_OT_markers_clear_all
 )
 
+instrument_classes(_classes)
+
 
 from bpy.utils import register_classes_factory
 register, unregister = register_classes_factory(_classes)
@@ -0,0 +1,164 @@
+from bpy.types import ID, Context, NlaStrip
+
+from re import Pattern
+from dataclasses import dataclass, field
+from collections import deque
+from collections.abc import Iterable
+
+
+RENAME_SCOPE_ITEMS = (
+    ('SELECTED_STRIPS', 'Selected Strips', 'Rename the selected NLA strips'),
+    ('SELECTED_OBJECTS', 'Selected Objects', 'Rename the strips on all tracks of the selected objects'),
+)
+
+
+@dataclass
+class RenameEntry:
+    strip: NlaStrip
+    old_name: str
+    new_name: str
+    # The replaced name was taken, so a numbered suffix was added.
+    resolved: bool = False
+
+
+@dataclass
+class RenamePlan:
+    entries: list[RenameEntry] = field(default_factory=list)
+    matched: int = 0
+
+    @property
+    def resolved(self) -> int:
+        return sum(entry.resolved for entry in self.entries)
+
+    def __str__(self) -> str:
+        return (f'{len(self.entries)} of {self.matched} matching NLA strips renamed, '
+                f'{self.resolved} name collisions resolved')
+
+
+def get_unique_name(name: str, taken: set[str], next_index: dict[str, int] | None = None) -> str:
+    "Name with the lowest free numbered suffix, like Blender would pick"
+    # Lower suffixes stay taken as long as `taken` only grows, so the search can resume per base name.
+    base, dot, number = name.rpartition('.')
+    if not (dot and number.isdigit()):
+        base = name
+
+    index = next_index.get(base, 1) if next_index is not None else 1
+    while f'{base}.{index:03}' in taken:
+        index += 1
+
+    if next_index is not None:
+        next_index[base] = index + 1
+    return f'{base}.{index:03}'
+
+
+def get_owner_strips(owner: ID) -> list[NlaStrip]:
+    "All strips of the owner, track by track. Strip names are unique across all tracks of one owner"
+    return [strip for track in owner.animation_data.nla_tracks for strip in track.strips]
+
+
+def get_strip_names(owner: ID) -> set[str]:
+    return {strip.name for strip in get_owner_strips(owner)}
+
+
+def plan_renames(groups: Iterable[tuple[set[str], list[NlaStrip]]], regex: Pattern, replace: str) -> RenamePlan:
+    "Final names for every (strip names of an owner, strips to rename) group, with collisions resolved up front"
+    plan = RenamePlan()
+
+    for names, strips in groups:
+        renames = []
+        for strip in strips:
+            name = strip.name
+            new_name, count = regex.subn(replace, name)
+            if count:
+                plan.matched += 1
+                if new_name != name:
+                    renames.append((strip, name, new_name))
+
+        if not renames:
+            continue
+
+        # Names that stay as they are, plus the names handed out so far.
+        taken = names.difference(name for _, name, _ in renames)
+        next_index: dict[str, int] = {}
+
+        for strip, name, new_name in renames:
+            resolved = new_name in taken
+            if resolved:
+                new_name = get_unique_name(new_name, taken, next_index)
+
+            taken.add(new_name)
+            plan.entries.append(RenameEntry(strip, name, new_name, resolved))
+
+    return plan
+
+
+def get_rename_steps(entries: list[RenameEntry], names: set[str]) -> list[tuple[NlaStrip, str]]:
+    "Order renames of one owner so no name is assigned while it is still held, breaking cycles with temporary names"
+    holders = set(names)
+    pending = {entry.old_name: entry for entry in entries}
+    waiting = {entry.new_name: entry.old_name for entry in entries}
+    ready = deque(entry.old_name for entry in entries if entry.new_name not in holders)
+    steps = []
+    temp_index = 0
+
+    def move(old_name: str, new_name: str, strip: NlaStrip) -> None:
+        holders.discard(old_name)
+        holders.add(new_name)
+        steps.append((strip, new_name))
+
+        # Whoever waited for the freed name can go now.
+        waiter = waiting.pop(old_name, None)
+        if waiter is not None and waiter in pending:
+            ready.append(waiter)
+
+    while pending:
+        while ready:
+            name = ready.popleft()
+            entry = pending.pop(name)
+            move(name, entry.new_name, entry.strip)
+
+        if pending:
+            # Only cycles are left. Park one strip under a temporary name to break its cycle.
+            old_name, entry = next(iter(pending.items()))
+            while (temp_name := f'~rename.{temp_index}') in holders:
+                temp_index += 1
+
+            del pending[old_name]
+            pending[temp_name] = entry
+            if entry.new_name in waiting:
+                waiting[entry.new_name] = temp_name
+            move(old_name, temp_name, entry.strip)
+
+    return steps
+
+
+def apply_renames(plan: RenamePlan) -> int:
+    "Rename the strips of the plan without Blender adding suffixes along the way"
+    by_owner: dict[int, list[RenameEntry]] = {}
+    for entry in plan.entries:
+        by_owner.setdefault(entry.strip.id_data.session_uid, []).append(entry)
+
+    for entries in by_owner.values():
+        names = get_strip_names(entries[0].strip.id_data)
+
+        for strip, name in get_rename_steps(entries, names):
+            strip.name = name
+
+    return len(plan.entries)
+
+
+def get_rename_groups(context: Context, scope: str) -> list[tuple[set[str], list[NlaStrip]]]:
+    "(strip names of an owner, strips to rename) for every owner in the scope"
+    if scope == 'SELECTED_OBJECTS':
+        groups = []
+        for object in context.selected_objects:
+            if object.animation_data is not None:
+                strips = get_owner_strips(object)
+                groups.append(({strip.name for strip in strips}, strips))
+        return groups
+
+    by_owner: dict[int, list[NlaStrip]] = {}
+    for strip in context.selected_nla_strips:
+        by_owner.setdefault(strip.id_data.session_uid, []).append(strip)
+
+    return [(get_strip_names(strips[0].id_data), strips) for strips in by_owner.values()]
@@ -3,6 +3,8 @@ from bpy.types import Panel, UIList, Menu, Context, bpy_prop_array
 
 from ..properties import DLG_PG_action_group, get_scene_properties, filter_actions
 from . import operators as ops
+from ..journal import draw_bulk_controls
+from ..instrument import instrument_classes
 
 
 class DLG_PT_actions(Panel):
@@ -43,8 +45,12 @@ class DLG_PT_actions(Panel):
         col.menu(DLG_MT_add_actions_context_menu.bl_idname, text='', icon='DOWNARROW_HLT')
 
         # PUSH BUTTON
+        layout.prop(props, 'push_placement', text='')
         row = layout.row(align=True)
         row.operator(ops.DLG_OT_action_group_push.bl_idname, text='Add to Selected Track', icon='NLA_PUSHDOWN')
+        row.operator('dlg.psa_export', text='', icon='EXPORT').source = 'GROUP'
+
+        draw_bulk_controls(layout, context)
 
 
 class DLG_UL_action_group_list(UIList):
@@ -117,6 +123,8 @@ class DLG_PT_markers(Panel):
         col.prop(props, 'marker_name_replace_with')
         col.separator()
         col.prop(props, 'use_action_names_for_markers')
+        col.prop(props, 'marker_mode')
+        col.prop(props, 'marker_live_sync')
         col.separator()
 
         col = layout.column(align=True)
@@ -134,6 +142,8 @@ _classes = (
     DLG_PT_markers
 )
 
+instrument_classes(_classes)
+
 
 from bpy.utils import register_classes_factory
 register, unregister = register_classes_factory(_classes)
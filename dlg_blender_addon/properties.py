@@ -1,11 +1,13 @@
 import bpy
 from bpy.types import PropertyGroup, Action, PoseBone, Object, Context
-from bpy.props import StringProperty, PointerProperty, CollectionProperty, BoolProperty, IntProperty
-from .utils import is_armature_poll
+from bpy.props import StringProperty, PointerProperty, CollectionProperty, BoolProperty, IntProperty, EnumProperty, FloatProperty
+from .utils import is_armature_poll, get_name_matcher
+from .cache import get_cached
+from .nla.layout import PLACEMENT_ITEMS
+from .nla.markers import MARKER_MODE_ITEMS, on_live_sync_update
 # from . import utils
 
 from typing import cast, Any
-from fnmatch import fnmatch
 
 
 class DLG_PG_action_group_item(PropertyGroup):
@@ -58,6 +60,20 @@ class DLG_PG_scene_properties(PropertyGroup):
     def is_anim_group_selected(self) -> bool:
         return 0 <= self.anim_groups_index < len(self.anim_groups)
 
+    def get_bake_settings(self) -> dict[str, Any]:
+        "Settings that affect the baked result of a retarget"
+        settings: dict[str, Any] = {
+            'bake_engine': self.bake_engine,
+            'reduce_curves': self.reduce_curves,
+        }
+
+        if self.reduce_curves:
+            settings['reduce_tolerances'] = (self.reduce_tolerance_location,
+                                             self.reduce_tolerance_rotation,
+                                             self.reduce_tolerance_scale)
+
+        return settings
+
     data_action_group_items: CollectionProperty(type=DLG_PG_action_group_item)
     data_action_group_items_index: IntProperty()
 
@@ -65,6 +81,12 @@ class DLG_PG_scene_properties(PropertyGroup):
     anim_groups: CollectionProperty(type=DLG_PG_action_group)
     anim_groups_index: IntProperty(name='Active Action Group')
 
+    push_placement: EnumProperty(
+        name='Placement',
+        items=PLACEMENT_ITEMS,
+        default='CURRENT_FRAME',
+        description='Where the strips of an action group are added on the track')
+
     # Markers
     use_action_names_for_markers: BoolProperty(
         default=False,
@@ -74,6 +96,18 @@ class DLG_PG_scene_properties(PropertyGroup):
     marker_name_replace: StringProperty(name='Replace')
     marker_name_replace_with: StringProperty(name='With')
 
+    marker_mode: EnumProperty(
+        name='Mode',
+        items=MARKER_MODE_ITEMS,
+        default='ADD',
+        description='How generated markers are merged with markers already on the timeline')
+
+    marker_live_sync: BoolProperty(
+        name='Live Sync',
+        default=False,
+        update=on_live_sync_update,
+        description='Keep generated markers in sync when their strips are moved, renamed, added or removed')
+
     # Action Bake
     action_index: IntProperty(default=0,
                               name='Active Action Index')
@@ -88,6 +122,95 @@ class DLG_PG_scene_properties(PropertyGroup):
     overwrite_current_action: BoolProperty(default=True)
     clean_curves: BoolProperty(default=True)
 
+    bake_engine: EnumProperty(
+        name='Bake Engine',
+        items=(
+            ('NATIVE', 'Native', 'Sample pose matrices once per frame and write whole F-Curves in bulk'),
+            ('DIRECT', 'Direct', 'Compute bones that copy source bone transforms straight from the source curves, '
+                       'without evaluating the scene. Rigs with other constraints or drivers are baked with Native'),
+            ('OPERATOR', 'Blender Bake', 'Use Blender\'s built-in Bake Action operator with visual keying')
+        ),
+        default='NATIVE',
+        description='How retargeted animation is keyed onto the target bones')
+
+    reduce_curves: BoolProperty(
+        default=False,
+        name='Reduce Keys',
+        description='Remove baked keys that can be linearly interpolated within the tolerances below. When off, only flat keys are cleaned')
+
+    reduce_tolerance_location: FloatProperty(
+        default=0.0001,
+        min=0.0,
+        precision=5,
+        step=0.001,
+        name='Location Tolerance',
+        description='Largest location error allowed when reducing keys')
+
+    reduce_tolerance_rotation: FloatProperty(
+        default=0.0001,
+        min=0.0,
+        precision=5,
+        step=0.001,
+        name='Rotation Tolerance',
+        description='Largest rotation error allowed when reducing keys (quaternion component or radians)')
+
+    reduce_tolerance_scale: FloatProperty(
+        default=0.0001,
+        min=0.0,
+        precision=5,
+        step=0.001,
+        name='Scale Tolerance',
+        description='Largest scale error allowed when reducing keys')
+
+    skip_unchanged: BoolProperty(
+        default=True,
+        name='Skip Unchanged',
+        description='Do not bake actions whose source animation, rig and bake settings did not change since they were last retargeted')
+
+    use_source_cache: BoolProperty(
+        default=False,
+        name='Cache Source Poses',
+        description='Only used by the Direct engine, Native and Blender Bake always evaluate the scene. Sample every source action once and keep its poses in a file next to the blend file. Retargets onto any target rig read the poses from there')
+
+    source_cache_directory: StringProperty(
+        default='//pose_cache',
+        subtype='DIR_PATH',
+        name='Cache Directory',
+        description='Directory the cached source poses are kept in, one .npz file per action fingerprint')
+
+    isolate_evaluation: BoolProperty(
+        default=True,
+        name='Isolate Evaluation',
+        description='While baking, leave every object the source and target armatures do not depend on out of scene evaluation. They are restored afterwards')
+
+    worker_count: IntProperty(
+        default=1,
+        min=1,
+        soft_max=32,
+        name='Workers',
+        description='Number of background Blender processes to bake actions in. With 1, actions are baked in this Blender instance')
+
+    bulk_mode: BoolProperty(
+        default=False,
+        name='Bulk Mode',
+        description='Skip the undo step of every retarget and strip push. Changes are journaled instead and can be reverted together')
+
+    stream_output: BoolProperty(
+        default=False,
+        name='Stream to Files',
+        description='Write every baked action to its own .blend library in the output directory as soon as it is baked')
+
+    stream_directory: StringProperty(
+        default='//retargeted',
+        subtype='DIR_PATH',
+        name='Output Directory',
+        description='Directory the baked action libraries are written to')
+
+    stream_remove_actions: BoolProperty(
+        default=False,
+        name='Remove Written Actions',
+        description='Remove actions from this file once they are written, so memory use stays flat on large batches')
+
     use_filter_invert: BoolProperty(default=False,
                                     options={'TEXTEDIT_UPDATE'},
                                     name='Invert',
@@ -112,8 +235,23 @@ def filter_actions(filter_name: str, items: list[Any]) -> list[int]:
     flt_flags = [bitflag_filter_item] * len(items)
 
     if filter_name:
+        matches = get_name_matcher(f'*{filter_name}*')
+
+        # Per-name results for this filter, kept until any action changes.
+        results: dict[str, bool] = get_cached(('filter_actions', filter_name), dict)
+
         for i, item in enumerate(items):
-            if not fnmatch(item.action.name, f'*{filter_name}*'):
+            if item.action is None:
+                flt_flags[i] &= ~bitflag_filter_item
+                continue
+
+            name = item.action.name
+            try:
+                is_match = results[name]
+            except KeyError:
+                is_match = results[name] = matches(name)
+
+            if not is_match:
                 flt_flags[i] &= ~bitflag_filter_item
 
     return flt_flags
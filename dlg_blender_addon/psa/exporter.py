@@ -0,0 +1,168 @@
+import bpy
+import numpy as np
+from bpy.types import Action, Object, PoseBone, Scene
+
+from dataclasses import dataclass
+from collections.abc import Sequence
+
+from ..instrument import timed
+from ..retarget.bake import decompose, matrix_to_quaternion
+from .pose import RestPose
+from .reader import BONE, KEY, SEQUENCE, XYZW, PsaError
+from .writer import PsaWriter, encode_name
+
+
+# Keys sampled and written per block. Bounds memory use regardless of sequence count and length.
+BUFFER_KEYS = 1 << 16
+
+
+@dataclass
+class ExportResult:
+    sequence_count: int = 0
+    bone_count: int = 0
+    key_count: int = 0
+
+    def __str__(self) -> str:
+        return f'Exported {self.sequence_count} sequences of {self.bone_count} bones, {self.key_count} keys'
+
+
+def get_export_bones(armature_obj: Object, deform_only: bool = True) -> list[PoseBone]:
+    "Bones to export, parents before children as PSA expects"
+    pose_bones = [pose_bone for pose_bone in armature_obj.pose.bones if pose_bone.bone.use_deform or not deform_only]
+    return sorted(pose_bones, key=lambda pose_bone: len(pose_bone.parent_recursive))
+
+
+def get_frame_range(action: Action) -> tuple[int, int]:
+    start, end = action.frame_range
+    return int(round(start)), int(round(end))
+
+
+def make_bones(pose_bones: Sequence[PoseBone], rest_pose: RestPose) -> np.ndarray:
+    bones = np.zeros(len(pose_bones), dtype=BONE)
+
+    # The bind pose is the key of a bone at its rest pose.
+    rotations, locations = rest_pose.from_pose(np.tile([1.0, 0.0, 0.0, 0.0], (len(pose_bones), 1)),
+                                               np.zeros((len(pose_bones), 3)))
+
+    for i, pose_bone in enumerate(pose_bones):
+        bones['name'][i] = encode_name(pose_bone.name)
+
+    # Bones hang off their nearest exported ancestor. Roots point at the first bone, like ActorX writes them.
+    bones['parent_index'] = np.maximum(rest_pose.parent_indices, 0)
+    bones['children_count'] = np.bincount(rest_pose.parent_indices[rest_pose.has_parent], minlength=len(pose_bones))
+
+    bones['rotation'] = rotations[:, XYZW]
+    bones['location'] = locations
+    bones['size'] = 1.0
+
+    return bones
+
+
+def sample_pose_matrices(scene: Scene, armature_obj: Object, pose_bones: Sequence[PoseBone],
+                         frames: Sequence[int]) -> np.ndarray:
+    "Step through the frames and return the (frames, bones, 4, 4) armature-space pose matrices of the bones"
+    all_pose_bones = armature_obj.pose.bones
+    pose_indices = {pose_bone.name: i for i, pose_bone in enumerate(all_pose_bones)}
+    indices = np.array([pose_indices[pose_bone.name] for pose_bone in pose_bones], dtype=np.int64)
+
+    buffer = np.empty(len(all_pose_bones) * 16, dtype=np.float32)
+    matrices = np.empty((len(frames), len(pose_bones), 4, 4))
+
+    for f, frame in enumerate(frames):
+        scene.frame_set(frame)
+
+        # RNA stores matrices column-major, hence the transpose.
+        all_pose_bones.foreach_get('matrix', buffer)
+        matrices[f] = buffer.reshape(-1, 4, 4).transpose(0, 2, 1)[indices]
+
+    return matrices
+
+
+def make_sequences(actions: Sequence[Action], bone_count: int, fps: float) -> np.ndarray:
+    sequences = np.zeros(len(actions), dtype=SEQUENCE)
+    first_frame = 0
+
+    for i, action in enumerate(actions):
+        start, end = get_frame_range(action)
+        frame_count = end - start + 1
+
+        sequences['name'][i] = encode_name(action.name)
+        sequences['group'][i] = encode_name('None')
+        sequences['bone_count'][i] = bone_count
+        sequences['key_quotum'][i] = frame_count * bone_count
+        sequences['key_reduction'][i] = 1.0
+        sequences['track_time'][i] = frame_count
+        sequences['fps'][i] = fps
+        sequences['first_frame'][i] = first_frame
+        sequences['frame_count'][i] = frame_count
+
+        first_frame += frame_count
+
+    return sequences
+
+
+def export_psa(filepath: str,
+               armature_obj: Object,
+               actions: Sequence[Action],
+               deform_only: bool = True) -> ExportResult:
+    "Write the actions as PSA sequences of the armature's bones. Poses are sampled and written in fixed-size blocks"
+    from ..retarget.operators import apply_nla_mute_state, mute_nla_tracks, set_action
+
+    scene = bpy.context.scene
+    fps = scene.render.fps / scene.render.fps_base
+
+    pose_bones = get_export_bones(armature_obj, deform_only)
+    if not pose_bones:
+        raise PsaError(f'{armature_obj.name} has no bones to export')
+
+    rest_pose = RestPose(armature_obj, [pose_bone.name for pose_bone in pose_bones])
+    rest_offsets = rest_pose.get_rest_offsets()
+    parent_indices = np.maximum(rest_pose.parent_indices, 0)
+
+    bone_count = len(pose_bones)
+    bones = make_bones(pose_bones, rest_pose)
+    sequences = make_sequences(actions, bone_count, fps)
+
+    block_frames = max(1, BUFFER_KEYS // bone_count)
+    buffer = np.zeros(block_frames * bone_count, dtype=KEY)
+    buffer['time'] = 1.0 / fps
+
+    anim_data = armature_obj.animation_data or armature_obj.animation_data_create()
+    original_action = anim_data.action
+    original_slot = getattr(anim_data, 'action_slot', None)
+    frame_original = scene.frame_current, scene.frame_subframe
+    mute_state = mute_nla_tracks(armature_obj)
+
+    try:
+        with PsaWriter(filepath, bones, sequences) as writer:
+            for action in actions:
+                set_action(armature_obj, action)
+                start, end = get_frame_range(action)
+
+                for block_start in range(start, end + 1, block_frames):
+                    frames = range(block_start, min(block_start + block_frames, end + 1))
+
+                    with timed('psa', 'sample', action.name):
+                        pose_matrices = sample_pose_matrices(scene, armature_obj, pose_bones, frames)
+
+                    # Keys are relative to the nearest exported ancestor, so bones left out do not break the chain.
+                    parent_matrices = np.where(rest_pose.has_parent[:, None, None],
+                                               pose_matrices[:, parent_indices], np.identity(4))
+                    local_matrices = np.linalg.inv(parent_matrices @ rest_offsets) @ pose_matrices
+
+                    location, rotation, _ = decompose(local_matrices)
+                    key_rotations, key_locations = rest_pose.from_pose(matrix_to_quaternion(rotation), location)
+
+                    keys = buffer[:len(frames) * bone_count].reshape(len(frames), bone_count)
+                    keys['rotation'] = key_rotations[..., XYZW]
+                    keys['location'] = key_locations
+                    writer.write_keys(keys.ravel())
+
+        return ExportResult(len(sequences), bone_count, writer.keys_written)
+
+    finally:
+        scene.frame_set(frame_original[0], subframe=frame_original[1])
+        anim_data.action = original_action
+        if original_slot is not None:
+            anim_data.action_slot = original_slot
+        apply_nla_mute_state(armature_obj, mute_state)
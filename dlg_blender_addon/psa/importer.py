@@ -0,0 +1,177 @@
+import bpy
+import numpy as np
+from bpy.types import Action, Object
+
+from dataclasses import dataclass, field
+from collections.abc import Callable, Sequence
+
+from ..cache import invalidate_actions
+from ..retarget.bake import (ensure_fcurve, get_active_fcurves, get_action_fcurve_collections,
+                             make_quaternions_compatible, write_fcurves)
+from .pose import RestPose
+from .reader import WXYZ, PsaReader
+
+
+@dataclass
+class ImportResult:
+    actions: list[Action] = field(default_factory=list)
+    missing_bones: list[str] = field(default_factory=list)
+    key_count: int = 0
+
+    def __str__(self) -> str:
+        missing = f', {len(self.missing_bones)} PSA bones not on the armature' if self.missing_bones else ''
+        return f'Imported {len(self.actions)} actions with {self.key_count} keys{missing}'
+
+
+class BoneMapping:
+    "PSA bones matched to armature bones by name, case-insensitively"
+
+    def __init__(self, psa: PsaReader, armature_obj: Object):
+        bones = armature_obj.data.bones
+        bone_names = {bone.name.lower(): bone.name for bone in bones}
+
+        self.psa_indices: list[int] = []
+        self.bone_names: list[str] = []
+        self.missing_bones: list[str] = []
+
+        for psa_index, name in enumerate(psa.bone_names):
+            bone_name = bone_names.get(name.lower())
+            # Names that only differ in case map to one bone, which takes the first of them.
+            if bone_name is None or bone_name in self.bone_names:
+                self.missing_bones.append(name)
+            else:
+                self.psa_indices.append(psa_index)
+                self.bone_names.append(bone_name)
+
+        self.rest_pose = RestPose(armature_obj, self.bone_names)
+
+    def get_channels(self, armature_obj: Object) -> list[tuple[str, int, str]]:
+        "(data path, index, group) of every imported F-Curve, in the order of the columns `convert` returns"
+        channels = []
+        for bone_name in self.bone_names:
+            pose_bone = armature_obj.pose.bones[bone_name]
+            channels.extend((pose_bone.path_from_id('rotation_quaternion'), index, bone_name) for index in range(4))
+            channels.extend((pose_bone.path_from_id('location'), index, bone_name) for index in range(3))
+        return channels
+
+    def convert(self, keys: np.ndarray) -> np.ndarray:
+        "(frames, bones * 7) pose-bone rotations and locations per bone from (frames, PSA bones) keys"
+        keys = keys[:, self.psa_indices]
+        rotations, locations = self.rest_pose.to_pose(keys['rotation'][..., WXYZ].astype(np.float64),
+                                                      keys['location'].astype(np.float64))
+
+        values = np.concatenate((make_quaternions_compatible(rotations), locations), axis=-1)
+        return values.reshape(len(keys), -1)
+
+
+def new_action(name: str, armature_obj: Object) -> Action:
+    action = bpy.data.actions.new(name)
+    if hasattr(action, 'slots'):
+        action.slots.new(id_type='OBJECT', name=armature_obj.name)
+    return action
+
+
+def clear_action(action: Action) -> None:
+    for fcurves in get_action_fcurve_collections(action):
+        fcurves.clear()
+
+
+def new_template(armature_obj: Object, channels: Sequence[tuple[str, int, str]]) -> Action:
+    "Action with an empty F-Curve per channel. New actions are copies of it, which is much faster than adding the curves one by one"
+    from ..retarget.operators import set_action
+
+    template = new_action('PSA Import Template', armature_obj)
+    set_action(armature_obj, template)
+    fcurves = get_active_fcurves(armature_obj)
+
+    for data_path, index, group_name in channels:
+        ensure_fcurve(fcurves, data_path, index, group_name)
+
+    return template
+
+
+def import_psa(filepath: str,
+               armature_obj: Object,
+               sequence_filter: Callable[[str], bool] | None = None,
+               use_sequence_fps: bool = True,
+               replace_existing: bool = True,
+               select_actions: bool = True) -> ImportResult:
+    "Create one action per PSA sequence on the armature. Keys go straight from the mapped file into F-Curves"
+    from ..retarget.operators import set_action
+
+    result = ImportResult()
+    scene_fps = bpy.context.scene.render.fps / bpy.context.scene.render.fps_base
+
+    anim_data = armature_obj.animation_data or armature_obj.animation_data_create()
+    original_action = anim_data.action
+    original_slot = getattr(anim_data, 'action_slot', None)
+
+    with PsaReader(filepath) as psa:
+        mapping = BoneMapping(psa, armature_obj)
+        result.missing_bones = mapping.missing_bones
+
+        for bone_name in mapping.bone_names:
+            armature_obj.pose.bones[bone_name].rotation_mode = 'QUATERNION'
+
+        channels = mapping.get_channels(armature_obj)
+        template = None
+        # An action imported here per frame count. Copies of it already hold linear keys on every curve.
+        keyed_templates: dict[int, Action] = {}
+
+        try:
+            for index, name in enumerate(psa.sequence_names):
+                if sequence_filter is not None and not sequence_filter(name):
+                    continue
+
+                keys = psa.get_sequence_keys(index)
+                if len(keys) == 0:
+                    continue
+
+                action = bpy.data.actions.get(name) if replace_existing else None
+                keys_exist = False
+
+                if action is None or action.library is not None:
+                    source = keyed_templates.get(len(keys))
+                    keys_exist = source is not None
+                    if source is None:
+                        if template is None:
+                            template = new_template(armature_obj, channels)
+                        source = template
+
+                    action = source.copy()
+                    action.name = name
+                    keyed_templates.setdefault(len(keys), action)
+
+                    set_action(armature_obj, action)
+                    fcurves = list(get_active_fcurves(armature_obj))
+                else:
+                    # Existing actions keep their identity, so strips and other users still point at them.
+                    # One imported earlier is about to be cleared, so it can no longer be copied for its keys.
+                    keyed_templates = {count: keyed for count, keyed in keyed_templates.items() if keyed != action}
+
+                    clear_action(action)
+                    set_action(armature_obj, action)
+                    active_fcurves = get_active_fcurves(armature_obj)
+                    fcurves = [ensure_fcurve(active_fcurves, *channel) for channel in channels]
+
+                frames = np.arange(len(keys), dtype=np.float64)
+                sequence_fps = float(psa.sequences[index]['fps'])
+                if use_sequence_fps and sequence_fps > 0.0:
+                    frames *= scene_fps / sequence_fps
+
+                write_fcurves(fcurves, frames, mapping.convert(keys), linear=True, keys_exist=keys_exist)
+
+                action.use_fake_user = True
+                action.dlg_is_selected = select_actions
+                result.actions.append(action)
+                result.key_count += keys.size
+
+        finally:
+            anim_data.action = original_action
+            if original_slot is not None:
+                anim_data.action_slot = original_slot
+            if template is not None:
+                bpy.data.actions.remove(template)
+
+    invalidate_actions()
+    return result
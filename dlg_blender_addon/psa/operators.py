@@ -0,0 +1,164 @@
+import bpy
+from bpy.props import BoolProperty, EnumProperty, StringProperty
+from bpy.types import Action, Context, Operator, TOPBAR_MT_file_export, TOPBAR_MT_file_import
+from bpy_extras.io_utils import ExportHelper, ImportHelper
+
+from time import perf_counter
+
+from ..utils import get_name_matcher
+from ..instrument import instrument_classes
+from ..retarget.operators import get_last_retarget_actions
+from .reader import PsaError
+from .importer import import_psa
+from .exporter import export_psa
+
+
+class DLG_OT_psa_import(Operator, ImportHelper):
+    bl_idname = 'dlg.psa_import'
+    bl_label = 'Import PSA Actions'
+    bl_description = 'Import the sequences of a PSA file as actions on the source armature'
+    bl_options = {'REGISTER', 'UNDO'}
+
+    filename_ext = '.psa'
+
+    filter_glob: StringProperty(default='*.psa', options={'HIDDEN'})
+
+    sequence_filter: StringProperty(name='Sequences',
+                                    default='*',
+                                    description='Only import sequences matching this pattern')
+
+    use_sequence_fps: BoolProperty(name='Use Sequence FPS',
+                                   default=True,
+                                   description='Scale the keys of each sequence from its own frame rate to the scene frame rate')
+
+    replace_existing: BoolProperty(name='Replace Existing',
+                                   default=True,
+                                   description='Overwrite the curves of actions that already have the name of a sequence')
+
+    select_actions: BoolProperty(name='Select for Retargeting',
+                                 default=True,
+                                 description='Mark the imported actions as selected in the retarget action list')
+
+    @classmethod
+    def poll(cls, context):
+        if context.scene.dlg_props.source_armature is None:
+            cls.poll_message_set('No source armature selected')
+            return False
+
+        return True
+
+    def execute(self, context):
+        start = perf_counter()
+        sequence_filter = get_name_matcher(self.sequence_filter) if self.sequence_filter not in ('', '*') else None
+
+        try:
+            result = import_psa(self.filepath,
+                                context.scene.dlg_props.source_armature,
+                                sequence_filter=sequence_filter,
+                                use_sequence_fps=self.use_sequence_fps,
+                                replace_existing=self.replace_existing,
+                                select_actions=self.select_actions)
+        except (OSError, PsaError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f'{result} in {perf_counter() - start:.2f}s')
+        return {'FINISHED'}
+
+
+def get_export_actions(context: Context, source: str) -> list[Action]:
+    props = context.scene.dlg_props
+
+    if source == 'GROUP':
+        if not props.is_anim_group_selected():
+            return []
+        return [item.action for item in props.get_selected_anim_group().actions if item.action is not None]
+
+    if source == 'LAST_RETARGET':
+        return get_last_retarget_actions(context.scene)
+
+    return [action for action in bpy.data.actions if action.dlg_is_selected]
+
+
+class DLG_OT_psa_export(Operator, ExportHelper):
+    bl_idname = 'dlg.psa_export'
+    bl_label = 'Export PSA Actions'
+    bl_description = 'Export actions as the sequences of a PSA file, sampled on the active armature'
+
+    filename_ext = '.psa'
+
+    filter_glob: StringProperty(default='*.psa', options={'HIDDEN'})
+
+    source: EnumProperty(
+        name='Actions',
+        items=(
+            ('SELECTED', 'Selected', 'Actions selected in the retarget action list'),
+            ('GROUP', 'Action Group', 'Actions of the active action group'),
+            ('LAST_RETARGET', 'Last Retarget', 'Actions baked or skipped as unchanged by the last retarget'),
+        ),
+        default='SELECTED'
+    )
+
+    deform_only: BoolProperty(name='Deform Bones Only',
+                              default=True,
+                              description='Only export bones that deform, leaving out controls and helpers')
+
+    @classmethod
+    def poll(cls, context):
+        if context.object is None or context.object.type != 'ARMATURE':
+            cls.poll_message_set('Active object is not an armature')
+            return False
+
+        return True
+
+    def execute(self, context):
+        actions = get_export_actions(context, self.source)
+        if not actions:
+            self.report({'ERROR'}, 'No actions to export')
+            return {'CANCELLED'}
+
+        start = perf_counter()
+
+        try:
+            result = export_psa(bpy.path.ensure_ext(self.filepath, '.psa'),
+                                context.object,
+                                actions,
+                                deform_only=self.deform_only)
+        except (OSError, PsaError) as error:
+            self.report({'ERROR'}, str(error))
+            return {'CANCELLED'}
+
+        self.report({'INFO'}, f'{result} in {perf_counter() - start:.2f}s')
+        return {'FINISHED'}
+
+
+def draw_import_menu(self, context):
+    self.layout.operator(DLG_OT_psa_import.bl_idname, text='PSA Actions for Retargeting (DLG) (.psa)')
+
+
+def draw_export_menu(self, context):
+    self.layout.operator(DLG_OT_psa_export.bl_idname, text='Retargeted Actions (DLG) (.psa)')
+
+
+_classes = (
+    DLG_OT_psa_import,
+    DLG_OT_psa_export,
+)
+
+instrument_classes(_classes)
+
+
+from bpy.utils import register_classes_factory
+_register_classes, _unregister_classes = register_classes_factory(_classes)
+
+
+def register():
+    _register_classes()
+    TOPBAR_MT_file_import.append(draw_import_menu)
+    TOPBAR_MT_file_export.append(draw_export_menu)
+
+
+def unregister():
+    TOPBAR_MT_file_export.remove(draw_export_menu)
+    TOPBAR_MT_file_import.remove(draw_import_menu)
+    _unregister_classes()
@@ -0,0 +1,99 @@
+import numpy as np
+from bpy.types import Bone, Object
+
+from collections.abc import Container, Sequence
+
+from ..retarget.bake import (decompose, matrix_to_quaternion, quaternion_conjugate, quaternion_multiply,
+                             quaternion_rotate)
+
+
+def get_listed_parent(bone: Bone, included: Container[str]) -> Bone | None:
+    "Nearest ancestor of the bone that is in the list, skipping the ones left out"
+    parent = bone.parent
+    while parent is not None and parent.name not in included:
+        parent = parent.parent
+    return parent
+
+
+class RestPose:
+    "Rest pose terms PSA keys are converted against, for a list of armature bones"
+
+    def __init__(self, armature_obj: Object, bone_names: Sequence[str]):
+        bones = armature_obj.data.bones
+        bone_indices = {bone.name: i for i, bone in enumerate(bones)}
+
+        # RNA stores matrices column-major, hence the transpose.
+        matrices = np.empty(len(bones) * 16, dtype=np.float32)
+        bones.foreach_get('matrix_local', matrices)
+        matrices = matrices.reshape(-1, 4, 4).transpose(0, 2, 1).astype(np.float64)
+        translations, rotations, _ = decompose(matrices)
+        rest_rotations = matrix_to_quaternion(rotations)
+
+        listed_indices = {name: i for i, name in enumerate(bone_names)}
+        count = len(bone_names)
+        # Bones are relative to their nearest listed ancestor. Bones without one are roots as far as PSA is concerned.
+        self.parent_indices = np.full(count, -1, dtype=np.int64)
+        self.rest_matrices = matrices[[bone_indices[name] for name in bone_names]]
+        self.original_rotations = np.empty((count, 4))
+        self.original_locations = np.empty((count, 3))
+        self.post_rotations = np.empty((count, 4))
+
+        for i, name in enumerate(bone_names):
+            bone = bones[name]
+            index = bone_indices[name]
+            parent = get_listed_parent(bone, listed_indices)
+            if parent is not None:
+                self.parent_indices[i] = listed_indices[parent.name]
+
+            if bone.get('orig_quat') is not None:
+                # Rigs made by the PSK importer keep the original bind pose on the bones.
+                self.original_rotations[i] = bone['orig_quat']
+                self.original_locations[i] = bone['orig_loc']
+                self.post_rotations[i] = bone['post_quat']
+                continue
+
+            if parent is not None:
+                parent_index = bone_indices[parent.name]
+                parent_inverse = quaternion_conjugate(rest_rotations[parent_index])
+
+                self.original_locations[i] = quaternion_rotate(parent_inverse,
+                                                               translations[index] - translations[parent_index])
+                self.original_rotations[i] = quaternion_conjugate(quaternion_multiply(parent_inverse,
+                                                                                      rest_rotations[index]))
+            else:
+                self.original_locations[i] = translations[index]
+                self.original_rotations[i] = quaternion_conjugate(rest_rotations[index])
+
+            # Same convention as the PSK/PSA importer uses for bones it did not create.
+            self.post_rotations[i] = quaternion_conjugate(self.original_rotations[i])
+
+        self.has_parent = self.parent_indices >= 0
+
+    def get_rest_offsets(self) -> np.ndarray:
+        "(bones, 4, 4) rest matrix of each bone relative to its nearest listed ancestor, or armature space for roots"
+        parent_rest = np.where(self.has_parent[:, None, None],
+                               self.rest_matrices[np.maximum(self.parent_indices, 0)],
+                               np.identity(4))
+        return np.linalg.inv(parent_rest) @ self.rest_matrices
+
+    def to_pose(self, key_rotations: np.ndarray, key_locations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        "Pose-bone rotations and locations from (..., bones) PSA key rotations (w, x, y, z) and locations"
+        # Root keys are stored with the opposite handedness.
+        key_rotations = np.where(self.has_parent[:, None], key_rotations, quaternion_conjugate(key_rotations))
+
+        post = self.post_rotations
+        rotations = quaternion_multiply(quaternion_conjugate(quaternion_multiply(key_rotations, post)),
+                                        quaternion_multiply(self.original_rotations, post))
+        locations = quaternion_rotate(quaternion_conjugate(post), key_locations - self.original_locations)
+
+        return rotations, locations
+
+    def from_pose(self, rotations: np.ndarray, locations: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        "PSA key rotations (w, x, y, z) and locations from (..., bones) pose-bone rotations and locations. Inverse of `to_pose`"
+        post = self.post_rotations
+        key_rotations = quaternion_multiply(quaternion_multiply(self.original_rotations, post),
+                                            quaternion_conjugate(quaternion_multiply(post, rotations)))
+        key_rotations = np.where(self.has_parent[:, None], key_rotations, quaternion_conjugate(key_rotations))
+        key_locations = self.original_locations + quaternion_rotate(post, locations)
+
+        return key_rotations, key_locations
@@ -0,0 +1,175 @@
+import numpy as np
+
+from dataclasses import dataclass
+
+
+class PsaError(Exception):
+    pass
+
+
+# On-disk layouts of the ActorX PSA chunks. Everything is little endian and packed.
+CHUNK_HEADER = np.dtype([
+    ('id', 'S20'),
+    ('type_flag', '<i4'),
+    ('data_size', '<i4'),
+    ('data_count', '<i4'),
+])
+
+BONE = np.dtype([
+    ('name', 'S64'),
+    ('flags', '<u4'),
+    ('children_count', '<i4'),
+    ('parent_index', '<i4'),
+    ('rotation', '<f4', 4),
+    ('location', '<f4', 3),
+    ('length', '<f4'),
+    ('size', '<f4', 3),
+])
+
+SEQUENCE = np.dtype([
+    ('name', 'S64'),
+    ('group', 'S64'),
+    ('bone_count', '<i4'),
+    ('root_include', '<i4'),
+    ('key_compression_style', '<i4'),
+    ('key_quotum', '<i4'),
+    ('key_reduction', '<f4'),
+    ('track_time', '<f4'),
+    ('fps', '<f4'),
+    ('start_bone', '<i4'),
+    ('first_frame', '<i4'),
+    ('frame_count', '<i4'),
+])
+
+KEY = np.dtype([
+    ('location', '<f4', 3),
+    ('rotation', '<f4', 4),
+    ('time', '<f4'),
+])
+
+SCALE_KEY = np.dtype([
+    ('scale', '<f4', 3),
+    ('time', '<f4'),
+])
+
+CHUNK_TYPES = {
+    'BONENAMES': BONE,
+    'ANIMINFO': SEQUENCE,
+    'ANIMKEYS': KEY,
+    'SCALEKEYS': SCALE_KEY,
+}
+
+CHUNK_HEADER_ID = 'ANIMHEAD'
+
+# PSA stores (x, y, z, w). These reorder to Blender's (w, x, y, z) and back.
+WXYZ = [3, 0, 1, 2]
+XYZW = [1, 2, 3, 0]
+
+
+def decode_name(name: bytes) -> str:
+    return name.split(b'\0', 1)[0].decode('windows-1252', errors='replace')
+
+
+@dataclass
+class Chunk:
+    id: str
+    data_size: int
+    data_count: int
+    offset: int
+
+
+class PsaReader:
+    "Memory-mapped PSA file. Chunks are NumPy structured views into the mapping, keys are never copied into Python objects"
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self.chunks: dict[str, Chunk] = {}
+
+        try:
+            self.data = np.memmap(filepath, dtype=np.uint8, mode='r')
+        except ValueError as error:
+            # NumPy refuses to map empty files.
+            raise PsaError(f'{filepath} is not a PSA file: {error}') from error
+
+        offset = 0
+        size = len(self.data)
+
+        while offset + CHUNK_HEADER.itemsize <= size:
+            header = self.data[offset:offset + CHUNK_HEADER.itemsize].view(CHUNK_HEADER)[0]
+            chunk = Chunk(decode_name(header['id']), int(header['data_size']), int(header['data_count']),
+                          offset + CHUNK_HEADER.itemsize)
+
+            if chunk.data_size < 0 or chunk.data_count < 0:
+                raise PsaError(f'Chunk {chunk.id} of {filepath} has a negative size')
+
+            offset = chunk.offset + chunk.data_size * chunk.data_count
+            if offset > size:
+                raise PsaError(f'Chunk {chunk.id} runs past the end of {filepath}')
+
+            self.chunks[chunk.id] = chunk
+
+        if CHUNK_HEADER_ID not in self.chunks:
+            raise PsaError(f'{filepath} is not a PSA file')
+
+        self.bones = self.get_chunk('BONENAMES')
+        self.sequences = self.get_chunk('ANIMINFO')
+        self.keys = self.get_chunk('ANIMKEYS')
+        self.scale_keys = self.get_chunk('SCALEKEYS', required=False)
+
+        self.bone_names = [decode_name(name) for name in self.bones['name']]
+        self.sequence_names = [decode_name(name) for name in self.sequences['name']]
+
+        # Every sequence must be a range of whole frames inside the keys, so key views never fail to reshape.
+        first_frames = self.sequences['first_frame'].astype(np.int64)
+        frame_counts = self.sequences['frame_count'].astype(np.int64)
+        frame_total = len(self.keys) // len(self.bones) if len(self.bones) else 0
+        invalid = (first_frames < 0) | (frame_counts < 0) | (first_frames + frame_counts > frame_total)
+
+        if np.any(invalid):
+            index = int(np.flatnonzero(invalid)[0])
+            raise PsaError(f'Sequence {self.sequence_names[index]} of {filepath} has frames '
+                           f'{first_frames[index]} to {first_frames[index] + frame_counts[index]}, '
+                           f'the keys hold {frame_total}')
+
+    def get_chunk(self, id: str, required: bool = True) -> np.ndarray | None:
+        chunk = self.chunks.get(id)
+        if chunk is None:
+            if required:
+                raise PsaError(f'{self.filepath} has no {id} chunk')
+            return None
+
+        dtype = CHUNK_TYPES[id]
+        if chunk.data_size != dtype.itemsize:
+            raise PsaError(f'Unexpected {id} record size {chunk.data_size} in {self.filepath}, expected {dtype.itemsize}')
+
+        return self.data[chunk.offset:chunk.offset + chunk.data_size * chunk.data_count].view(dtype)
+
+    def get_sequence_keys(self, index: int) -> np.ndarray:
+        "(frames, bones) view of the keys of one sequence"
+        sequence = self.sequences[index]
+        bone_count = len(self.bones)
+        start = int(sequence['first_frame']) * bone_count
+        frame_count = int(sequence['frame_count'])
+
+        return self.keys[start:start + frame_count * bone_count].reshape(frame_count, bone_count)
+
+    def get_sequence_scale_keys(self, index: int) -> np.ndarray | None:
+        if self.scale_keys is None or len(self.scale_keys) != len(self.keys):
+            return None
+
+        sequence = self.sequences[index]
+        bone_count = len(self.bones)
+        start = int(sequence['first_frame']) * bone_count
+        frame_count = int(sequence['frame_count'])
+
+        return self.scale_keys[start:start + frame_count * bone_count].reshape(frame_count, bone_count)
+
+    def close(self) -> None:
+        # The mapping is closed once nothing references it, views included.
+        self.data = self.bones = self.sequences = self.keys = self.scale_keys = None
+
+    def __enter__(self) -> 'PsaReader':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
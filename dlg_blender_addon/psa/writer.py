@@ -0,0 +1,67 @@
+import numpy as np
+
+from typing import BinaryIO
+
+from .reader import BONE, CHUNK_HEADER, CHUNK_HEADER_ID, KEY, SEQUENCE, PsaError
+
+
+# Version tag ActorX writes into chunk headers.
+TYPE_FLAG = 1999801
+
+
+def encode_name(name: str, size: int = 64) -> bytes:
+    # One byte is left for the terminator.
+    return name.encode('windows-1252', errors='replace')[:size - 1]
+
+
+def write_chunk_header(file: BinaryIO, id: str, dtype: np.dtype | None, count: int) -> None:
+    header = np.zeros(1, dtype=CHUNK_HEADER)
+    header['id'] = id.encode('ascii')
+    header['type_flag'] = TYPE_FLAG
+    header['data_size'] = dtype.itemsize if dtype is not None else 0
+    header['data_count'] = count
+    header.tofile(file)
+
+
+class PsaWriter:
+    "Writes a PSA file front to back. Keys are appended in blocks, so the whole animation is never held in memory"
+
+    def __init__(self, filepath: str, bones: np.ndarray, sequences: np.ndarray):
+        self.filepath = filepath
+        self.key_count = int(np.sum(sequences['frame_count'].astype(np.int64))) * len(bones)
+        self.keys_written = 0
+
+        self.file = open(filepath, 'wb')
+        try:
+            write_chunk_header(self.file, CHUNK_HEADER_ID, None, 0)
+            write_chunk_header(self.file, 'BONENAMES', BONE, len(bones))
+            bones.astype(BONE, copy=False).tofile(self.file)
+            write_chunk_header(self.file, 'ANIMINFO', SEQUENCE, len(sequences))
+            sequences.astype(SEQUENCE, copy=False).tofile(self.file)
+            # Sizes are known from the sequences up front, so the key chunk can be streamed.
+            write_chunk_header(self.file, 'ANIMKEYS', KEY, self.key_count)
+        except BaseException:
+            self.file.close()
+            raise
+
+    def write_keys(self, keys: np.ndarray) -> None:
+        if self.keys_written + len(keys) > self.key_count:
+            raise PsaError(f'More keys written to {self.filepath} than its sequences hold')
+
+        keys.astype(KEY, copy=False).tofile(self.file)
+        self.keys_written += len(keys)
+
+    def close(self) -> None:
+        self.file.close()
+
+        if self.keys_written != self.key_count:
+            raise PsaError(f'{self.filepath} is incomplete: {self.keys_written} of {self.key_count} keys written')
+
+    def __enter__(self) -> 'PsaWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
@@ -0,0 +1,98 @@
+from bpy.types import Action, Object, PoseBone
+from typing import Any
+
+
+# Pose bones carry {property: value} to set while baking. Actions can carry {bone: {property: value}} overrides.
+AUTOPROP_PROPERTY = '_autoprop'
+
+
+def index_autoprops(object: Object) -> dict[str, dict[str, Any]]:
+    "Automated properties of every pose bone that has any, by bone name"
+    autoprops = {}
+
+    for pose_bone in object.pose.bones:
+        autoprop_dict = pose_bone.get(AUTOPROP_PROPERTY)
+        if autoprop_dict is not None:
+            autoprops[pose_bone.name] = autoprop_dict.to_dict()
+
+    return autoprops
+
+
+def get_action_autoprops(action: Action) -> dict[str, dict[str, Any]]:
+    autoprop_dict = action.get(AUTOPROP_PROPERTY)
+    return autoprop_dict.to_dict() if autoprop_dict is not None else {}
+
+
+class PropertyAutomation:
+    "Sets the automated properties of a rig while baking and always puts the original values back on exit"
+
+    def __init__(self, object: Object):
+        self.object = object
+        self.autoprops = index_autoprops(object)
+        self.pose_bones: dict[str, PoseBone] = {name: object.pose.bones[name] for name in self.autoprops}
+
+        # Original values by (bone name, property), for everything currently overridden.
+        self.original_values: dict[tuple[str, str], Any] = {}
+        self.has_action_overrides = False
+
+    def __enter__(self) -> 'PropertyAutomation':
+        # `__exit__` only runs once this returns, values set before a failing one are put back here.
+        try:
+            self.apply(self.autoprops)
+        except Exception:
+            self.restore()
+            raise
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.restore()
+
+    def get_pose_bone(self, name: str) -> PoseBone | None:
+        try:
+            return self.pose_bones[name]
+        except KeyError:
+            pose_bone = self.pose_bones[name] = self.object.pose.bones.get(name)
+            return pose_bone
+
+    def apply(self, autoprops: dict[str, dict[str, Any]]) -> None:
+        for bone_name, values in autoprops.items():
+            pose_bone = self.get_pose_bone(bone_name)
+            if pose_bone is None:
+                print(f'Auto-prop failed: no bone {bone_name}')
+                continue
+
+            for key, value in values.items():
+                if key not in pose_bone:
+                    print(f'Auto-prop failed: no property {key} on bone {bone_name}')
+                    continue
+
+                if value != pose_bone[key]:
+                    print(f'Auto-prop: Setting {key} to {value} on bone {bone_name}')
+                    self.original_values.setdefault((bone_name, key), pose_bone[key])
+                    pose_bone[key] = value
+
+    def apply_action(self, action: Action) -> None:
+        "Switch to the rig's automated properties with the action's overrides on top"
+        action_autoprops = get_action_autoprops(action)
+        if not action_autoprops and not self.has_action_overrides:
+            return
+
+        autoprops = {name: values.copy() for name, values in self.autoprops.items()}
+        for bone_name, values in action_autoprops.items():
+            autoprops.setdefault(bone_name, {}).update(values)
+
+        # Overrides of the previous action that this one does not set go back to their original value.
+        for bone_name, key in list(self.original_values):
+            if key not in autoprops.get(bone_name, {}):
+                self.pose_bones[bone_name][key] = self.original_values.pop((bone_name, key))
+
+        self.apply(autoprops)
+        self.has_action_overrides = bool(action_autoprops)
+
+    def restore(self) -> None:
+        for (bone_name, key), value in self.original_values.items():
+            self.pose_bones[bone_name][key] = value
+
+        self.original_values.clear()
+        self.has_action_overrides = False
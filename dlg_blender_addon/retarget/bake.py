@@ -0,0 +1,592 @@
+import bpy
+import numpy as np
+from bpy.types import Action, Object, PoseBone, Scene, FCurve, bpy_prop_collection
+
+from collections.abc import Sequence
+from dataclasses import dataclass
+from math import pi
+from time import perf_counter
+from typing import TYPE_CHECKING
+
+from ..instrument import record, timed
+
+if TYPE_CHECKING:
+    from .reduce import CurveReducer, ReductionStats
+
+
+# Axis permutation and parity for each euler order (mirrors Blender's rotation order table).
+EULER_ORDERS: dict[str, tuple[tuple[int, int, int], bool]] = {
+    'XYZ': ((0, 1, 2), False),
+    'XZY': ((0, 2, 1), True),
+    'YXZ': ((1, 0, 2), True),
+    'YZX': ((1, 2, 0), False),
+    'ZXY': ((2, 0, 1), False),
+    'ZYX': ((2, 1, 0), True),
+}
+
+# Same threshold `bpy.ops.nla.bake` uses when cleaning curves.
+CLEAN_THRESHOLD = 0.0001
+
+# Enum value of 'LINEAR' keyframe interpolation, for `foreach_set`.
+INTERPOLATION_LINEAR = 1
+
+# B-Bone properties `bpy.ops.nla.bake` keys on segmented bones, with their array length, in its order.
+BBONE_PROPERTIES = (
+    ('bbone_curveinx', 1), ('bbone_curveoutx', 1),
+    ('bbone_curveinz', 1), ('bbone_curveoutz', 1),
+    ('bbone_rollin', 1), ('bbone_rollout', 1),
+    ('bbone_scalein', 3), ('bbone_scaleout', 3),
+    ('bbone_easein', 1), ('bbone_easeout', 1),
+)
+
+# Action group `bpy.ops.nla.bake` puts the keys of the armature object's custom properties in.
+OBJECT_PROPERTIES_GROUP = 'Armature Custom Properties'
+
+
+def get_active_fcurves(object: Object) -> bpy_prop_collection:
+    "Return the F-Curve collection that keys of the object's active action (and slot) are written to"
+    anim_data = object.animation_data
+    action = anim_data.action
+
+    if getattr(anim_data, 'action_slot', None) is not None:
+        from bpy_extras.anim_utils import action_ensure_channelbag_for_slot
+        return action_ensure_channelbag_for_slot(action, anim_data.action_slot).fcurves
+
+    return action.fcurves
+
+
+def get_action_fcurve_collections(action: Action) -> list[bpy_prop_collection]:
+    "F-Curve collections of an action: one per layer, strip and slot, or the legacy action.fcurves"
+    if not hasattr(action, 'layers'):
+        return [action.fcurves]
+
+    return [channelbag.fcurves
+            for layer in action.layers
+            for strip in layer.strips
+            for channelbag in strip.channelbags]
+
+
+def get_action_fcurves(action: Action) -> list[FCurve]:
+    "All F-Curves of an action, across every layer, strip and slot"
+    return [fcurve for fcurves in get_action_fcurve_collections(action) for fcurve in fcurves]
+
+
+def ensure_fcurve(fcurves: bpy_prop_collection, data_path: str, index: int, group_name: str) -> FCurve:
+    if hasattr(fcurves, 'ensure'):
+        return fcurves.ensure(data_path, index=index, group_name=group_name)
+
+    fcurve = fcurves.find(data_path, index=index)
+    if fcurve is None:
+        fcurve = fcurves.new(data_path, index=index, action_group=group_name)
+
+    return fcurve
+
+
+def write_fcurve(fcurve: FCurve, frames: np.ndarray, values: np.ndarray, linear: bool = False) -> None:
+    "Replace all keyframes of the F-Curve in one bulk call"
+    co = np.empty((len(frames), 2), dtype=np.float32)
+    co[:, 0] = frames
+    co[:, 1] = values
+
+    keyframe_points = fcurve.keyframe_points
+    keyframe_points.clear()
+    keyframe_points.add(len(co))
+    keyframe_points.foreach_set('co', co.ravel())
+
+    if linear:
+        keyframe_points.foreach_set('interpolation', np.full(len(co), INTERPOLATION_LINEAR, dtype=np.int32))
+
+    fcurve.update()
+
+
+def write_fcurves(fcurves: Sequence[FCurve], frames: np.ndarray, values: np.ndarray, linear: bool = False,
+                  keys_exist: bool = False) -> None:
+    "Replace all keyframes of each F-Curve with its column of the (frames, curves) values. Keys are laid out in one buffer"
+    co = np.empty((len(fcurves), len(frames), 2), dtype=np.float32)
+    co[:, :, 0] = frames
+    co[:, :, 1] = values.T
+    co = co.reshape(len(fcurves), -1)
+
+    interpolation = np.full(len(frames), INTERPOLATION_LINEAR, dtype=np.int32) if linear else None
+
+    for fcurve, fcurve_co in zip(fcurves, co):
+        keyframe_points = fcurve.keyframe_points
+
+        # Curves copied from ones written the same way already hold the keys, only their coordinates change.
+        if not keys_exist:
+            keyframe_points.clear()
+            keyframe_points.add(len(frames))
+
+        keyframe_points.foreach_set('co', fcurve_co)
+
+        if interpolation is not None and not keys_exist:
+            keyframe_points.foreach_set('interpolation', interpolation)
+
+        fcurve.update()
+
+
+def get_bone_prefix(data_path: str) -> str | None:
+    "The `pose.bones[\"name\"]` part of an F-Curve data path, if it animates a pose bone"
+    if not data_path.startswith('pose.bones["'):
+        return None
+
+    end = data_path.find('"]')
+    return data_path[:end + 2] if end >= 0 else None
+
+
+def clean_mask(values: np.ndarray, threshold: float = CLEAN_THRESHOLD) -> np.ndarray:
+    "Mask of keys to keep. Drops interior keys equal to the last kept key and the next key, like `bpy.ops.nla.bake` cleaning does"
+    keep = np.ones(len(values), dtype=bool)
+    if len(values) <= 2:
+        return keep
+
+    # Compared as stored in the keys.
+    values = np.asarray(values, dtype=np.float32).astype(np.float64)
+    next_difference = np.abs(values[1:-1] - values[2:])
+
+    # Only keys close to their next key can go. Every other key is kept, so the last kept key before a candidate
+    # is its direct neighbour unless that neighbour was a candidate dropped as well.
+    last_kept = 0
+    for i in (np.flatnonzero(next_difference < threshold) + 1).tolist():
+        if keep[i - 1]:
+            last_kept = i - 1
+        if abs(values[i] - values[last_kept]) + next_difference[i - 1] < threshold:
+            keep[i] = False
+
+    return keep
+
+
+def has_standard_inheritance(pose_bone: PoseBone) -> bool:
+    "Whether the bone's local transform follows directly from its own and its parent's pose matrices"
+    bone = pose_bone.bone
+    return bone.use_inherit_rotation and bone.inherit_scale == 'FULL' and bone.use_local_location
+
+
+def decompose(matrices: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    "Split 4x4 matrices into location, normalized rotation matrix and scale"
+    location = matrices[..., :3, 3]
+    rotation = matrices[..., :3, :3].copy()
+    scale = np.linalg.norm(rotation, axis=-2)
+    rotation /= np.where(scale == 0.0, 1.0, scale)[..., None, :]
+
+    negative = np.linalg.det(rotation) < 0.0
+    rotation[negative] *= -1.0
+    scale[negative] *= -1.0
+
+    return location, rotation, scale
+
+
+def matrix_to_quaternion(rotation: np.ndarray) -> np.ndarray:
+    "Convert normalized 3x3 rotation matrices to (w, x, y, z) quaternions with non-negative w"
+    r = rotation
+    trace = r[..., 0, 0] + r[..., 1, 1] + r[..., 2, 2]
+
+    candidates = np.empty((4,) + trace.shape + (4,))
+
+    s = 2.0 * np.sqrt(np.maximum(1.0 + trace, 1e-12))
+    candidates[0] = np.stack((0.25 * s, (r[..., 2, 1] - r[..., 1, 2]) / s,
+                              (r[..., 0, 2] - r[..., 2, 0]) / s, (r[..., 1, 0] - r[..., 0, 1]) / s), axis=-1)
+    s = 2.0 * np.sqrt(np.maximum(1.0 + r[..., 0, 0] - r[..., 1, 1] - r[..., 2, 2], 1e-12))
+    candidates[1] = np.stack(((r[..., 2, 1] - r[..., 1, 2]) / s, 0.25 * s,
+                              (r[..., 0, 1] + r[..., 1, 0]) / s, (r[..., 0, 2] + r[..., 2, 0]) / s), axis=-1)
+    s = 2.0 * np.sqrt(np.maximum(1.0 + r[..., 1, 1] - r[..., 0, 0] - r[..., 2, 2], 1e-12))
+    candidates[2] = np.stack(((r[..., 0, 2] - r[..., 2, 0]) / s, (r[..., 0, 1] + r[..., 1, 0]) / s,
+                              0.25 * s, (r[..., 1, 2] + r[..., 2, 1]) / s), axis=-1)
+    s = 2.0 * np.sqrt(np.maximum(1.0 + r[..., 2, 2] - r[..., 0, 0] - r[..., 1, 1], 1e-12))
+    candidates[3] = np.stack(((r[..., 1, 0] - r[..., 0, 1]) / s, (r[..., 0, 2] + r[..., 2, 0]) / s,
+                              (r[..., 1, 2] + r[..., 2, 1]) / s, 0.25 * s), axis=-1)
+
+    diagonal = np.stack((r[..., 0, 0], r[..., 1, 1], r[..., 2, 2]), axis=-1)
+    branch = np.where(trace > 0.0, 0, np.argmax(diagonal, axis=-1) + 1)
+    quaternion = np.select([(branch == n)[..., None] for n in range(4)], list(candidates))
+
+    quaternion /= np.linalg.norm(quaternion, axis=-1, keepdims=True)
+    quaternion[quaternion[..., 0] < 0.0] *= -1.0
+
+    return quaternion
+
+
+def make_quaternions_compatible(quaternions: np.ndarray) -> np.ndarray:
+    "Flip quaternion signs along the first (frame) axis so neighbouring frames interpolate the short way"
+    if len(quaternions) < 2:
+        return quaternions
+
+    dots = np.sum(quaternions[1:] * quaternions[:-1], axis=-1)
+    signs = np.ones(quaternions.shape[:-1])
+    signs[1:] = np.cumprod(np.where(dots < 0.0, -1.0, 1.0), axis=0)
+
+    return quaternions * signs[..., None]
+
+
+def quaternion_multiply(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    "Hamilton product of (w, x, y, z) quaternions, broadcasting like `a @ b`"
+    aw, ax, ay, az = np.moveaxis(a, -1, 0)
+    bw, bx, by, bz = np.moveaxis(b, -1, 0)
+
+    return np.stack((aw * bw - ax * bx - ay * by - az * bz,
+                     aw * bx + ax * bw + ay * bz - az * by,
+                     aw * by - ax * bz + ay * bw + az * bx,
+                     aw * bz + ax * by - ay * bx + az * bw), axis=-1)
+
+
+def quaternion_conjugate(quaternions: np.ndarray) -> np.ndarray:
+    return quaternions * np.array([1.0, -1.0, -1.0, -1.0], dtype=quaternions.dtype)
+
+
+def quaternion_rotate(quaternions: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+    "Rotate vectors by unit quaternions"
+    w = quaternions[..., :1]
+    axis = quaternions[..., 1:]
+    t = 2.0 * np.cross(axis, vectors)
+
+    return vectors + w * t + np.cross(axis, t)
+
+
+def quaternion_to_matrix(quaternions: np.ndarray) -> np.ndarray:
+    "Convert (w, x, y, z) quaternions to 3x3 rotation matrices. Quaternions are normalized first, like pose bones do"
+    q = quaternions / np.linalg.norm(quaternions, axis=-1, keepdims=True)
+    w, x, y, z = np.moveaxis(q, -1, 0)
+
+    return np.stack((np.stack((1 - 2 * (y * y + z * z), 2 * (x * y - w * z), 2 * (x * z + w * y)), axis=-1),
+                     np.stack((2 * (x * y + w * z), 1 - 2 * (x * x + z * z), 2 * (y * z - w * x)), axis=-1),
+                     np.stack((2 * (x * z - w * y), 2 * (y * z + w * x), 1 - 2 * (x * x + y * y)), axis=-1)),
+                    axis=-2)
+
+
+def axis_angle_to_quaternion(axis_angles: np.ndarray) -> np.ndarray:
+    "Convert (angle, x, y, z) axis-angle to (w, x, y, z) quaternions. A zero axis is no rotation"
+    angle = axis_angles[..., :1]
+    axis = axis_angles[..., 1:]
+    length = np.linalg.norm(axis, axis=-1, keepdims=True)
+    axis = np.where(length > 0.0, axis / np.where(length > 0.0, length, 1.0), 0.0)
+    angle = np.where(length > 0.0, angle, 0.0)
+
+    return np.concatenate((np.cos(angle / 2), np.sin(angle / 2) * axis), axis=-1)
+
+
+def euler_to_matrix(euler: np.ndarray, order: str) -> np.ndarray:
+    "Convert euler angles (x, y, z) to 3x3 rotation matrices. The first axis of the order is applied first"
+    matrices = np.broadcast_to(np.identity(3), euler.shape[:-1] + (3, 3))
+
+    for axis in 'XYZ'.index(order[0]), 'XYZ'.index(order[1]), 'XYZ'.index(order[2]):
+        cosine, sine = np.cos(euler[..., axis]), np.sin(euler[..., axis])
+        i, j = (axis + 1) % 3, (axis + 2) % 3
+
+        rotation = np.zeros(euler.shape[:-1] + (3, 3))
+        rotation[..., axis, axis] = 1.0
+        rotation[..., i, i] = cosine
+        rotation[..., i, j] = -sine
+        rotation[..., j, i] = sine
+        rotation[..., j, j] = cosine
+
+        matrices = rotation @ matrices
+
+    return matrices
+
+
+def compose(location: np.ndarray, rotation: np.ndarray, scale: np.ndarray) -> np.ndarray:
+    "Build 4x4 matrices from location, 3x3 rotation matrix and scale. Inverse of `decompose`"
+    matrices = np.zeros(location.shape[:-1] + (4, 4))
+    matrices[..., :3, :3] = rotation * scale[..., None, :]
+    matrices[..., :3, 3] = location
+    matrices[..., 3, 3] = 1.0
+
+    return matrices
+
+
+def quaternion_to_axis_angle(quaternions: np.ndarray) -> np.ndarray:
+    "Convert (w, x, y, z) quaternions to (angle, x, y, z) axis-angle"
+    half_angle = np.arccos(np.clip(quaternions[..., 0], -1.0, 1.0))
+    sine = np.sin(half_angle)
+    sine = np.where(np.abs(sine) < np.finfo(np.float32).eps, 1.0, sine)
+
+    axis = quaternions[..., 1:] / sine[..., None]
+    axis[np.all(axis == 0.0, axis=-1), 1] = 1.0
+
+    return np.concatenate((2.0 * half_angle[..., None], axis), axis=-1)
+
+
+def matrix_to_euler_pair(rotation: np.ndarray, order: str) -> tuple[np.ndarray, np.ndarray]:
+    "Both euler solutions of normalized rotation matrices, as Blender computes them"
+    (i, j, k), parity = EULER_ORDERS[order]
+    r = rotation
+
+    cy = np.hypot(r[..., i, i], r[..., j, i])
+    degenerate = cy <= 16.0 * np.finfo(np.float32).eps
+
+    euler1 = np.empty(r.shape[:-2] + (3,))
+    euler2 = np.empty_like(euler1)
+
+    euler1[..., i] = np.where(degenerate, np.arctan2(-r[..., j, k], r[..., j, j]), np.arctan2(r[..., k, j], r[..., k, k]))
+    euler1[..., j] = np.arctan2(-r[..., k, i], cy)
+    euler1[..., k] = np.where(degenerate, 0.0, np.arctan2(r[..., j, i], r[..., i, i]))
+
+    euler2[..., i] = np.where(degenerate, euler1[..., i], np.arctan2(-r[..., k, j], -r[..., k, k]))
+    euler2[..., j] = np.where(degenerate, euler1[..., j], np.arctan2(-r[..., k, i], -cy))
+    euler2[..., k] = np.where(degenerate, 0.0, np.arctan2(-r[..., j, i], -r[..., i, i]))
+
+    if parity:
+        euler1 = -euler1
+        euler2 = -euler2
+
+    return euler1, euler2
+
+
+def make_euler_compatible(euler: np.ndarray, previous: np.ndarray) -> np.ndarray:
+    "Vectorized counterpart of Blender's `compatible_eul`"
+    euler = euler.copy()
+    delta = euler - previous
+
+    wrap = np.abs(delta) > 5.1
+    euler -= np.where(wrap, np.sign(delta) * np.floor(np.abs(delta) / (2.0 * pi) + 0.5) * 2.0 * pi, 0.0)
+    delta = euler - previous
+
+    large = np.abs(delta) > 3.2
+    small = np.abs(delta) < 1.6
+    for axis in range(3):
+        others = [a for a in range(3) if a != axis]
+        flip = large[..., axis] & small[..., others[0]] & small[..., others[1]]
+        euler[..., axis] -= np.where(flip, np.sign(delta[..., axis]) * 2.0 * pi, 0.0)
+
+    return euler
+
+
+def matrix_to_compatible_euler(rotation: np.ndarray, order: str) -> np.ndarray:
+    "Convert (frames, bones, 3, 3) rotation matrices to eulers that stay continuous along the frame axis"
+    euler1, euler2 = matrix_to_euler_pair(rotation, order)
+    result = np.empty_like(euler1)
+
+    use_second = np.sum(np.abs(euler1[0]), axis=-1) > np.sum(np.abs(euler2[0]), axis=-1)
+    result[0] = np.where(use_second[..., None], euler2[0], euler1[0])
+
+    for frame in range(1, len(result)):
+        previous = result[frame - 1]
+        candidate1 = make_euler_compatible(euler1[frame], previous)
+        candidate2 = make_euler_compatible(euler2[frame], previous)
+        distance1 = np.sum(np.abs(candidate1 - previous), axis=-1)
+        distance2 = np.sum(np.abs(candidate2 - previous), axis=-1)
+        result[frame] = np.where((distance1 > distance2)[..., None], candidate2, candidate1)
+
+    return result
+
+
+@dataclass
+class PropertyChannel:
+    "A property keyed along with the transforms: a custom property or a B-Bone property"
+    owner: Object | PoseBone
+    name: str
+    is_custom: bool
+    data_path: str
+    size: int
+    group: str
+
+    def read(self) -> list[float]:
+        value = self.owner[self.name] if self.is_custom else getattr(self.owner, self.name)
+        return list(value) if self.size > 1 else [value]
+
+
+def get_custom_property_channels(owner: Object | PoseBone, group: str) -> list[PropertyChannel]:
+    "Custom properties `bpy.ops.nla.bake` keys on the object or pose bone: animatable numbers, with the paths it uses"
+    rna_properties = owner.bl_rna.properties
+    # Pose bone paths start at the object, custom property paths of the object itself are relative to it.
+    prefix = owner.path_from_id() if isinstance(owner, PoseBone) else ''
+    channels = []
+
+    for key, value in owner.items():
+        # Strings, arrays and groups can't be keyed.
+        if not isinstance(value, (int, float)):
+            continue
+
+        rna_property = rna_properties.get(key)
+        if rna_property is not None and not rna_property.is_animatable:
+            continue
+
+        # A custom property sharing its name with a registered property is keyed through that property.
+        if rna_property is not None and rna_property.is_runtime:
+            data_path = f'{prefix}.{key}' if prefix else key
+        else:
+            data_path = f'{prefix}["{bpy.utils.escape_identifier(key)}"]'
+
+        channels.append(PropertyChannel(owner, key, True, data_path, 1, group))
+
+    return channels
+
+
+def get_property_channels(object: Object, pose_bones: Sequence[PoseBone]) -> list[PropertyChannel]:
+    "Everything `bpy.ops.nla.bake` keys for the baked pose bones besides their transforms"
+    channels = get_custom_property_channels(object, OBJECT_PROPERTIES_GROUP) if object.type == 'ARMATURE' else []
+
+    for pose_bone in pose_bones:
+        if pose_bone.bone.bbone_segments > 1:
+            channels.extend(PropertyChannel(pose_bone, name, False, pose_bone.path_from_id(name), size, pose_bone.name)
+                            for name, size in BBONE_PROPERTIES)
+
+        channels.extend(get_custom_property_channels(pose_bone, pose_bone.name))
+
+    return channels
+
+
+class NativeBaker:
+    "Bakes visual transforms of a fixed set of pose bones into the object's active action without `bpy.ops.nla.bake`"
+
+    def __init__(self, object: Object, pose_bones: Sequence[PoseBone]):
+        self.object = object
+        self.pose_bones = list(pose_bones)
+
+        pose_indices = {pose_bone.name: i for i, pose_bone in enumerate(object.pose.bones)}
+        self.pose_bone_count = len(pose_indices)
+
+        self.indices = np.array([pose_indices[pb.name] for pb in self.pose_bones], dtype=np.int64)
+        self.parent_indices = np.array([pose_indices[pb.parent.name] if pb.parent else -1 for pb in self.pose_bones],
+                                       dtype=np.int64)
+
+        # Rest offset of each bone relative to its parent (or armature space for root bones).
+        self.rest_offsets = np.empty((len(self.pose_bones), 4, 4))
+        for i, pose_bone in enumerate(self.pose_bones):
+            rest = np.array(pose_bone.bone.matrix_local)
+            if pose_bone.parent:
+                rest = np.linalg.inv(np.array(pose_bone.parent.bone.matrix_local)) @ rest
+            self.rest_offsets[i] = rest
+
+        # Bones with non-default inheritance go through `convert_space`, like visual keying does.
+        self.fallback_bones = [(i, pb) for i, pb in enumerate(self.pose_bones) if not has_standard_inheritance(pb)]
+
+        self._pose_buffer = np.empty(self.pose_bone_count * 16, dtype=np.float32)
+
+        # Custom and B-Bone properties are keyed from their value at each frame, like `bpy.ops.nla.bake` does.
+        self.properties = get_property_channels(object, self.pose_bones)
+        self.property_size = sum(channel.size for channel in self.properties)
+
+    def read_properties(self) -> list[float]:
+        "Current values of the property channels, one column per array element"
+        return [value for channel in self.properties for value in channel.read()]
+
+    def sample(self, scene: Scene, frames: Sequence[int]) -> tuple[np.ndarray, np.ndarray]:
+        "Step through the frames and return the (frames, bones, 4, 4) local matrices and (frames, columns) property values"
+        bone_count = len(self.pose_bones)
+        pose_matrices = np.empty((len(frames), bone_count, 4, 4), dtype=np.float32)
+        parent_matrices = np.empty_like(pose_matrices)
+        fallback_matrices = np.empty((len(frames), len(self.fallback_bones), 4, 4), dtype=np.float32)
+        property_values = np.empty((len(frames), self.property_size))
+
+        has_parent = self.parent_indices >= 0
+        parent_indices = np.where(has_parent, self.parent_indices, 0)
+        pose_bones = self.object.pose.bones
+
+        for f, frame in enumerate(frames):
+            scene.frame_set(frame)
+
+            # RNA stores matrices column-major, hence the transpose.
+            pose_bones.foreach_get('matrix', self._pose_buffer)
+            all_matrices = self._pose_buffer.reshape(self.pose_bone_count, 4, 4).transpose(0, 2, 1)
+
+            pose_matrices[f] = all_matrices[self.indices]
+            parent_matrices[f] = all_matrices[parent_indices]
+
+            for n, (_, pose_bone) in enumerate(self.fallback_bones):
+                fallback_matrices[f, n] = self.object.convert_space(pose_bone=pose_bone,
+                                                                    matrix=pose_bone.matrix,
+                                                                    from_space='POSE',
+                                                                    to_space='LOCAL')
+
+            if self.properties:
+                property_values[f] = self.read_properties()
+
+        parent_space = np.where(has_parent[None, :, None, None], parent_matrices, np.identity(4)) @ self.rest_offsets
+        local_matrices = np.linalg.inv(parent_space) @ pose_matrices
+
+        for n, (i, _) in enumerate(self.fallback_bones):
+            local_matrices[:, i] = fallback_matrices[:, n]
+
+        return local_matrices, property_values
+
+    def write(self, frames: Sequence[int], local_matrices: np.ndarray, property_values: np.ndarray | None = None,
+              clean_curves: bool = True, reducer: 'CurveReducer | None' = None, stats: 'ReductionStats | None' = None,
+              label: str = '') -> None:
+        "Write the sampled local transforms and property values of the baked bones as F-Curves of the active action"
+        write_start = perf_counter()
+        clean_time = 0.0
+
+        fcurves = get_active_fcurves(self.object)
+        frames = np.asarray(frames, dtype=np.float64)
+
+        location, rotation, scale = decompose(local_matrices)
+        rotation_modes = [pose_bone.rotation_mode for pose_bone in self.pose_bones]
+        rotations: dict[str, np.ndarray] = {}
+
+        if 'QUATERNION' in rotation_modes or 'AXIS_ANGLE' in rotation_modes:
+            rotations['QUATERNION'] = make_quaternions_compatible(matrix_to_quaternion(rotation))
+
+            if 'AXIS_ANGLE' in rotation_modes:
+                rotations['AXIS_ANGLE'] = quaternion_to_axis_angle(matrix_to_quaternion(rotation))
+
+        for order in EULER_ORDERS:
+            if order in rotation_modes:
+                rotations[order] = matrix_to_compatible_euler(rotation, order)
+
+        for i, pose_bone in enumerate(self.pose_bones):
+            rotation_mode = rotation_modes[i]
+            rotation_path = {
+                'QUATERNION': 'rotation_quaternion',
+                'AXIS_ANGLE': 'rotation_axis_angle'
+            }.get(rotation_mode, 'rotation_euler')
+
+            channels = (('location', location[:, i]),
+                        (rotation_path, rotations[rotation_mode][:, i]),
+                        ('scale', scale[:, i]))
+
+            for channel, values in channels:
+                data_path = pose_bone.path_from_id(channel)
+
+                for index in range(values.shape[-1]):
+                    clean_time += self.write_channel(fcurves, data_path, index, pose_bone.name, frames, values[:, index],
+                                                     clean_curves, reducer, stats)
+
+        if property_values is not None:
+            column = 0
+            for channel in self.properties:
+                for index in range(channel.size):
+                    clean_time += self.write_channel(fcurves, channel.data_path, index, channel.group, frames,
+                                                     property_values[:, column], clean_curves, reducer, stats)
+                    column += 1
+
+        record('bake', 'cleaning', clean_time, label)
+        record('bake', 'keying', perf_counter() - write_start - clean_time, label)
+
+    @staticmethod
+    def write_channel(fcurves: bpy_prop_collection, data_path: str, index: int, group: str, frames: np.ndarray,
+                      values: np.ndarray, clean_curves: bool, reducer: 'CurveReducer | None',
+                      stats: 'ReductionStats | None') -> float:
+        "Write the sampled values of one F-Curve. Returns the time spent cleaning or reducing"
+        clean_start = perf_counter()
+        if reducer is not None:
+            keep = reducer.reduce(data_path, frames, values, stats)
+        elif clean_curves:
+            keep = clean_mask(values)
+        else:
+            keep = slice(None)
+        clean_time = perf_counter() - clean_start
+
+        fcurve = ensure_fcurve(fcurves, data_path, index, group)
+        write_fcurve(fcurve, frames[keep], values[keep], linear=reducer is not None)
+
+        return clean_time
+
+    def bake(self, scene: Scene, frame_start: int, frame_end: int, clean_curves: bool = True,
+             reducer: 'CurveReducer | None' = None, stats: 'ReductionStats | None' = None, label: str = '') -> None:
+        "Bake the frame range. With a reducer, keys are reduced within its tolerances instead of cleaned"
+        frame_original = scene.frame_current, scene.frame_subframe
+        frames = range(frame_start, frame_end + 1)
+
+        try:
+            sample_start = perf_counter()
+            local_matrices, property_values = self.sample(scene, frames)
+            sample_time = perf_counter() - sample_start
+
+            record('bake', 'depsgraph step', sample_time, label)
+            record('bake', 'frame step', sample_time / len(frames), label)
+        finally:
+            with timed('bake', 'restore', label):
+                scene.frame_set(frame_original[0], subframe=frame_original[1])
+
+        self.write(frames, local_matrices, property_values, clean_curves, reducer, stats, label)
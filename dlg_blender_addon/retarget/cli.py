@@ -0,0 +1,219 @@
+"""
+Headless batch retarget.
+
+Usage:
+    blender -b --python dlg_blender_addon/retarget/cli.py -- FILES... --source ARMATURE [options]
+
+FILES may be .blend files, directories (searched recursively) or glob patterns. Each file is opened, the actions
+matching --filter are retargeted with the same pipeline as the Retarget button and the file is saved (in place, or
+into --output-dir). Exits with 0 when every file succeeded, 1 when any file failed and 2 on invalid arguments.
+"""
+
+import bpy
+from bpy.types import Context
+
+import argparse
+import os
+import sys
+import traceback
+from glob import glob
+from time import perf_counter
+
+from collections.abc import Sequence
+
+
+EXIT_OK = 0
+EXIT_FAILED = 1
+EXIT_USAGE = 2
+
+
+class RetargetError(Exception):
+    pass
+
+
+def parse_args(argv: Sequence[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog='blender -b --python cli.py --',
+                                     description='Retarget actions in .blend files without the UI')
+    parser.add_argument('files', nargs='+',
+                        help='.blend files, directories or glob patterns')
+    parser.add_argument('--source', required=True,
+                        help='Name of the source armature object')
+    parser.add_argument('--target',
+                        help='Name of the target armature object (default: active object of the file)')
+    parser.add_argument('--bone-collection', default='RETARGET',
+                        help='Bone collection on the target armature to bake (default: %(default)s)')
+    parser.add_argument('--filter', default='',
+                        help='Only retarget actions matching this name (use \'*\' as wildcard)')
+    parser.add_argument('--invert-filter', action='store_true',
+                        help='Retarget the actions that do not match --filter instead')
+    parser.add_argument('--engine', choices=('NATIVE', 'DIRECT', 'OPERATOR'), default='NATIVE',
+                        help='Bake engine (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Bake in this many background Blender processes per file (default: %(default)s)')
+    parser.add_argument('--force', action='store_true',
+                        help='Bake all matching actions, even those unchanged since they were last retargeted')
+    parser.add_argument('--output-dir',
+                        help='Save results into this directory instead of overwriting the input files')
+    parser.add_argument('--stream-dir',
+                        help='Write every baked action to its own .blend library in this directory as soon as it is baked')
+    parser.add_argument('--stream-remove', action='store_true',
+                        help='With --stream-dir, remove written actions from the file to keep memory use flat')
+    parser.add_argument('--source-cache',
+                        help='With --engine DIRECT, keep sampled source poses in this directory and reuse them across runs and rigs')
+    parser.add_argument('--no-isolate', action='store_true',
+                        help='Evaluate the whole scene while baking instead of only the source and target rigs')
+    parser.add_argument('--verbose', action='store_true',
+                        help='Print the traceback of every failed file, not only of unexpected errors')
+
+    return parser.parse_args(argv)
+
+
+def get_script_args() -> list[str]:
+    "Arguments after the '--' separator, which Blender leaves for the script"
+    try:
+        return sys.argv[sys.argv.index('--') + 1:]
+    except ValueError:
+        return []
+
+
+def collect_blend_files(patterns: Sequence[str]) -> list[str]:
+    filepaths: list[str] = []
+
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = glob(os.path.join(pattern, '**', '*.blend'), recursive=True)
+        else:
+            matches = glob(pattern, recursive=True)
+
+        filepaths.extend(sorted(os.path.abspath(path) for path in matches if path.endswith('.blend')))
+
+    # Keep the order stable but never process a file twice.
+    return list(dict.fromkeys(filepaths))
+
+
+def setup_retarget(context: Context, source_name: str, target_name: str | None, bone_collection: str, engine: str,
+                   skip_unchanged: bool = True, stream_directory: str | None = None,
+                   stream_remove_actions: bool = False, isolate_evaluation: bool = True,
+                   source_cache_directory: str | None = None) -> None:
+    "Point the retarget settings of the open file at the given rig and make the target the active pose object"
+    pg = context.scene.dlg_props
+
+    source_obj = bpy.data.objects.get(source_name)
+    if source_obj is None or source_obj.type != 'ARMATURE':
+        raise RetargetError(f'Source armature "{source_name}" not found')
+
+    target_obj = bpy.data.objects.get(target_name) if target_name else context.view_layer.objects.active
+    if target_obj is None or target_obj.type != 'ARMATURE':
+        raise RetargetError(f'Target armature "{target_name or "<active object>"}" not found')
+
+    if bone_collection not in target_obj.data.collections_all:
+        raise RetargetError(f'Bone collection "{bone_collection}" not found on "{target_obj.name}"')
+
+    pg.source_armature = source_obj
+    pg.target_bone_collection = bone_collection
+    pg.bake_engine = engine
+    pg.skip_unchanged = skip_unchanged
+    pg.isolate_evaluation = isolate_evaluation
+    pg.use_source_cache = bool(source_cache_directory)
+    if source_cache_directory:
+        pg.source_cache_directory = source_cache_directory
+    pg.stream_output = bool(stream_directory)
+    if stream_directory:
+        pg.stream_directory = stream_directory
+        pg.stream_remove_actions = stream_remove_actions
+
+    context.view_layer.objects.active = target_obj
+    if target_obj.mode != 'POSE':
+        bpy.ops.object.mode_set(mode='POSE')
+
+
+def retarget_file(filepath: str, args: argparse.Namespace) -> int:
+    "Open, retarget and save one file. Returns the number of retargeted actions"
+    from . import operators as ops
+
+    bpy.ops.wm.open_mainfile(filepath=filepath)
+
+    context = bpy.context
+    pg = context.scene.dlg_props
+
+    setup_retarget(context, args.source, args.target, args.bone_collection, args.engine, not args.force,
+                   args.stream_dir, args.stream_remove, not args.no_isolate, args.source_cache)
+
+    # Select through the same filter the action list uses, then put the file's own filter back.
+    filter_state = pg.filter_name, pg.use_filter_invert
+    pg.filter_name, pg.use_filter_invert = args.filter, args.invert_filter
+    ops.deselect_all_actions(bpy.data.actions)
+    ops.select_visible_actions(bpy.data.actions)
+    pg.filter_name, pg.use_filter_invert = filter_state
+
+    if args.workers > 1:
+        from .parallel import retarget_selected_actions_parallel
+        action_count = retarget_selected_actions_parallel(context, args.workers)
+    else:
+        action_count = len(ops.retarget_selected_actions().action_times)
+
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+        bpy.ops.wm.save_as_mainfile(filepath=os.path.join(args.output_dir, os.path.basename(filepath)), copy=True)
+    else:
+        bpy.ops.wm.save_mainfile()
+
+    return action_count
+
+
+def main(argv: Sequence[str]) -> int:
+    try:
+        args = parse_args(argv)
+    except SystemExit as e:
+        return EXIT_USAGE if e.code else EXIT_OK
+
+    filepaths = collect_blend_files(args.files)
+    if not filepaths:
+        print('No .blend files found', file=sys.stderr)
+        return EXIT_USAGE
+
+    failed: list[str] = []
+    batch_start = perf_counter()
+
+    for i, filepath in enumerate(filepaths):
+        print(f'[{i + 1}/{len(filepaths)}] {filepath}')
+        file_start = perf_counter()
+
+        try:
+            action_count = retarget_file(filepath, args)
+        except Exception as e:
+            failed.append(filepath)
+            # Setup errors such as a missing armature are explained by their message alone.
+            if args.verbose or not isinstance(e, RetargetError):
+                traceback.print_exc()
+            print(f'FAILED {filepath} after {perf_counter() - file_start:.2f}s: {e}', file=sys.stderr)
+            continue
+
+        print(f'OK {filepath}: {action_count} actions in {perf_counter() - file_start:.2f}s')
+
+    print(f'Processed {len(filepaths)} files in {perf_counter() - batch_start:.2f}s, {len(failed)} failed')
+    for filepath in failed:
+        print(f'  {filepath}', file=sys.stderr)
+
+    return EXIT_FAILED if failed else EXIT_OK
+
+
+def ensure_registered() -> None:
+    "Register the add-on when the script runs in a Blender that does not have it enabled"
+    if not hasattr(bpy.types.Scene, 'dlg_props'):
+        import dlg_blender_addon
+        dlg_blender_addon.register()
+
+
+def run() -> None:
+    "Entry point for `blender -b --python`"
+    ensure_registered()
+    sys.exit(main(get_script_args()))
+
+
+if __name__ == '__main__':
+    # Run as a script: make the add-on importable as a package and hand over to it.
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+    from dlg_blender_addon.retarget import cli
+    cli.run()
@@ -0,0 +1,293 @@
+import numpy as np
+from bpy.types import Action, Constraint, FCurve, Object, PoseBone
+
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from .bake import (INTERPOLATION_LINEAR, axis_angle_to_quaternion, compose, euler_to_matrix, get_active_fcurves,
+                   get_bone_prefix, get_property_channels, has_standard_inheritance, quaternion_to_matrix)
+
+if TYPE_CHECKING:
+    from .posecache import SourcePoseCache
+
+
+def sample_fcurve(fcurve: FCurve, frames: np.ndarray) -> np.ndarray:
+    "Values of the F-Curve at the frames. Frames on keys or linear segments are read from the keys in bulk"
+    keyframe_points = fcurve.keyframe_points
+    key_count = len(keyframe_points)
+
+    if key_count == 0 or len(fcurve.modifiers) or (fcurve.extrapolation != 'CONSTANT' and key_count > 1):
+        return np.array([fcurve.evaluate(frame) for frame in frames])
+
+    co = np.empty(key_count * 2, dtype=np.float32)
+    keyframe_points.foreach_get('co', co)
+    co = co.reshape(-1, 2)
+
+    interpolation = np.empty(key_count, dtype=np.int32)
+    keyframe_points.foreach_get('interpolation', interpolation)
+
+    # np.interp holds the end values, like constant extrapolation.
+    values = np.interp(frames, co[:, 0], co[:, 1])
+
+    if not np.all(interpolation[:-1] == INTERPOLATION_LINEAR):
+        # Curved segments: only frames that land on a key are exact.
+        for i in np.flatnonzero(~np.isin(frames, co[:, 0])):
+            values[i] = fcurve.evaluate(frames[i])
+
+    return values
+
+
+def get_copy_transforms_bone(pose_bone: PoseBone, source_obj: Object) -> tuple[str | None, str]:
+    "Source bone the pose bone copies in world space, or None and why the bone needs the depsgraph"
+    constraints: list[Constraint] = [constraint for constraint in pose_bone.constraints if constraint.enabled]
+
+    if len(constraints) != 1:
+        return None, f'{pose_bone.name} has {len(constraints)} constraints'
+
+    constraint = constraints[0]
+    if constraint.type != 'COPY_TRANSFORMS' or constraint.target != source_obj:
+        return None, f'{pose_bone.name} has a {constraint.type} constraint'
+
+    if (constraint.influence != 1.0 or constraint.mix_mode != 'REPLACE' or constraint.head_tail != 0.0
+            or constraint.target_space != 'WORLD' or constraint.owner_space != 'WORLD'):
+        return None, f'{pose_bone.name} copies transforms with non-default settings'
+
+    if constraint.subtarget not in source_obj.pose.bones:
+        return None, f'{pose_bone.name} copies a missing bone'
+
+    return constraint.subtarget, ''
+
+
+def get_driven_bones(object: Object) -> set[str]:
+    anim_data = object.animation_data
+    if anim_data is None:
+        return set()
+
+    return {get_bone_prefix(driver.data_path) for driver in anim_data.drivers} - {None}
+
+
+def get_rest_offset(pose_bone: PoseBone) -> np.ndarray:
+    rest = np.array(pose_bone.bone.matrix_local)
+    if pose_bone.parent:
+        rest = np.linalg.inv(np.array(pose_bone.parent.bone.matrix_local)) @ rest
+    return rest
+
+
+class DirectSolver:
+    "Computes local transforms of target bones straight from the source action's F-Curves, without evaluating the scene"
+
+    def __init__(self, source_obj: Object, target_obj: Object, pose_bones: Sequence[PoseBone],
+                 source_cache: 'SourcePoseCache | None' = None):
+        self.source_obj = source_obj
+        self.target_obj = target_obj
+        self.pose_bones = list(pose_bones)
+        # With a cache, source poses come from evaluated samples instead of the curves.
+        self.source_cache = source_cache
+        # Reasons the rig needs the depsgraph. The solver is only usable when this stays empty.
+        self.unsupported: list[str] = []
+
+        source_bones = []
+        for pose_bone in self.pose_bones:
+            source_bone, reason = get_copy_transforms_bone(pose_bone, source_obj)
+            source_bones.append(source_bone)
+            if source_bone is None:
+                self.unsupported.append(reason)
+            elif not has_standard_inheritance(pose_bone):
+                self.unsupported.append(f'{pose_bone.name} does not inherit its parent transform fully')
+
+        if self.unsupported:
+            return
+
+        source_indices = {name: i for i, name in enumerate(source_obj.pose.bones.keys())}
+        self.cache_indices = np.array([source_indices[name] for name in source_bones], dtype=np.int64)
+
+        # Mapped source bones and their ancestors, parents first.
+        chain: dict[str, PoseBone] = {}
+        for name in source_bones:
+            source_pose_bone = source_obj.pose.bones[name]
+            for ancestor in reversed([source_pose_bone] + source_pose_bone.parent_recursive):
+                chain.setdefault(ancestor.name, ancestor)
+
+        self.source_chain = list(chain.values())
+        chain_indices = {name: i for i, name in enumerate(chain)}
+        self.source_indices = np.array([chain_indices[name] for name in source_bones], dtype=np.int64)
+
+        # Evaluated samples already include whatever moves the source bones.
+        driven = get_driven_bones(source_obj)
+        for source_pose_bone in self.source_chain if source_cache is None else ():
+            if any(constraint.enabled for constraint in source_pose_bone.constraints):
+                self.unsupported.append(f'Source bone {source_pose_bone.name} has constraints')
+            elif not has_standard_inheritance(source_pose_bone):
+                self.unsupported.append(f'Source bone {source_pose_bone.name} does not inherit its parent transform fully')
+            elif source_pose_bone.path_from_id() in driven:
+                self.unsupported.append(f'Source bone {source_pose_bone.name} has drivers')
+
+        driven = get_driven_bones(target_obj)
+        self.unsupported.extend(f'{pose_bone.name} has drivers'
+                                for pose_bone in self.pose_bones if pose_bone.path_from_id() in driven)
+
+        # Custom and B-Bone properties keyed with the bones are read from the target's curves. Driven bone
+        # properties are covered by the bone check above, driven object properties need the depsgraph too.
+        self.properties = get_property_channels(target_obj, self.pose_bones)
+        anim_data = target_obj.animation_data
+        driven_paths = {driver.data_path for driver in anim_data.drivers} if anim_data is not None else set()
+        self.unsupported.extend(f'Property {channel.name} has drivers' for channel in self.properties
+                                if not isinstance(channel.owner, PoseBone) and channel.data_path in driven_paths)
+
+        # Rest offset of each bone relative to its parent, or armature space for roots.
+        self.source_parents = np.array([chain_indices[pb.parent.name] if pb.parent else -1 for pb in self.source_chain],
+                                       dtype=np.int64)
+        self.source_rest = np.array([get_rest_offset(pose_bone) for pose_bone in self.source_chain])
+
+        target_indices = {pose_bone.name: i for i, pose_bone in enumerate(self.pose_bones)}
+        self.target_parents = np.array([target_indices.get(pb.parent.name, -1) if pb.parent else -1
+                                        for pb in self.pose_bones], dtype=np.int64)
+        self.target_rest = np.array([get_rest_offset(pose_bone) for pose_bone in self.pose_bones])
+
+        # Unbaked ancestors of baked bones, parents first. The action can animate them too, so they are posed
+        # per frame from the target's curves.
+        ancestors: dict[str, PoseBone] = {}
+        for pose_bone in self.pose_bones:
+            for ancestor in reversed(pose_bone.parent_recursive):
+                if ancestor.name not in target_indices:
+                    ancestors.setdefault(ancestor.name, ancestor)
+
+        self.target_ancestors = list(ancestors.values())
+        ancestor_indices = {name: i for i, name in enumerate(ancestors)}
+
+        for ancestor in self.target_ancestors:
+            if any(constraint.enabled for constraint in ancestor.constraints):
+                self.unsupported.append(f'Unbaked parent {ancestor.name} has constraints')
+            elif not has_standard_inheritance(ancestor):
+                self.unsupported.append(f'Unbaked parent {ancestor.name} does not inherit its parent transform fully')
+            elif ancestor.path_from_id() in driven:
+                self.unsupported.append(f'Unbaked parent {ancestor.name} has drivers')
+
+        # Parent of each ancestor in the baked bones and in the ancestors, -1 where it is in neither.
+        self.ancestor_baked_parents = np.array([target_indices.get(pb.parent.name, -1) if pb.parent else -1
+                                                for pb in self.target_ancestors], dtype=np.int64)
+        self.ancestor_parents = np.array([ancestor_indices.get(pb.parent.name, -1) if pb.parent else -1
+                                          for pb in self.target_ancestors], dtype=np.int64)
+        self.ancestor_rest = np.array([get_rest_offset(pose_bone) for pose_bone in self.target_ancestors])
+        # Ancestor each baked bone with an unbaked parent hangs off.
+        self.target_ancestor_parents = np.array([ancestor_indices.get(pb.parent.name, -1) if pb.parent else -1
+                                                 for pb in self.pose_bones], dtype=np.int64)
+
+    def read_channels(self, frames: np.ndarray, object: Object | None = None,
+                      pose_bones: Sequence[PoseBone] | None = None) -> np.ndarray:
+        "(frames, bones, 4, 4) basis matrices of the pose bones, the source chain by default, from the active action"
+        if object is None:
+            object, pose_bones = self.source_obj, self.source_chain
+
+        fcurves = {(fcurve.data_path, fcurve.array_index): fcurve
+                   for fcurve in get_active_fcurves(object) if not fcurve.mute}
+
+        def sample(pose_bone: PoseBone, channel: str, default) -> np.ndarray:
+            data_path = pose_bone.path_from_id(channel)
+            values = np.empty((len(frames), len(default)))
+
+            for index, value in enumerate(default):
+                fcurve = fcurves.get((data_path, index))
+                values[:, index] = sample_fcurve(fcurve, frames) if fcurve is not None else value
+
+            return values
+
+        matrices = np.empty((len(frames), len(pose_bones), 4, 4))
+
+        for i, pose_bone in enumerate(pose_bones):
+            rotation_mode = pose_bone.rotation_mode
+            if rotation_mode == 'QUATERNION':
+                rotation = quaternion_to_matrix(sample(pose_bone, 'rotation_quaternion', pose_bone.rotation_quaternion))
+            elif rotation_mode == 'AXIS_ANGLE':
+                rotation = quaternion_to_matrix(axis_angle_to_quaternion(
+                    sample(pose_bone, 'rotation_axis_angle', pose_bone.rotation_axis_angle)))
+            else:
+                rotation = euler_to_matrix(sample(pose_bone, 'rotation_euler', pose_bone.rotation_euler), rotation_mode)
+
+            matrices[:, i] = compose(sample(pose_bone, 'location', pose_bone.location),
+                                     rotation,
+                                     sample(pose_bone, 'scale', pose_bone.scale))
+
+        return matrices
+
+    def read_properties(self, frames: Sequence[int]) -> np.ndarray:
+        "(frames, columns) values of the property channels from the target's active action, like `NativeBaker.sample` returns"
+        frames = np.asarray(frames, dtype=np.float64)
+        fcurves = {(fcurve.data_path, fcurve.array_index): fcurve
+                   for fcurve in get_active_fcurves(self.target_obj) if not fcurve.mute}
+
+        columns = []
+        for channel in self.properties:
+            for index, value in enumerate(channel.read()):
+                fcurve = fcurves.get((channel.data_path, index))
+                if fcurve is None:
+                    columns.append(np.full(len(frames), float(value)))
+                    continue
+
+                values = sample_fcurve(fcurve, frames)
+                # Curve values are converted the way the animation system writes them to the property.
+                if isinstance(value, bool):
+                    values = (values > 1.0 - np.finfo(np.float32).eps).astype(np.float64)
+                elif isinstance(value, int):
+                    values = np.trunc(values)
+                columns.append(values)
+
+        return np.column_stack(columns) if columns else np.empty((len(frames), 0))
+
+    def solve_source(self, frames: Sequence[int]) -> np.ndarray:
+        "(frames, chain bones, 4, 4) pose matrices of the source chain, by forward kinematics from the curves"
+        basis = self.read_channels(np.asarray(frames, dtype=np.float64))
+
+        # Parents come first, so one pass is enough.
+        source_pose = np.empty_like(basis)
+        for i, parent in enumerate(self.source_parents):
+            parent_space = self.source_rest[i] if parent < 0 else source_pose[:, parent] @ self.source_rest[i]
+            source_pose[:, i] = parent_space @ basis[:, i]
+
+        return source_pose
+
+    def solve_ancestors(self, frames: Sequence[int], target_pose: np.ndarray) -> np.ndarray:
+        "(frames, ancestors, 4, 4) pose matrices of the unbaked ancestors, below baked bones or other ancestors"
+        if not self.target_ancestors:
+            return np.empty((len(frames), 0, 4, 4))
+
+        basis = self.read_channels(np.asarray(frames, dtype=np.float64), self.target_obj, self.target_ancestors)
+
+        ancestor_pose = np.empty_like(basis)
+        for i, (baked_parent, parent) in enumerate(zip(self.ancestor_baked_parents, self.ancestor_parents)):
+            if baked_parent >= 0:
+                parent_space = target_pose[:, baked_parent] @ self.ancestor_rest[i]
+            elif parent >= 0:
+                parent_space = ancestor_pose[:, parent] @ self.ancestor_rest[i]
+            else:
+                parent_space = self.ancestor_rest[i]
+            ancestor_pose[:, i] = parent_space @ basis[:, i]
+
+        return ancestor_pose
+
+    def solve(self, frames: Sequence[int], action: Action) -> np.ndarray:
+        "(frames, bones, 4, 4) local matrices of the target bones, like `NativeBaker.sample` returns"
+        if self.source_cache is not None:
+            source_pose = self.source_cache.get(action, frames)[:, self.cache_indices]
+        else:
+            source_pose = self.solve_source(frames)[:, self.source_indices]
+
+        # Copy Transforms in world space: the target pose is the source pose seen from the target object.
+        offset = np.linalg.inv(np.array(self.target_obj.matrix_world)) @ np.array(self.source_obj.matrix_world)
+        target_pose = offset @ source_pose
+
+        ancestor_pose = self.solve_ancestors(frames, target_pose)
+
+        parent_pose = np.empty_like(target_pose)
+        for i in range(len(self.pose_bones)):
+            parent = self.target_parents[i]
+            ancestor = self.target_ancestor_parents[i]
+            if parent >= 0:
+                parent_pose[:, i] = target_pose[:, parent]
+            elif ancestor >= 0:
+                parent_pose[:, i] = ancestor_pose[:, ancestor]
+            else:
+                parent_pose[:, i] = np.identity(4)
+
+        return np.linalg.inv(parent_pose @ self.target_rest) @ target_pose
+
@@ -0,0 +1,109 @@
+import numpy as np
+from bpy.types import Action, FCurve, Object, PoseBone
+from typing import Any
+
+import hashlib
+import json
+from collections.abc import Sequence
+
+from .bake import get_action_fcurves, get_bone_prefix, get_property_channels
+from .autoprop import index_autoprops, get_action_autoprops
+
+
+# Bump when the bake output changes for the same inputs, so existing fingerprints stop matching.
+FINGERPRINT_VERSION = 2
+
+FINGERPRINT_PROPERTY = 'dlg_retarget_fingerprint'
+
+
+def hash_array(hasher, collection, attribute: str, size: int, dtype=np.float32) -> None:
+    buffer = np.empty(len(collection) * size, dtype=dtype)
+    collection.foreach_get(attribute, buffer)
+    hasher.update(buffer.tobytes())
+
+
+def hash_fcurves(hasher, fcurves: list[FCurve]) -> None:
+    fcurves.sort(key=lambda fcurve: (fcurve.data_path, fcurve.array_index))
+
+    for fcurve in fcurves:
+        keyframe_points = fcurve.keyframe_points
+        hasher.update(f'{fcurve.data_path}[{fcurve.array_index}]:{len(keyframe_points)}'.encode())
+        hash_array(hasher, keyframe_points, 'co', 2)
+        hash_array(hasher, keyframe_points, 'handle_left', 2)
+        hash_array(hasher, keyframe_points, 'handle_right', 2)
+        hash_array(hasher, keyframe_points, 'interpolation', 1, dtype=np.int32)
+
+
+class RetargetFingerprinter:
+    "Hashes everything a retarget bake depends on: non-baked action curves, source rig, target bones, autoprops and settings"
+
+    def __init__(self, source_obj: Object, target_obj: Object, pose_bones: Sequence[PoseBone],
+                 bake_settings: dict[str, Any]):
+        # Curves of the baked bones and of the object's custom properties are outputs, not inputs.
+        self.baked_prefixes = {pose_bone.path_from_id() for pose_bone in pose_bones}
+        properties = get_property_channels(target_obj, pose_bones)
+        self.baked_paths = {channel.data_path for channel in properties}
+
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps({
+            'version': FINGERPRINT_VERSION,
+            'source': source_obj.name,
+            'source_bones': [bone.name for bone in source_obj.data.bones],
+            'target': target_obj.name,
+            'target_bones': sorted(pose_bone.name for pose_bone in pose_bones),
+            'autoprops': index_autoprops(target_obj),
+            # Which properties are keyed with the bones. Their values depend on the current frame when animated.
+            'properties': sorted(self.baked_paths),
+            'bake_settings': bake_settings,
+        }, sort_keys=True, default=str).encode())
+        hash_array(hasher, source_obj.data.bones, 'matrix_local', 16)
+        # Baked transforms are relative to the target's rest pose.
+        hash_array(hasher, target_obj.data.bones, 'matrix_local', 16)
+
+        self.rig_digest = hasher.digest()
+
+    def fingerprint(self, action: Action) -> str:
+        hasher = hashlib.sha256(self.rig_digest)
+        hasher.update(repr(tuple(int(frame) for frame in action.frame_range)).encode())
+
+        # Only hashed when present, so fingerprints of actions without overrides stay valid.
+        action_autoprops = get_action_autoprops(action)
+        if action_autoprops:
+            hasher.update(json.dumps(action_autoprops, sort_keys=True, default=str).encode())
+
+        hash_fcurves(hasher, [fcurve for fcurve in get_action_fcurves(action)
+                              if get_bone_prefix(fcurve.data_path) not in self.baked_prefixes
+                              and fcurve.data_path not in self.baked_paths])
+
+        return hasher.hexdigest()
+
+    def is_up_to_date(self, action: Action, fingerprint: str | None = None) -> bool:
+        "Whether the action was last baked from exactly these inputs"
+        return action.get(FINGERPRINT_PROPERTY) == (fingerprint or self.fingerprint(action))
+
+    def store(self, action: Action, fingerprint: str) -> None:
+        action[FINGERPRINT_PROPERTY] = fingerprint
+
+
+class SourceFingerprinter:
+    "Hashes what the source pose of an action depends on: the source rig and the curves of its bones. Targets do not matter"
+
+    def __init__(self, source_obj: Object):
+        self.source_prefixes = {pose_bone.path_from_id() for pose_bone in source_obj.pose.bones}
+
+        hasher = hashlib.sha256()
+        hasher.update(json.dumps({
+            'version': FINGERPRINT_VERSION,
+            'source_bones': [bone.name for bone in source_obj.data.bones],
+        }).encode())
+        hash_array(hasher, source_obj.data.bones, 'matrix_local', 16)
+
+        self.rig_digest = hasher.digest()
+
+    def fingerprint(self, action: Action) -> str:
+        hasher = hashlib.sha256(self.rig_digest)
+        hasher.update(repr(tuple(int(frame) for frame in action.frame_range)).encode())
+        hash_fcurves(hasher, [fcurve for fcurve in get_action_fcurves(action)
+                              if get_bone_prefix(fcurve.data_path) in self.source_prefixes])
+
+        return hasher.hexdigest()
@@ -0,0 +1,86 @@
+from bpy.types import Object, Scene, ViewLayer
+
+from collections.abc import Iterable
+
+
+def get_referenced_objects(object: Object) -> list[Object | None]:
+    "Objects the evaluation of this object reads from directly: parent, constraint, modifier and driver targets"
+    referenced = [object.parent]
+
+    constraints = list(object.constraints)
+    if object.pose is not None:
+        for pose_bone in object.pose.bones:
+            constraints.extend(pose_bone.constraints)
+
+    for constraint in constraints:
+        referenced.append(getattr(constraint, 'target', None))
+        referenced.append(getattr(constraint, 'pole_target', None))
+        # Armature constraints have a list of targets instead.
+        referenced.extend(target.target for target in getattr(constraint, 'targets', ()))
+
+    for modifier in getattr(object, 'modifiers', ()):
+        referenced.append(getattr(modifier, 'object', None))
+
+    for id in (object, object.data):
+        anim_data = getattr(id, 'animation_data', None)
+        if anim_data is None:
+            continue
+
+        for fcurve in anim_data.drivers:
+            for variable in fcurve.driver.variables:
+                referenced.extend(target.id for target in variable.targets if isinstance(target.id, Object))
+
+    return referenced
+
+
+def get_evaluation_dependencies(objects: Iterable[Object]) -> set[Object]:
+    "The objects and everything their evaluation depends on, recursively"
+    dependencies: set[Object] = set()
+    stack: list[Object | None] = list(objects)
+
+    while stack:
+        object = stack.pop()
+        if object is None or object in dependencies:
+            continue
+
+        dependencies.add(object)
+        stack.extend(get_referenced_objects(object))
+
+    return dependencies
+
+
+class IsolatedEvaluation:
+    "Disables every object of the scene the given objects do not depend on, so frame changes only evaluate the rigs"
+
+    def __init__(self, scene: Scene, objects: Iterable[Object]):
+        self.scene = scene
+        self.dependencies = get_evaluation_dependencies(objects)
+        # (object, view layers it was selected in) of everything disabled, to put back exactly on exit.
+        self.disabled: list[tuple[Object, list[ViewLayer]]] = []
+
+    def __enter__(self) -> 'IsolatedEvaluation':
+        view_layers = list(self.scene.view_layers)
+
+        for object in self.scene.objects:
+            # Linked objects cannot be changed, they stay in the evaluation.
+            if object in self.dependencies or object.hide_viewport or object.library is not None:
+                continue
+
+            # Only disabling takes an object out of the evaluation, hiding it in a view layer does not. Disabling
+            # deselects it in every view layer, and its hidden state per view layer stays as it is.
+            self.disabled.append((object, [view_layer for view_layer in view_layers
+                                           if object.select_get(view_layer=view_layer)]))
+            object.hide_viewport = True
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        for object, view_layers in self.disabled:
+            object.hide_viewport = False
+            for view_layer in view_layers:
+                object.select_set(True, view_layer=view_layer)
+
+        self.disabled.clear()
+
+    def __str__(self) -> str:
+        return f'{len(self.disabled)} objects left out of evaluation, {len(self.dependencies)} evaluated'
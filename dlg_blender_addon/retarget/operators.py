@@ -1,7 +1,34 @@
 import bpy
-from bpy.types import Action, UIList, Panel, Operator, UI_UL_list, bpy_prop_collection, Object, PoseBone, BoneCollection, PoseBone
-from typing import Any, cast
+from bpy.types import Action, UIList, Panel, Operator, UI_UL_list, bpy_prop_collection, Object, PoseBone, BoneCollection, PoseBone, Context, Event
+from typing import cast
 from collections.abc import Sequence
+from contextlib import ExitStack
+from time import perf_counter
+
+from .bake import NativeBaker, get_active_fcurves, get_bone_prefix
+from .direct import DirectSolver
+from .posecache import SourcePoseCache
+from .fingerprint import RetargetFingerprinter
+from .autoprop import PropertyAutomation
+from .isolate import IsolatedEvaluation
+from .stream import ActionStream
+from ..journal import BulkJournal, begin_operation, end_operation
+from ..instrument import instrument_classes, record, timed
+from .reduce import CurveReducer, ReductionStats
+
+
+# Scene ID property with the names of the actions the last retarget went through, for exporting them afterwards.
+LAST_RETARGET_PROPERTY = 'dlg_last_retarget'
+
+
+def set_last_retarget(scene: bpy.types.Scene, action_names: Sequence[str]) -> None:
+    scene[LAST_RETARGET_PROPERTY] = list(action_names)
+
+
+def get_last_retarget_actions(scene: bpy.types.Scene) -> list[Action]:
+    "Actions of the last retarget that are still in the file"
+    actions = (bpy.data.actions.get(name) for name in scene.get(LAST_RETARGET_PROPERTY, ()))
+    return [action for action in actions if action is not None]
 
 
 def filter_actions_by_name(actions: bpy_prop_collection) -> list[int]:
@@ -37,17 +64,19 @@ def deselect_all_bones() -> None:
         set_pose_bone_selection(bone, False)
 
 
-def select_bone_collection(object: Object, collection_name: str) -> None:
-    "Select all bones in a collection recursively (including child collections)"
-    pg = bpy.context.scene.dlg_props
-
+def get_bone_collection_pose_bones(object: Object, collection_name: str) -> list[PoseBone]:
+    "Pose bones of all bones in a collection recursively (including child collections)"
     try:
         bone_collection: BoneCollection = object.data.collections_all[collection_name]
     except KeyError:
-        return
+        return []
+
+    return [object.pose.bones[bone.name] for bone in bone_collection.bones_recursive]
+
 
-    for bone in bone_collection.bones_recursive:
-        pose_bone = object.pose.bones[bone.name]
+def select_bone_collection(object: Object, collection_name: str) -> None:
+    "Select all bones in a collection recursively (including child collections)"
+    for pose_bone in get_bone_collection_pose_bones(object, collection_name):
         set_pose_bone_selection(pose_bone, True)
 
 
@@ -99,72 +128,277 @@ def apply_nla_mute_state(object: Object, mute_state: dict[str, bool]):
             pass
 
 
+class RetargetSession:
+    "Retarget state shared by all actions of a batch. Muting, selection and bone lookup happen once, not per action"
+
+    def __init__(self, context: Context, journal: BulkJournal | None = None):
+        pg = context.scene.dlg_props
+        self.scene = context.scene
+        self.journal = journal
+        self.source_obj: Object = pg.source_armature
+        self.target_obj: Object = context.object
+        self.target_bone_collection: str = pg.target_bone_collection
+        self.bake_engine: str = pg.bake_engine
+        self.skip_unchanged: bool = pg.skip_unchanged
+        self.isolate_evaluation: bool = pg.isolate_evaluation
+        self.bake_settings = pg.get_bake_settings()
+
+        self.reducer: CurveReducer | None = None
+        if pg.reduce_curves:
+            self.reducer = CurveReducer(pg.reduce_tolerance_location,
+                                        pg.reduce_tolerance_rotation,
+                                        pg.reduce_tolerance_scale)
+
+        self.source_cache_directory: str | None = pg.source_cache_directory if pg.use_source_cache else None
+
+        self.stream: ActionStream | None = None
+        if pg.stream_output:
+            self.stream = ActionStream(pg.stream_directory, pg.stream_remove_actions)
+
+        self.setup_time = 0.0
+        # Part of the setup and restore that baking every action on its own repeated: NLA muting and bone selection.
+        self.repeated_setup_time = 0.0
+        self.action_times: list[float] = []
+        self.skipped_actions: list[Action] = []
+        # Names of baked and skipped actions, taken before a stream may remove them.
+        self.action_names: list[str] = []
+        self.reduction_stats: dict[str, ReductionStats] = {}
+
+    def __enter__(self) -> 'RetargetSession':
+        setup_start = perf_counter()
+
+        # Every change is registered for restoring as soon as it is made, so a failure part way through setup
+        # still puts back everything applied before it.
+        with ExitStack() as stack:
+            repeated_start = perf_counter()
+            self.mute_state = mute_nla_tracks(self.target_obj)
+            stack.callback(self.restore_nla_mute_state)
+            self.pose_bones = get_bone_collection_pose_bones(self.target_obj, self.target_bone_collection)
+            self.repeated_setup_time = perf_counter() - repeated_start
+
+            self.baked_prefixes = {pose_bone.path_from_id() for pose_bone in self.pose_bones}
+            self.fingerprinter = RetargetFingerprinter(self.source_obj, self.target_obj, self.pose_bones,
+                                                       self.bake_settings)
+
+            self.solver: DirectSolver | None = None
+
+            if self.bake_engine in ('NATIVE', 'DIRECT'):
+                self.baker = NativeBaker(self.target_obj, self.pose_bones)
+
+                if self.bake_engine == 'DIRECT':
+                    with timed('bake', 'direct setup'):
+                        source_cache = None
+                        if self.source_cache_directory is not None:
+                            source_cache = SourcePoseCache(self.scene, self.source_obj, self.source_cache_directory)
+
+                        solver = DirectSolver(self.source_obj, self.target_obj, self.pose_bones, source_cache)
+
+                    if solver.unsupported:
+                        print(f'Direct solver cannot map this rig, baking with Native: {"; ".join(solver.unsupported[:5])}')
+                    else:
+                        self.solver = solver
+            else:
+                selection_start = perf_counter()
+                deselect_all_bones()
+                for pose_bone in self.pose_bones:
+                    set_pose_bone_selection(pose_bone, True)
+                self.repeated_setup_time += perf_counter() - selection_start
+
+            self.isolation: IsolatedEvaluation | None = None
+            if self.isolate_evaluation:
+                with timed('bake', 'isolate'):
+                    self.isolation = stack.enter_context(IsolatedEvaluation(self.scene,
+                                                                            (self.source_obj, self.target_obj)))
+                print(f'Isolated evaluation: {self.isolation}')
+
+            self.automation = stack.enter_context(PropertyAutomation(self.target_obj))
+
+            self.exit_stack = stack.pop_all()
+
+        self.setup_time = perf_counter() - setup_start
+        record('bake', 'session setup', self.setup_time)
+
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        with timed('bake', 'session restore'):
+            self.exit_stack.__exit__(exc_type, exc_value, traceback)
+
+        set_last_retarget(self.scene, self.action_names)
+
+    def restore_nla_mute_state(self) -> None:
+        restore_start = perf_counter()
+        apply_nla_mute_state(self.target_obj, self.mute_state)
+        self.repeated_setup_time += perf_counter() - restore_start
+
+    @property
+    def saved_time(self) -> float:
+        "Time baking each action on its own would have spent again for every action after the first"
+        return self.repeated_setup_time * max(0, len(self.action_times) - 1)
+
+    def bake_action(self, action: Action) -> bool:
+        "Bake the action, unless its fingerprint shows nothing changed since the last bake. Returns whether it was baked"
+        with timed('bake', 'fingerprint', action.name):
+            fingerprint = self.fingerprinter.fingerprint(action)
+
+        if self.skip_unchanged and self.fingerprinter.is_up_to_date(action, fingerprint):
+            print('Skipping unchanged {}'.format(action.name))
+            self.skipped_actions.append(action)
+            self.action_names.append(action.name)
+
+            if self.stream is not None and not self.stream.has_output(action):
+                self.stream.write(action)
+            return False
+
+        print('Baking {}'.format(action.name))
+
+        bake_start = perf_counter()
+        action_frame_start, action_frame_end = action.frame_range
+
+        with timed('bake', 'setup', action.name):
+            if self.journal is not None:
+                self.journal.backup_action(action, self.baked_prefixes)
+
+            set_action(self.source_obj, action)
+            set_action(self.target_obj, action)
+            self.automation.apply_action(action)
+
+        stats = ReductionStats()
+
+        if self.solver is not None:
+            frames = range(int(action_frame_start), int(action_frame_end) + 1)
+            with timed('bake', 'direct solve', action.name):
+                local_matrices = self.solver.solve(frames, action)
+                property_values = self.solver.read_properties(frames)
+
+            self.baker.write(frames,
+                             local_matrices,
+                             property_values,
+                             clean_curves=True,
+                             reducer=self.reducer,
+                             stats=stats,
+                             label=action.name)
+        elif self.bake_engine in ('NATIVE', 'DIRECT'):
+            self.baker.bake(self.scene,
+                            frame_start=int(action_frame_start),
+                            frame_end=int(action_frame_end),
+                            clean_curves=True,
+                            reducer=self.reducer,
+                            stats=stats,
+                            label=action.name)
+        else:
+            with timed('bake', 'nla.bake', action.name):
+                bpy.ops.nla.bake(frame_start=int(action_frame_start),
+                                 frame_end=int(action_frame_end),
+                                 step=1,
+                                 only_selected=True,
+                                 visual_keying=True,
+                                 clear_constraints=False,
+                                 clear_parents=False,
+                                 use_current_action=True,
+                                 clean_curves=self.reducer is None,
+                                 bake_types={'POSE'})
+
+            if self.reducer is not None:
+                with timed('bake', 'cleaning', action.name):
+                    stats = self.reducer.reduce_fcurves(fcurve for fcurve in get_active_fcurves(self.target_obj)
+                                                        if get_bone_prefix(fcurve.data_path) in self.baked_prefixes)
+
+        if self.reducer is not None:
+            self.reduction_stats[action.name] = stats
+            print(f'Reduced {action.name}: {stats}')
+
+        self.fingerprinter.store(action, fingerprint)
+        self.action_times.append(perf_counter() - bake_start)
+
+        record('bake', 'action', self.action_times[-1], action.name)
+        self.action_names.append(action.name)
+
+        # With a stream that removes written actions, the action is gone after this.
+        if self.stream is not None:
+            with timed('bake', 'stream write', action.name):
+                self.stream.write(action)
+
+        return True
+
+    def print_summary(self) -> None:
+        if self.skipped_actions:
+            print(f'Skipped {len(self.skipped_actions)} unchanged actions')
+
+        action_count = len(self.action_times)
+        if action_count == 0:
+            return
+
+        total_time = sum(self.action_times)
+        print(f'Retargeted {action_count} actions in {total_time:.2f}s '
+              f'({total_time / action_count * 1000:.1f} ms per action)')
+        print(f'Batch setup took {self.setup_time * 1000:.1f} ms once, '
+              f'saving {self.saved_time:.2f}s ({self.repeated_setup_time * 1000:.1f} ms per action)')
+
+        if self.reduction_stats:
+            total = ReductionStats()
+            for stats in self.reduction_stats.values():
+                total.add(stats.keys_before, stats.keys_after, stats.max_error)
+            print(f'Key reduction: {total}')
+
+        if self.solver is not None and self.solver.source_cache is not None:
+            print(self.solver.source_cache)
+
+        if self.stream is not None:
+            print(self.stream)
+
+
 def bake_action(action: Action) -> None:
-    print('Baking {}'.format(action.name))
+    with RetargetSession(bpy.context) as session:
+        session.bake_action(action)
 
-    pg = bpy.context.scene.dlg_props
-    source_obj = pg.source_armature
-    target_obj = bpy.context.object
-    action_frame_start, action_frame_end = action.frame_range
 
-    mute_state = mute_nla_tracks(target_obj)
+def get_selected_actions() -> list[Action]:
+    return list(filter(lambda a: a.dlg_is_selected, bpy.data.actions))
 
-    set_action(source_obj, action)
-    set_action(target_obj, action)
 
-    deselect_all_bones()
-    select_bone_collection(target_obj, pg.target_bone_collection)
+def is_undo_event(event: Event) -> bool:
+    "Whether the event undoes or redoes: Ctrl+Z and Ctrl+Shift+Z (Cmd on macOS), or an undo or redo event type"
+    return event.type in {'UNDO', 'REDO'} or (event.type == 'Z' and (event.ctrl or event.oskey))
 
-    bpy.ops.nla.bake(frame_start=int(action_frame_start),
-                     frame_end=int(action_frame_end),
-                     step=1,
-                     only_selected=True,
-                     visual_keying=True,
-                     clear_constraints=False,
-                     clear_parents=False,
-                     use_current_action=True,
-                     clean_curves=True,
-                     bake_types={'POSE'})
 
-    apply_nla_mute_state(target_obj, mute_state)
+def format_duration(seconds: float) -> str:
+    minutes, seconds = divmod(int(seconds + 0.5), 60)
+    return f'{minutes}:{seconds:02}'
 
 
-def bake_selected_actions() -> None:
-    actions_to_bake = list(filter(lambda a: a.dlg_is_selected, bpy.data.actions))
+def bake_selected_actions(journal: BulkJournal | None = None) -> RetargetSession:
+    actions_to_bake = get_selected_actions()
     bpy.context.window_manager.progress_begin(0, len(actions_to_bake))
-    for i, action in enumerate(actions_to_bake):
-        bake_action(action)
-        bpy.context.window_manager.progress_update(i)
-    bpy.context.window_manager.progress_end()
 
+    try:
+        with RetargetSession(bpy.context, journal) as session:
+            for i, action in enumerate(actions_to_bake):
+                session.bake_action(action)
+                bpy.context.window_manager.progress_update(i)
+    finally:
+        bpy.context.window_manager.progress_end()
 
-def run_property_automations_on_bone(bone: PoseBone, autoprop_dict: dict[str, Any], old_props: dict[str, Any] = {}) -> None:
-    for i, (key, value) in enumerate(autoprop_dict.items()):
-        try:
-            if value != bone[key]:
-                print(f'Auto-prop: Setting {key} to {value} on bone {bone.name}')
-                old_props[key] = bone[key]
-                bone[key] = value
+    session.print_summary()
 
-        except KeyError as err:
-            print(f'Auto-prop failed: {err}')
+    return session
 
 
-def run_all_property_automations(autoprop_dict_name: str, old_props: dict[PoseBone, dict[str, Any]] = {}) -> None:
-    for bone in bpy.context.object.pose.bones:
-        try:
-            old_bone_props = {}
-            run_property_automations_on_bone(bone, bone[autoprop_dict_name], old_bone_props)
-            old_props[bone] = old_bone_props
-        except KeyError:
-            pass
+def retarget_selected_actions(journal: BulkJournal | None = None) -> RetargetSession:
+    "Bake all selected actions with property automations applied and deselect them afterwards"
+    session = bake_selected_actions(journal)
+
+    deselect_all_actions(bpy.data.actions)
+
+    return session
 
 
 class DLG_OT_retarget_actions_apply(Operator):
     bl_idname = 'dlg_retarget.actions_retarget'
     bl_label = 'Retarget Selected Actions'
     bl_description = 'Transfer animations from a source armature to targetted bones'
-    bl_options = {'INTERNAL', 'UNDO'}
+    # Undo steps are pushed by the operator itself, so bulk mode can skip them.
+    bl_options = {'INTERNAL'}
 
     @classmethod
     def poll(cls, context):
@@ -176,19 +410,137 @@ class DLG_OT_retarget_actions_apply(Operator):
             cls.poll_message_set('No valid bone collection selected')
             return False
 
+        if context.scene.dlg_props.stream_output and not context.scene.dlg_props.stream_directory:
+            cls.poll_message_set('No output directory for streamed actions')
+            return False
+
+        # The bulk journal restores actions in place, it has nothing to restore once the stream removed them.
+        if (context.scene.dlg_props.bulk_mode and context.scene.dlg_props.stream_output
+                and context.scene.dlg_props.stream_remove_actions):
+            cls.poll_message_set('Bulk mode cannot revert actions the stream removes')
+            return False
+
         return True
 
+    def invoke(self, context, event):
+        if context.scene.dlg_props.worker_count > 1 or context.window is None:
+            return self.execute(context)
+
+        self.actions = get_selected_actions()
+        self.index = 0
+        self.stop_requested = False
+        self.start_time = perf_counter()
+
+        self.journal = begin_operation(context, self.bl_label)
+        self.session = RetargetSession(context, self.journal).__enter__()
+
+        context.window_manager.modal_handler_add(self)
+        self.timer = context.window_manager.event_timer_add(0.001, window=context.window)
+        self.update_status(context)
+
+        return {'RUNNING_MODAL'}
+
+    def modal(self, context, event):
+        if event.type == 'ESC' and event.value == 'PRESS':
+            # Stops before the next action, the current one is already done.
+            self.stop_requested = True
+            return {'RUNNING_MODAL'}
+
+        if is_undo_event(event):
+            # Undo would reload the data the batch holds while it is half way through. Swallowed until it is done.
+            return {'RUNNING_MODAL'}
+
+        if event.type != 'TIMER':
+            return {'PASS_THROUGH'}
+
+        if self.stop_requested or self.index >= len(self.actions):
+            return self.finish(context)
+
+        action = self.actions[self.index]
+        try:
+            name = action.name
+        except ReferenceError:
+            # Removed since the batch started.
+            self.index += 1
+            return {'RUNNING_MODAL'}
+
+        # Deselected up front, the action may be removed once it is streamed to a file.
+        action.dlg_is_selected = False
+
+        try:
+            self.session.bake_action(action)
+        except Exception as e:
+            action.dlg_is_selected = True
+            self.report({'ERROR'}, f'Retargeting {name} failed: {e}')
+            return self.finish(context, e)
+
+        self.index += 1
+        self.update_status(context)
+
+        return {'RUNNING_MODAL'}
+
+    def update_status(self, context) -> None:
+        elapsed = perf_counter() - self.start_time
+        rate = self.index / elapsed if self.index and elapsed > 0 else 0.0
+        eta = format_duration((len(self.actions) - self.index) / rate) if rate else '--:--'
+        try:
+            current = self.actions[self.index].name if self.index < len(self.actions) else ''
+        except ReferenceError:
+            current = ''
+
+        context.workspace.status_text_set(f'Retargeting {self.index}/{len(self.actions)} {current}  |  '
+                                          f'{rate:.2f} actions/s  |  ETA {eta}  |  Esc to stop')
+
+    def cancel(self, context):
+        # Blender cancels running modal operators when the window closes or another file is loaded.
+        self.stop_requested = True
+        self.finish(context)
+
+    def finish(self, context, error: Exception | None = None):
+        context.window_manager.event_timer_remove(self.timer)
+        context.workspace.status_text_set(None)
+
+        try:
+            self.session.__exit__(type(error) if error else None, error, None)
+            self.session.print_summary()
+        except ReferenceError as e:
+            # Data the session changed was freed under it, there is nothing left to restore it on.
+            self.report({'WARNING'}, f'Could not restore the rig, its data was removed during the batch: {e}')
+
+        session = self.session
+        stopped = ' (stopped)' if self.stop_requested and self.index < len(self.actions) else ''
+        self.report({'WARNING'} if stopped or error else {'INFO'},
+                    f'Retargeted {len(session.action_times)} of {len(self.actions)} actions{stopped}, '
+                    f'skipped {len(session.skipped_actions)} unchanged '
+                    f'in {format_duration(perf_counter() - self.start_time)}')
+
+        # Whatever was baked stays, so the undo step is pushed even when stopped early.
+        end_operation(self.journal, self.bl_label)
+        return {'FINISHED'}
+
     def execute(self, context):
-        old_props = {}
-        run_all_property_automations('_autoprop', old_props)
+        journal = begin_operation(context, self.bl_label)
 
-        bake_selected_actions()
+        if context.scene.dlg_props.worker_count > 1:
+            from .parallel import retarget_selected_actions_parallel, ParallelRetargetError
 
-        for bone in old_props:
-            run_property_automations_on_bone(bone, old_props[bone])
+            try:
+                action_count = retarget_selected_actions_parallel(context, context.scene.dlg_props.worker_count, journal)
+            except ParallelRetargetError as e:
+                self.report({'ERROR'}, str(e))
+                return {'CANCELLED'}
 
-        deselect_all_actions(bpy.data.actions)
+            self.report({'INFO'}, f'Retargeted {action_count} actions')
+            end_operation(journal, self.bl_label)
+            return {'FINISHED'}
+
+        session = retarget_selected_actions(journal)
 
+        self.report({'INFO'}, f'Retargeted {len(session.action_times)} actions, '
+                              f'skipped {len(session.skipped_actions)} unchanged '
+                              f'(batch setup saved {session.saved_time:.2f}s)')
+
+        end_operation(journal, self.bl_label)
         return {'FINISHED'}
 
 
@@ -264,6 +616,8 @@ _classes = (
     DLG_OT_retarget_actions_deselect_all
 )
 
+instrument_classes(_classes)
+
 
 from bpy.utils import register_classes_factory
 register, unregister = register_classes_factory(_classes)
@@ -0,0 +1,245 @@
+"""
+Parallel retarget across background Blender processes.
+
+The selected actions are split into contiguous shards. Each shard is baked by a `blender -b` worker that opens a
+copy of the current file and writes its baked actions into a library file. The baked actions are then appended
+back in shard order and replace the originals, so the result is the same as a serial run.
+"""
+
+import bpy
+from bpy.types import Context, Action
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from dataclasses import dataclass
+from time import perf_counter
+
+from collections.abc import Collection, Sequence
+from typing import TYPE_CHECKING
+
+from .cli import RetargetError, ensure_registered, setup_retarget
+from .fingerprint import RetargetFingerprinter
+from .stream import ActionStream
+from ..cache import invalidate_actions
+
+if TYPE_CHECKING:
+    from ..journal import BulkJournal
+
+
+class ParallelRetargetError(RetargetError):
+    pass
+
+
+@dataclass
+class Shard:
+    index: int
+    action_names: list[str]
+    spec_path: str
+    output_path: str
+    log_path: str
+    process: subprocess.Popen | None = None
+    start_time: float = 0.0
+    duration: float = 0.0
+
+
+def split_into_shards(names: Sequence[str], shard_count: int) -> list[list[str]]:
+    "Split names into at most `shard_count` contiguous, nearly equal chunks, preserving order"
+    shard_count = max(1, min(shard_count, len(names)))
+    size, remainder = divmod(len(names), shard_count)
+
+    shards = []
+    start = 0
+    for i in range(shard_count):
+        end = start + size + (1 if i < remainder else 0)
+        shards.append(list(names[start:end]))
+        start = end
+
+    return shards
+
+
+def get_worker_command(blend_path: str, spec_path: str) -> list[str]:
+    return [bpy.app.binary_path,
+            '--background',
+            '--factory-startup',
+            '--python-exit-code', '1',
+            blend_path,
+            '--python', os.path.abspath(__file__),
+            '--', spec_path]
+
+
+def merge_baked_actions(library_path: str, action_names: Sequence[str]) -> list[Action]:
+    "Append baked actions from a worker library and swap them in place of the originals"
+    originals = [bpy.data.actions[name] for name in action_names]
+
+    with bpy.data.libraries.load(library_path, link=False) as (data_from, data_to):
+        missing = set(action_names) - set(data_from.actions)
+        if missing:
+            raise ParallelRetargetError(f'Worker output is missing {len(missing)} actions: {", ".join(sorted(missing))}')
+
+        data_to.actions = list(action_names)
+
+    merged = []
+    for original, baked in zip(originals, data_to.actions):
+        name = original.name
+        baked.use_fake_user = original.use_fake_user
+
+        original.user_remap(baked)
+        bpy.data.actions.remove(original)
+        baked.name = name
+
+        merged.append(baked)
+
+    invalidate_actions()
+    return merged
+
+
+def stream_actions(stream: ActionStream, selected_names: Sequence[str], baked_names: Collection[str]) -> None:
+    "Write the baked actions, and the skipped ones without a file yet, in selection order like a serial run does"
+    for name in selected_names:
+        action = bpy.data.actions[name]
+        if name in baked_names or not stream.has_output(action):
+            stream.write(action)
+
+
+def finish_parallel_retarget(context: Context, selected_names: Sequence[str], merged: Sequence[Action]) -> None:
+    "Leave the rigs, the action selection and the stream in the same state a serial run would"
+    from . import operators as ops
+
+    pg = context.scene.dlg_props
+    if merged:
+        ops.set_action(pg.source_armature, merged[-1])
+        ops.set_action(context.object, merged[-1])
+
+    ops.deselect_all_actions(bpy.data.actions)
+    ops.set_last_retarget(context.scene, selected_names)
+
+    if pg.stream_output:
+        stream = ActionStream(pg.stream_directory, pg.stream_remove_actions)
+        stream_actions(stream, selected_names, {action.name for action in merged})
+        print(stream)
+
+
+def retarget_selected_actions_parallel(context: Context, worker_count: int, journal: 'BulkJournal | None' = None) -> int:
+    "Bake all selected actions in background worker processes. Returns the number of retargeted actions"
+    from . import operators as ops
+
+    pg = context.scene.dlg_props
+    actions = [action for action in bpy.data.actions if action.dlg_is_selected]
+    # Unchanged actions count as retargeted too, like in a serial run. Merging keeps the names.
+    selected_names = [action.name for action in actions]
+    pose_bones = ops.get_bone_collection_pose_bones(context.object, pg.target_bone_collection)
+
+    if pg.skip_unchanged:
+        fingerprinter = RetargetFingerprinter(pg.source_armature, context.object, pose_bones, pg.get_bake_settings())
+        actions = [action for action in actions if not fingerprinter.is_up_to_date(action)]
+
+    if journal is not None:
+        # Merging keeps the action names, so the snapshots still match after the swap.
+        baked_prefixes = {pose_bone.path_from_id() for pose_bone in pose_bones}
+        for action in actions:
+            journal.backup_action(action, baked_prefixes)
+
+    action_names = [action.name for action in actions]
+
+    if not action_names:
+        finish_parallel_retarget(context, selected_names, [])
+        return 0
+
+    temp_dir = tempfile.mkdtemp(prefix='dlg_retarget_')
+
+    try:
+        blend_path = os.path.join(temp_dir, 'source.blend')
+        bpy.ops.wm.save_as_mainfile(filepath=blend_path, copy=True)
+
+        shards = []
+        for i, names in enumerate(split_into_shards(action_names, worker_count)):
+            shard = Shard(index=i,
+                          action_names=names,
+                          spec_path=os.path.join(temp_dir, f'shard_{i:03d}.json'),
+                          output_path=os.path.join(temp_dir, f'shard_{i:03d}.blend'),
+                          log_path=os.path.join(temp_dir, f'shard_{i:03d}.log'))
+
+            with open(shard.spec_path, 'w') as file:
+                json.dump({
+                    'source': pg.source_armature.name,
+                    'target': context.object.name,
+                    'bone_collection': pg.target_bone_collection,
+                    'engine': pg.bake_engine,
+                    'isolate': pg.isolate_evaluation,
+                    # Absolute, since workers open a copy of the file saved somewhere else.
+                    'source_cache': bpy.path.abspath(pg.source_cache_directory) if pg.use_source_cache else None,
+                    'actions': shard.action_names,
+                    'output': shard.output_path,
+                }, file)
+
+            shards.append(shard)
+
+        print(f'Retargeting {len(action_names)} actions in {len(shards)} workers')
+
+        for shard in shards:
+            with open(shard.log_path, 'w') as log:
+                shard.start_time = perf_counter()
+                shard.process = subprocess.Popen(get_worker_command(blend_path, shard.spec_path),
+                                                 stdout=log, stderr=subprocess.STDOUT)
+
+        failed = []
+        for shard in shards:
+            return_code = shard.process.wait()
+            shard.duration = perf_counter() - shard.start_time
+            print(f'Worker {shard.index}: {len(shard.action_names)} actions in {shard.duration:.2f}s '
+                  f'(exit code {return_code})')
+
+            if return_code != 0:
+                failed.append(shard)
+
+        if failed:
+            for shard in failed:
+                with open(shard.log_path) as log:
+                    print(log.read(), file=sys.stderr)
+            raise ParallelRetargetError(f'{len(failed)} of {len(shards)} workers failed, nothing was merged')
+
+        merged = []
+        for shard in shards:
+            merged += merge_baked_actions(shard.output_path, shard.action_names)
+
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+    finish_parallel_retarget(context, selected_names, merged)
+    return len(merged)
+
+
+def run_worker(spec_path: str) -> None:
+    "Worker side: bake the actions of one shard in the opened file and write them to the shard's library"
+    from . import operators as ops
+
+    with open(spec_path) as file:
+        spec = json.load(file)
+
+    ensure_registered()
+
+    context = bpy.context
+    # Unchanged actions were already left out of the shard by the main process.
+    setup_retarget(context, spec['source'], spec['target'], spec['bone_collection'], spec['engine'],
+                   skip_unchanged=False, isolate_evaluation=spec['isolate'],
+                   source_cache_directory=spec['source_cache'])
+
+    ops.deselect_all_actions(bpy.data.actions)
+    actions = [bpy.data.actions[name] for name in spec['actions']]
+    for action in actions:
+        action.dlg_is_selected = True
+
+    ops.retarget_selected_actions()
+
+    bpy.data.libraries.write(spec['output'], set(actions), fake_user=True)
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+    from dlg_blender_addon.retarget import parallel
+    parallel.run_worker(sys.argv[sys.argv.index('--') + 1])
@@ -0,0 +1,104 @@
+import bpy
+import numpy as np
+from bpy.types import Action, Object, Scene
+
+import os
+import tempfile
+from collections.abc import Sequence
+from time import perf_counter
+
+from .fingerprint import SourceFingerprinter
+from ..instrument import record
+
+
+class SourcePoseCache:
+    "Armature-space pose matrices of every source bone per frame, sampled once per source action into a sidecar .npz"
+
+    def __init__(self, scene: Scene, source_obj: Object, directory: str):
+        self.scene = scene
+        self.source_obj = source_obj
+        self.directory = bpy.path.abspath(directory)
+        self.fingerprinter = SourceFingerprinter(source_obj)
+        self.bone_names = np.array([pose_bone.name for pose_bone in source_obj.pose.bones])
+
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, fingerprint + '.npz')
+
+    def get(self, action: Action, frames: Sequence[int]) -> np.ndarray:
+        "(frames, source bones, 4, 4) pose matrices of the action. Sampled from the source armature, which must have it assigned, on a miss"
+        frames = np.asarray(frames, dtype=np.int32)
+        path = self.get_path(self.fingerprinter.fingerprint(action))
+
+        load_start = perf_counter()
+        matrices = self.load(path, frames)
+
+        if matrices is not None:
+            self.hits += 1
+            record('bake', 'pose cache load', perf_counter() - load_start, action.name)
+        else:
+            self.misses += 1
+
+            sample_start = perf_counter()
+            matrices = self.sample(frames)
+            record('bake', 'pose cache sample', perf_counter() - sample_start, action.name)
+
+            self.save(path, frames, matrices)
+
+        # Only the top three rows are stored, the last is always (0, 0, 0, 1).
+        result = np.zeros(matrices.shape[:2] + (4, 4))
+        result[..., :3, :] = matrices
+        result[..., 3, 3] = 1.0
+
+        return result
+
+    def load(self, path: str, frames: np.ndarray) -> np.ndarray | None:
+        if not os.path.exists(path):
+            return None
+
+        try:
+            with np.load(path) as data:
+                if not np.array_equal(data['bone_names'], self.bone_names) or not np.array_equal(data['frames'], frames):
+                    return None
+                return data['matrices']
+        except (OSError, ValueError, KeyError) as error:
+            print(f'Ignoring unreadable pose cache {path}: {error}')
+            return None
+
+    def sample(self, frames: np.ndarray) -> np.ndarray:
+        "(frames, source bones, 3, 4) float32 pose matrices, evaluated frame by frame"
+        pose_bones = self.source_obj.pose.bones
+        buffer = np.empty(len(pose_bones) * 16, dtype=np.float32)
+        matrices = np.empty((len(frames), len(pose_bones), 3, 4), dtype=np.float32)
+        frame_original = self.scene.frame_current, self.scene.frame_subframe
+
+        try:
+            for f, frame in enumerate(frames):
+                self.scene.frame_set(int(frame))
+
+                # RNA stores matrices column-major, hence the transpose.
+                pose_bones.foreach_get('matrix', buffer)
+                matrices[f] = buffer.reshape(-1, 4, 4).transpose(0, 2, 1)[:, :3]
+        finally:
+            self.scene.frame_set(frame_original[0], subframe=frame_original[1])
+
+        return matrices
+
+    def save(self, path: str, frames: np.ndarray, matrices: np.ndarray) -> None:
+        # Written next to the final path and moved in place, so a crash never leaves a truncated cache file.
+        # The temporary name is unique, parallel workers can sample the same action at once.
+        descriptor, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.directory)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.savez(file, bone_names=self.bone_names, frames=frames, matrices=matrices)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def __str__(self) -> str:
+        return f'Source pose cache: {self.hits} hits, {self.misses} misses in {self.directory}'
@@ -0,0 +1,111 @@
+import numpy as np
+from bpy.types import FCurve
+
+from dataclasses import dataclass
+from collections.abc import Iterable
+
+from .bake import write_fcurve
+
+
+@dataclass
+class ReductionStats:
+    keys_before: int = 0
+    keys_after: int = 0
+    max_error: float = 0.0
+
+    @property
+    def keys_removed(self) -> int:
+        return self.keys_before - self.keys_after
+
+    def add(self, keys_before: int, keys_after: int, error: float) -> None:
+        self.keys_before += keys_before
+        self.keys_after += keys_after
+        self.max_error = max(self.max_error, error)
+
+    def __str__(self) -> str:
+        ratio = self.keys_removed / self.keys_before * 100 if self.keys_before else 0.0
+        return (f'{self.keys_before} -> {self.keys_after} keys '
+                f'(removed {self.keys_removed}, {ratio:.1f}%), max error {self.max_error:.6f}')
+
+
+def reduce_keys(frames: np.ndarray, values: np.ndarray, tolerance: float) -> tuple[np.ndarray, float]:
+    "Ramer-Douglas-Peucker on a sampled curve with vertical error. Returns the mask of kept keys and the max error"
+    count = len(values)
+    keep = np.zeros(count, dtype=bool)
+    keep[0] = keep[-1] = True
+
+    if count <= 2:
+        return keep, 0.0
+
+    segments = [(0, count - 1)]
+    while segments:
+        a, b = segments.pop()
+        if b - a < 2:
+            continue
+
+        t = (frames[a + 1:b] - frames[a]) / (frames[b] - frames[a])
+        error = np.abs(values[a + 1:b] - (values[a] + t * (values[b] - values[a])))
+        i = int(np.argmax(error))
+
+        if error[i] > tolerance:
+            split = a + 1 + i
+            keep[split] = True
+            segments.append((a, split))
+            segments.append((split, b))
+
+    kept = np.flatnonzero(keep)
+    max_error = float(np.max(np.abs(np.interp(frames, frames[kept], values[kept]) - values)))
+
+    return keep, max_error
+
+
+class CurveReducer:
+    "Error-bounded keyframe reduction with a separate tolerance for location, rotation and scale channels"
+
+    def __init__(self, location_tolerance: float, rotation_tolerance: float, scale_tolerance: float):
+        self.location_tolerance = location_tolerance
+        self.rotation_tolerance = rotation_tolerance
+        self.scale_tolerance = scale_tolerance
+
+    def get_tolerance(self, data_path: str) -> float | None:
+        "Tolerance for the channel animated by the data path, or None for channels that are left alone"
+        channel = data_path.rsplit('.', 1)[-1]
+
+        if channel == 'location':
+            return self.location_tolerance
+        if channel.startswith('rotation_'):
+            return self.rotation_tolerance
+        if channel == 'scale':
+            return self.scale_tolerance
+
+        return None
+
+    def reduce(self, data_path: str, frames: np.ndarray, values: np.ndarray, stats: ReductionStats) -> np.ndarray:
+        "Mask of sampled keys to keep for the channel"
+        tolerance = self.get_tolerance(data_path)
+
+        if tolerance is None:
+            keep, error = np.ones(len(values), dtype=bool), 0.0
+        else:
+            keep, error = reduce_keys(frames, values, tolerance)
+
+        stats.add(len(values), int(np.count_nonzero(keep)), error)
+        return keep
+
+    def reduce_fcurves(self, fcurves: Iterable[FCurve]) -> ReductionStats:
+        "Reduce already keyed F-Curves in place, reading and writing all keys in bulk"
+        stats = ReductionStats()
+
+        for fcurve in fcurves:
+            if self.get_tolerance(fcurve.data_path) is None:
+                continue
+
+            keyframe_points = fcurve.keyframe_points
+            co = np.empty(len(keyframe_points) * 2, dtype=np.float32)
+            keyframe_points.foreach_get('co', co)
+            frames, values = co[0::2].astype(np.float64), co[1::2].astype(np.float64)
+
+            keep = self.reduce(fcurve.data_path, frames, values, stats)
+            write_fcurve(fcurve, frames[keep], values[keep], linear=True)
+
+        return stats
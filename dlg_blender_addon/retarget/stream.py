@@ -0,0 +1,68 @@
+import bpy
+from bpy.types import Action
+
+import os
+from time import perf_counter
+
+from ..cache import invalidate_actions
+
+
+class ActionStream:
+    "Writes every baked action to its own library file as soon as it is done, optionally dropping it from the open file"
+
+    def __init__(self, directory: str, remove_actions: bool):
+        self.directory = bpy.path.abspath(directory)
+        self.remove_actions = remove_actions
+        self.written: list[str] = []
+        self.write_time = 0.0
+
+        # File of each action name, and the files handed out so far. Case is ignored, like on Windows and macOS.
+        self.paths: dict[str, str] = {}
+        self.taken: set[str] = set()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    def get_path(self, action: Action) -> str:
+        "Library file of the action. Names that clean to a file another action already has get a numbered suffix"
+        path = self.paths.get(action.name)
+        if path is not None:
+            return path
+
+        name = bpy.path.clean_name(action.name)
+        path = os.path.join(self.directory, name + '.blend')
+
+        index = 1
+        while path.casefold() in self.taken:
+            path = os.path.join(self.directory, f'{name}.{index:03}.blend')
+            index += 1
+
+        if index > 1:
+            print('{} shares its file name with another action, writing it to {}'.format(action.name, path))
+
+        self.paths[action.name] = path
+        self.taken.add(path.casefold())
+        return path
+
+    def has_output(self, action: Action) -> bool:
+        return os.path.exists(self.get_path(action))
+
+    def write(self, action: Action) -> str:
+        "Write the action to its library file. With `remove_actions` the action is gone afterwards"
+        write_start = perf_counter()
+        path = self.get_path(action)
+
+        # libraries.write() replaces the file, so each action gets its own file instead of appending to one.
+        bpy.data.libraries.write(path, {action}, fake_user=True)
+        self.written.append(action.name)
+
+        if self.remove_actions:
+            # Actions own their curves, so removing the action frees everything it holds right away.
+            bpy.data.actions.remove(action)
+            invalidate_actions()
+
+        self.write_time += perf_counter() - write_start
+        return path
+
+    def __str__(self) -> str:
+        removed = ' and removed them from this file' if self.remove_actions else ''
+        return f'Wrote {len(self.written)} actions to {self.directory}{removed} in {self.write_time:.2f}s'
@@ -2,6 +2,9 @@
 import bpy
 from bpy.types import UIList, Panel, bpy_prop_collection
 from . import operators as ops
+from ..cache import get_cached
+from ..journal import draw_bulk_controls
+from ..instrument import instrument_classes
 
 
 class DLG_PT_retarget_actions(Panel):
@@ -26,10 +29,36 @@ class DLG_PT_retarget_actions(Panel):
         col = layout.column(align=True)
         col.use_property_split = True
         col.use_property_decorate = False
-        col.prop_search(
+        row = col.row(align=True)
+        row.prop_search(
             pg, 'source_armature', context.scene, 'objects', icon='OUTLINER_OB_ARMATURE')
+        row.operator('dlg.psa_import', text='', icon='IMPORT')
         col.prop_search(
             pg, 'target_bone_collection', ob.data, 'collections_all', icon='GROUP_BONE')
+        col.prop(pg, 'bake_engine')
+
+        if pg.bake_engine == 'DIRECT':
+            col.prop(pg, 'use_source_cache')
+            if pg.use_source_cache:
+                col.prop(pg, 'source_cache_directory')
+
+        col.prop(pg, 'worker_count')
+        col.prop(pg, 'isolate_evaluation')
+        col.prop(pg, 'skip_unchanged')
+        col.prop(pg, 'stream_output')
+
+        if pg.stream_output:
+            col.prop(pg, 'stream_directory')
+            col.prop(pg, 'stream_remove_actions')
+
+        col.prop(pg, 'reduce_curves')
+
+        if pg.reduce_curves:
+            col.prop(pg, 'reduce_tolerance_location')
+            col.prop(pg, 'reduce_tolerance_rotation')
+            col.prop(pg, 'reduce_tolerance_scale')
+
+        draw_bulk_controls(layout, context)
 
         layout.separator()
 
@@ -49,6 +78,8 @@ class DLG_PT_retarget_actions(Panel):
         # Controls
         bake_button_row = layout.row()
         bake_button_row.operator(ops.DLG_OT_retarget_actions_apply.bl_idname, text=f'Retarget')
+        # Retargeting deselects the actions, so this exports what the last run produced.
+        bake_button_row.operator('dlg.psa_export', text='', icon='EXPORT').source = 'LAST_RETARGET'
 
         # debug_row = layout.row()
         # debug_row.operator(DLG_OP_DebugTest.bl_idname, text=f'DEBUG TEST')
@@ -69,11 +100,18 @@ class DLG_UL_retarget_action_list(UIList):
 
     def filter_items(self, context, data, property):
         actions = getattr(data, property)
-        filter_flags = ops.filter_actions_by_name(actions)
-        filter_neworder = bpy.types.UI_UL_list.sort_items_by_name(
-            actions, 'name')
+        pg = context.scene.dlg_props
+
+        def compute():
+            filter_flags = ops.filter_actions_by_name(actions)
+            filter_neworder = bpy.types.UI_UL_list.sort_items_by_name(
+                actions, 'name')
 
-        return filter_flags, filter_neworder
+            return filter_flags, filter_neworder
+
+        # Flags and order only change with the filter or the actions, so redraws reuse the last result.
+        key = ('retarget_action_list', pg.filter_name, pg.use_filter_invert, len(actions))
+        return get_cached(key, compute)
 
 
 _classes = (
@@ -81,6 +119,8 @@ _classes = (
     DLG_UL_retarget_action_list
 )
 
+instrument_classes(_classes)
+
 
 from bpy.utils import register_classes_factory
 register, unregister = register_classes_factory(_classes)
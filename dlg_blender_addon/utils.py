@@ -1,4 +1,22 @@
 from bpy.types import Object
 
+import os
+import re
+from collections.abc import Callable
+from fnmatch import translate
+from functools import lru_cache
+
+
 def is_armature_poll(self, object: Object) -> bool:
     return object.type == 'ARMATURE'
+
+
+@lru_cache(maxsize=32)
+def get_name_matcher(pattern: str) -> Callable[[str], bool]:
+    "Compiled equivalent of `fnmatch(name, pattern)`. Recent patterns are kept, so typing a filter does not recompile"
+    match = re.compile(translate(os.path.normcase(pattern))).match
+
+    if os.path.normcase('A') == 'A':
+        return lambda name: match(name) is not None
+
+    return lambda name: match(os.path.normcase(name)) is not None
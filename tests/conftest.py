@@ -0,0 +1,99 @@
+import os
+import sys
+
+import bpy
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dlg_blender_addon.retarget import operators as retarget_ops
+from dlg_blender_addon.retarget.bake import ensure_fcurve, get_active_fcurves, write_fcurve
+from dlg_blender_addon.retarget.cli import ensure_registered, setup_retarget
+
+BONE_COLLECTION = 'RETARGET'
+BONE_COUNT = 6
+FRAME_END = 40
+
+
+@pytest.fixture
+def scene() -> bpy.types.Scene:
+    "Empty factory scene with the add-on registered"
+    bpy.ops.wm.read_factory_settings(use_empty=True)
+    ensure_registered()
+    return bpy.context.scene
+
+
+def build_chain_armature(scene: bpy.types.Scene, name: str) -> bpy.types.Object:
+    armature = bpy.data.armatures.new(name)
+    armature_obj = bpy.data.objects.new(name, armature)
+    scene.collection.objects.link(armature_obj)
+    bpy.context.view_layer.objects.active = armature_obj
+
+    bpy.ops.object.mode_set(mode='EDIT')
+    parent = None
+    for i in range(BONE_COUNT):
+        edit_bone = armature.edit_bones.new(f'bone_{i}')
+        edit_bone.head = parent.tail if parent else (0.0, 0.0, 0.0)
+        edit_bone.tail = (edit_bone.head[0] + 0.1 * (i % 3 - 1), edit_bone.head[1] + 0.05, edit_bone.head[2] + 0.2)
+        edit_bone.roll = 0.3 * i
+        edit_bone.parent = parent
+        parent = edit_bone
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    armature_obj.animation_data_create()
+    return armature_obj
+
+
+def add_strips(scene: bpy.types.Scene, ranges: list[tuple[int, float]]) -> bpy.types.NlaTrack:
+    "Track on a new object with one strip per (start, end) range"
+    object = bpy.data.objects.new('Strips', None)
+    scene.collection.objects.link(object)
+    track = object.animation_data_create().nla_tracks.new()
+
+    for i, (start, end) in enumerate(ranges):
+        action = bpy.data.actions.new(f'strip_{i}')
+        strip = track.strips.new(action.name, start, action)
+        strip.action_frame_start, strip.action_frame_end = 0, end - start
+        strip.frame_end = end
+
+    return track
+
+
+@pytest.fixture
+def rig(scene):
+    "Target copying the transforms of a source with one action, set up for retargeting"
+    scene.frame_start, scene.frame_end = 0, FRAME_END
+    source = build_chain_armature(scene, 'Source')
+    target = build_chain_armature(scene, 'Target')
+
+    collection = target.data.collections.new(BONE_COLLECTION)
+    for bone in target.data.bones:
+        collection.assign(bone)
+
+    for pose_bone in target.pose.bones:
+        constraint = pose_bone.constraints.new('COPY_TRANSFORMS')
+        constraint.target = source
+        constraint.subtarget = pose_bone.name
+
+    action = bpy.data.actions.new('walk')
+    action.slots.new(id_type='OBJECT', name=source.name)
+    retarget_ops.set_action(source, action)
+    fcurves = get_active_fcurves(source)
+
+    # Smooth motion with holds, so cleaning has work to do.
+    rng = np.random.default_rng(0)
+    frames = np.arange(0, FRAME_END + 1, 4, dtype=np.float64)
+    for pose_bone in source.pose.bones:
+        axis = rng.normal(size=3)
+        axis /= np.linalg.norm(axis)
+        angle = 0.4 * np.sin(frames * 0.1 + rng.uniform(0, np.pi))
+        angle[len(angle) // 2:] = angle[len(angle) // 2]
+        rotation = np.column_stack((np.cos(angle / 2), *(np.sin(angle / 2)[:, None] * axis).T))
+
+        for index in range(4):
+            fcurve = ensure_fcurve(fcurves, pose_bone.path_from_id('rotation_quaternion'), index, pose_bone.name)
+            write_fcurve(fcurve, frames, rotation[:, index])
+
+    setup_retarget(bpy.context, source.name, target.name, BONE_COLLECTION, 'NATIVE', skip_unchanged=False)
+    return source, target, action
@@ -0,0 +1,37 @@
+import bpy
+
+from dlg_blender_addon.cache import invalidate_actions
+from dlg_blender_addon.nla.operators import sync_data_action_group_items
+from dlg_blender_addon.retarget.stream import ActionStream
+
+
+def get_item_actions() -> list:
+    return [item.action for item in bpy.context.scene.dlg_props.data_action_group_items]
+
+
+def test_sync_skipped_until_actions_change(scene):
+    for name in ('idle', 'walk', 'run'):
+        bpy.data.actions.new(name)
+    sync_data_action_group_items(bpy.context)
+    items = scene.dlg_props.data_action_group_items
+
+    # Not something the sync would leave behind, so it shows whether the items were walked again.
+    items[0].action = None
+    sync_data_action_group_items(bpy.context)
+    assert items[0].action is None
+
+    invalidate_actions()
+    sync_data_action_group_items(bpy.context)
+    assert get_item_actions() == list(bpy.data.actions)
+
+
+def test_sync_after_streamed_action_removed(scene, tmp_path):
+    actions = [bpy.data.actions.new(name) for name in ('idle', 'walk', 'run')]
+    sync_data_action_group_items(bpy.context)
+
+    # Same number of actions as before, without a depsgraph update in between.
+    ActionStream(str(tmp_path), remove_actions=True).write(actions[0])
+    bpy.data.actions.new('jump')
+    sync_data_action_group_items(bpy.context)
+
+    assert get_item_actions() == list(bpy.data.actions)
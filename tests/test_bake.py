@@ -0,0 +1,204 @@
+import bpy
+import numpy as np
+import pytest
+
+from dlg_blender_addon.retarget import operators as retarget_ops
+from dlg_blender_addon.retarget.autoprop import AUTOPROP_PROPERTY
+from dlg_blender_addon.retarget.bake import (CLEAN_THRESHOLD, clean_mask, ensure_fcurve, get_action_fcurves,
+                                             get_active_fcurves, write_fcurve)
+
+from conftest import BONE_COLLECTION, FRAME_END
+
+# Largest difference allowed between the native bake and `bpy.ops.nla.bake`, like the benchmark parity check.
+PARITY_TOLERANCE = 1e-4
+
+
+def clean_like_blender(values: np.ndarray) -> np.ndarray:
+    "Keys left by the cleaning loop of `bpy_extras.anim_utils.bake_action_iter`, run on a real F-Curve"
+    from bpy_extras.anim_utils import action_ensure_channelbag_for_slot
+
+    action = bpy.data.actions.new('Clean')
+    slot = action.slots.new(id_type='OBJECT', name='Clean')
+    fcurve = action_ensure_channelbag_for_slot(action, slot).fcurves.new('location')
+
+    write_fcurve(fcurve, np.arange(len(values), dtype=np.float64), values)
+
+    keyframe_points = fcurve.keyframe_points
+    i = 1
+    while i < len(keyframe_points) - 1:
+        val = keyframe_points[i].co[1]
+        val_prev = keyframe_points[i - 1].co[1]
+        val_next = keyframe_points[i + 1].co[1]
+
+        if abs(val - val_prev) + abs(val - val_next) < CLEAN_THRESHOLD:
+            keyframe_points.remove(keyframe_points[i])
+        else:
+            i += 1
+
+    frames = [int(round(key.co[0])) for key in keyframe_points]
+    bpy.data.actions.remove(action)
+    return np.array(frames)
+
+
+def make_curve(rng: np.random.Generator, count: int) -> np.ndarray:
+    "Random mix of holds, slow drifts below the threshold, noise and jumps"
+    pieces = []
+    while sum(map(len, pieces)) < count:
+        length = int(rng.integers(2, 30))
+        kind = rng.integers(4)
+        start = pieces[-1][-1] if pieces else 0.0
+        if kind == 0:
+            pieces.append(np.full(length, start))
+        elif kind == 1:
+            pieces.append(start + np.arange(1, length + 1) * rng.uniform(-1.0, 1.0) * CLEAN_THRESHOLD * 0.6)
+        elif kind == 2:
+            pieces.append(start + rng.normal(scale=CLEAN_THRESHOLD * 0.3, size=length))
+        else:
+            pieces.append(start + np.cumsum(rng.normal(scale=0.1, size=length)))
+    return np.concatenate(pieces)[:count]
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_clean_mask_matches_blender(scene, seed):
+    values = make_curve(np.random.default_rng(seed), 300)
+    assert np.array_equal(np.flatnonzero(clean_mask(values)), clean_like_blender(values))
+
+
+def test_clean_mask_keeps_drift():
+    # Neighbours are always closer than the threshold, but the drift from the last kept key is not.
+    values = np.arange(20) * CLEAN_THRESHOLD * 0.4
+    keep = clean_mask(values)
+    assert keep[0] and keep[-1]
+    assert 2 < np.count_nonzero(keep) < len(values)
+
+
+def bake_copy(action: bpy.types.Action, engine: str) -> bpy.types.Action:
+    pg = bpy.context.scene.dlg_props
+    pg.bake_engine = engine
+    pg.reduce_curves = False
+
+    copy = action.copy()
+    copy.name = f'{action.name}_{engine.lower()}'
+    with retarget_ops.RetargetSession(bpy.context) as session:
+        if engine == 'DIRECT':
+            assert session.solver is not None, session.solver
+        session.bake_action(copy)
+
+    return copy
+
+
+def sample_channels(action: bpy.types.Action, prefixes: tuple[str, ...]) -> dict[tuple[str, int], np.ndarray]:
+    return {(fcurve.data_path, fcurve.array_index): np.array([fcurve.evaluate(frame) for frame in range(FRAME_END + 1)])
+            for fcurve in get_action_fcurves(action) if fcurve.data_path.startswith(prefixes)}
+
+
+def assert_parity(action: bpy.types.Action, target: bpy.types.Object, engine: str, reference: str,
+                  unchecked: tuple[str, ...] = ()) -> dict[tuple[str, int], np.ndarray]:
+    "Bake copies of the action with both engines and compare the baked bones and object properties frame by frame"
+    pose_bones = retarget_ops.get_bone_collection_pose_bones(target, BONE_COLLECTION)
+    prefixes = tuple(pose_bone.path_from_id() for pose_bone in pose_bones) + ('["',)
+
+    baked = sample_channels(bake_copy(action, engine), prefixes)
+    expected = sample_channels(bake_copy(action, reference), prefixes)
+    assert baked.keys() == expected.keys()
+
+    for channel, values in baked.items():
+        if channel[0].endswith(unchecked):
+            continue
+
+        error = np.abs(values - expected[channel])
+        if channel[0].endswith('rotation_quaternion'):
+            # q and -q are the same rotation.
+            error = np.minimum(error, np.abs(values + expected[channel]))
+        assert error.max() <= PARITY_TOLERANCE, channel
+
+    return baked
+
+
+def unbake_root(target: bpy.types.Object) -> bpy.types.PoseBone:
+    "Leave the target's root out of the bake. The shared action still animates it, like the source root"
+    root = target.pose.bones['bone_0']
+    target.data.collections[BONE_COLLECTION].unassign(root.bone)
+    root.constraints.remove(root.constraints[0])
+    return root
+
+
+def add_properties(source: bpy.types.Object, target: bpy.types.Object) -> None:
+    "Custom properties on the target and its bones, animated, automated or static, and a segmented bone"
+    # The target bakes into the source's action slot, so the source's curves animate it too.
+    fcurves = get_active_fcurves(source)
+    frames = np.array([0.0, FRAME_END / 2, FRAME_END])
+
+    def animate(data_path: str, values: list[float], index: int = 0, group: str = '') -> None:
+        write_fcurve(ensure_fcurve(fcurves, data_path, index, group), frames, np.array(values))
+
+    target['weight'] = 0.0
+    animate('["weight"]', [0.0, 1.0, 0.25])
+
+    blend_bone = target.pose.bones['bone_2']
+    blend_bone['blend'] = 0.0
+    blend_bone['switch'] = 0
+    blend_bone['label'] = 'not keyable'
+    animate(blend_bone.path_from_id() + '["blend"]', [0.2, 0.9, 0.4], group=blend_bone.name)
+    animate(blend_bone.path_from_id() + '["switch"]', [0.0, 2.7, 1.0], group=blend_bone.name)
+
+    automated_bone = target.pose.bones['bone_3']
+    automated_bone['ik_fk'] = 0.0
+    automated_bone[AUTOPROP_PROPERTY] = {'ik_fk': 1.0}
+
+    segmented_bone = target.pose.bones['bone_4']
+    segmented_bone.bone.bbone_segments = 4
+    animate(segmented_bone.path_from_id('bbone_curveinx'), [0.0, 0.3, -0.2], group=segmented_bone.name)
+    animate(segmented_bone.path_from_id('bbone_scalein'), [1.0, 1.5, 0.8], index=1, group=segmented_bone.name)
+
+
+def assert_properties_baked(channels: dict[tuple[str, int], np.ndarray]) -> None:
+    assert channels['["weight"]', 0][FRAME_END // 2] == pytest.approx(1.0)
+    assert channels['pose.bones["bone_2"]["blend"]', 0][FRAME_END // 2] == pytest.approx(0.9)
+    assert channels['pose.bones["bone_2"]["switch"]', 0][FRAME_END // 2] == 2.0
+    assert np.all(channels['pose.bones["bone_3"]["ik_fk"]', 0] == 1.0)
+    assert channels['pose.bones["bone_4"].bbone_scalein', 1][FRAME_END // 2] == pytest.approx(1.5)
+    assert ('pose.bones["bone_4"].bbone_easeout', 0) in channels
+    assert ('pose.bones["bone_2"]["label"]', 0) not in channels
+    assert not any(path.startswith('pose.bones["bone_3"].bbone') for path, _ in channels)
+
+
+def test_native_bake_matches_operator(rig):
+    source, target, action = rig
+    assert_parity(action, target, 'NATIVE', 'OPERATOR')
+
+
+def test_direct_bake_matches_native(rig):
+    source, target, action = rig
+    assert_parity(action, target, 'DIRECT', 'NATIVE')
+
+
+def test_native_bake_keys_properties_like_operator(rig):
+    source, target, action = rig
+    add_properties(source, target)
+    # `bpy.ops.nla.bake` samples the B-Bone scale vectors by reference, so it keys the value of the frame it ends on.
+    assert_properties_baked(assert_parity(action, target, 'NATIVE', 'OPERATOR',
+                                          unchecked=('bbone_scalein', 'bbone_scaleout')))
+
+
+def test_direct_bake_keys_properties_like_native(rig):
+    source, target, action = rig
+    add_properties(source, target)
+    assert_properties_baked(assert_parity(action, target, 'DIRECT', 'NATIVE'))
+
+
+def test_direct_bake_poses_animated_unbaked_parents(rig):
+    source, target, action = rig
+    unbake_root(target)
+    assert_parity(action, target, 'DIRECT', 'NATIVE')
+
+
+def test_direct_solver_rejects_constrained_unbaked_parents(rig):
+    source, target, action = rig
+    root = unbake_root(target)
+    root.constraints.new('COPY_ROTATION').target = source
+
+    scene = bpy.context.scene
+    scene.dlg_props.bake_engine = 'DIRECT'
+    with retarget_ops.RetargetSession(bpy.context) as session:
+        assert session.solver is None
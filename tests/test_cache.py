@@ -0,0 +1,118 @@
+import bpy
+import pytest
+
+from dlg_blender_addon import cache
+from dlg_blender_addon.cache import get_actions_version, get_cached, invalidate_actions
+
+
+class Counter:
+    "Compute function that counts its calls"
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self) -> int:
+        self.calls += 1
+        return self.calls
+
+
+def assert_invalidated(key, compute: Counter, change) -> None:
+    "Cache a value under the key, make the change and check the value is computed again"
+    version = get_actions_version()
+    first = get_cached(key, compute)
+    assert get_cached(key, compute) == first
+
+    change()
+
+    assert get_actions_version() != version
+    assert get_cached(key, compute) == first + 1
+
+
+def test_values_are_cached_until_invalidated(scene):
+    compute = Counter()
+    assert_invalidated('key', compute, invalidate_actions)
+    assert compute.calls == 2
+
+
+def test_least_recently_used_entry_is_evicted(scene, monkeypatch):
+    monkeypatch.setattr(cache, '_action_cache_size', 2)
+    computes = {key: Counter() for key in 'abc'}
+
+    for key in 'ab':
+        get_cached(key, computes[key])
+    get_cached('a', computes['a'])
+    get_cached('c', computes['c'])
+
+    # 'b' was used least recently, so only it has to be computed again.
+    for key in 'acb':
+        get_cached(key, computes[key])
+    assert {key: compute.calls for key, compute in computes.items()} == {'a': 1, 'b': 2, 'c': 1}
+
+
+def test_renaming_an_action_invalidates(scene):
+    action = bpy.data.actions.new('walk')
+    bpy.context.view_layer.update()
+
+    def rename():
+        action.name = 'run'
+        bpy.context.view_layer.update()
+
+    assert_invalidated('names', Counter(), rename)
+
+
+def test_rename_subscription_invalidates(scene, monkeypatch):
+    # The message bus only publishes from the window manager's event loop, so check what is subscribed.
+    subscriptions = []
+    monkeypatch.setattr(bpy.msgbus, 'subscribe_rna', lambda **kwargs: subscriptions.append(kwargs))
+    cache.subscribe_action_renames()
+
+    (subscription,) = subscriptions
+    assert subscription['key'] == (bpy.types.Action, 'name')
+    assert_invalidated('names', Counter(), lambda: subscription['notify'](*subscription['args']))
+
+
+def test_editing_an_action_invalidates(scene):
+    action = bpy.data.actions.new('walk')
+    bpy.context.view_layer.update()
+
+    def edit():
+        action.use_frame_range = True
+        action.frame_end = 12
+        bpy.context.view_layer.update()
+
+    assert_invalidated('ranges', Counter(), edit)
+
+
+def test_unrelated_update_keeps_the_cache(scene):
+    bpy.data.actions.new('walk')
+    bpy.context.view_layer.update()
+    compute = Counter()
+    get_cached('names', compute)
+
+    bpy.context.scene.frame_current += 1
+    bpy.context.view_layer.update()
+
+    assert get_cached('names', compute) == 1
+
+
+@pytest.mark.parametrize('step', ['undo', 'redo'])
+def test_undo_and_redo_invalidate(scene, step):
+    bpy.ops.ed.undo_push(message='Before')
+    bpy.data.actions.new('walk')
+    bpy.ops.ed.undo_push(message='Add action')
+
+    if step == 'redo':
+        assert bpy.ops.ed.undo() == {'FINISHED'}
+        change = bpy.ops.ed.redo
+    else:
+        change = bpy.ops.ed.undo
+
+    assert_invalidated(step, Counter(), change)
+    assert ('walk' in bpy.data.actions) == (step == 'redo')
+
+
+def test_loading_a_file_invalidates(scene, tmp_path):
+    filepath = str(tmp_path / 'empty.blend')
+    bpy.ops.wm.save_as_mainfile(filepath=filepath)
+
+    assert_invalidated('load', Counter(), lambda: bpy.ops.wm.open_mainfile(filepath=filepath))
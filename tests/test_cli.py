@@ -0,0 +1,78 @@
+import bpy
+import pytest
+
+from dlg_blender_addon.retarget.cli import EXIT_FAILED, EXIT_OK, EXIT_USAGE, main, parse_args
+
+
+@pytest.fixture
+def blend_file(rig, tmp_path):
+    "The retarget rig saved to a file of its own"
+    filepath = tmp_path / 'rig.blend'
+    bpy.ops.wm.save_as_mainfile(filepath=str(filepath))
+    return filepath
+
+
+def test_parse_args_defaults():
+    args = parse_args(['a.blend', 'b', '--source', 'Source'])
+
+    assert args.files == ['a.blend', 'b']
+    assert args.source == 'Source'
+    assert args.target is None
+    assert args.bone_collection == 'RETARGET'
+    assert args.engine == 'NATIVE'
+    assert args.workers == 1
+    assert not args.force and not args.verbose
+
+
+def test_parse_args_options():
+    args = parse_args(['a.blend', '--source', 'Source', '--target', 'Target', '--engine', 'DIRECT',
+                       '--workers', '4', '--filter', '*_walk', '--invert-filter', '--force', '--verbose',
+                       '--output-dir', 'out', '--stream-dir', 'stream', '--stream-remove', '--source-cache', 'cache'])
+
+    assert (args.target, args.engine, args.workers, args.filter) == ('Target', 'DIRECT', 4, '*_walk')
+    assert args.invert_filter and args.force and args.verbose and args.stream_remove
+    assert (args.output_dir, args.stream_dir, args.source_cache) == ('out', 'stream', 'cache')
+
+
+@pytest.mark.parametrize('argv', [
+    [],
+    ['a.blend'],
+    ['a.blend', '--source', 'Source', '--engine', 'OTHER'],
+    ['a.blend', '--source', 'Source', '--workers', 'many'],
+])
+def test_invalid_arguments(argv, capsys):
+    assert main(argv) == EXIT_USAGE
+
+
+def test_help(capsys):
+    assert main(['--help']) == EXIT_OK
+    assert '--source' in capsys.readouterr().out
+
+
+def test_no_files(tmp_path, capsys):
+    assert main([str(tmp_path / '*.blend'), '--source', 'Source']) == EXIT_USAGE
+    assert 'No .blend files found' in capsys.readouterr().err
+
+
+def test_retarget_into_output_dir(blend_file, tmp_path, capsys):
+    output_dir = tmp_path / 'out'
+    contents = blend_file.read_bytes()
+
+    assert main([str(tmp_path), '--source', 'Source', '--target', 'Target', '--output-dir', str(output_dir)]) == EXIT_OK
+    assert '1 actions' in capsys.readouterr().out
+    assert (output_dir / blend_file.name).is_file()
+    assert blend_file.read_bytes() == contents
+
+
+def test_missing_source_is_one_line(blend_file, capsys):
+    assert main([str(blend_file), '--source', 'Missing']) == EXIT_FAILED
+
+    err = capsys.readouterr().err
+    assert 'Traceback' not in err
+    assert 'Source armature "Missing" not found' in err
+    assert len([line for line in err.splitlines() if 'not found' in line]) == 1
+
+
+def test_verbose_prints_traceback(blend_file, capsys):
+    assert main([str(blend_file), '--source', 'Missing', '--verbose']) == EXIT_FAILED
+    assert 'Traceback' in capsys.readouterr().err
@@ -0,0 +1,91 @@
+import bpy
+import pytest
+
+from dlg_blender_addon.retarget import operators as retarget_ops
+from dlg_blender_addon.retarget.autoprop import AUTOPROP_PROPERTY
+from dlg_blender_addon.retarget.bake import get_action_fcurves, get_active_fcurves
+
+from conftest import FRAME_END
+
+
+def bake(action: bpy.types.Action) -> bool:
+    "Bake the action in a new session, like a retarget run. Returns whether it was baked rather than skipped"
+    bpy.context.scene.dlg_props.skip_unchanged = True
+    with retarget_ops.RetargetSession(bpy.context) as session:
+        return session.bake_action(action)
+
+
+def move_rest_bone(object: bpy.types.Object) -> None:
+    bpy.context.view_layer.objects.active = object
+    bpy.ops.object.mode_set(mode='EDIT')
+    object.data.edit_bones['bone_2'].tail.x += 0.1
+    bpy.ops.object.mode_set(mode='OBJECT')
+    bpy.context.view_layer.objects.active = bpy.data.objects['Target']
+
+
+def add_autoprop(source, target, action) -> None:
+    pose_bone = target.pose.bones['bone_1']
+    pose_bone['ik_fk'] = 0.0
+    pose_bone[AUTOPROP_PROPERTY] = {'ik_fk': 1.0}
+
+
+def add_action_autoprop(source, target, action) -> None:
+    target.pose.bones['bone_1']['ik_fk'] = 0.0
+    action[AUTOPROP_PROPERTY] = {'bone_1': {'ik_fk': 1.0}}
+
+
+def change_bake_settings(source, target, action) -> None:
+    pg = bpy.context.scene.dlg_props
+    pg.reduce_curves = not pg.reduce_curves
+
+
+def change_frame_range(source, target, action) -> None:
+    action.use_frame_range = True
+    action.frame_start, action.frame_end = 0, FRAME_END // 2
+
+
+def add_object_curve(source, target, action) -> None:
+    # Moves the source object, and with it the target bones copying its bones.
+    fcurve = get_active_fcurves(source).new('location', index=0)
+    fcurve.keyframe_points.insert(0, 0.0)
+    fcurve.keyframe_points.insert(FRAME_END, 1.0)
+
+
+def add_target_property(source, target, action) -> None:
+    target['weight'] = 0.5
+
+
+def segment_target_bone(source, target, action) -> None:
+    target.data.bones['bone_2'].bbone_segments = 2
+
+
+@pytest.mark.parametrize('change', [
+    lambda source, target, action: move_rest_bone(source),
+    lambda source, target, action: move_rest_bone(target),
+    add_autoprop,
+    add_action_autoprop,
+    change_bake_settings,
+    change_frame_range,
+    add_object_curve,
+    add_target_property,
+    segment_target_bone,
+], ids=['source rest', 'target rest', 'autoprop', 'action autoprop', 'bake settings', 'frame range', 'object curve',
+        'target property', 'target B-Bone'])
+def test_changed_inputs_force_a_rebake(rig, change):
+    source, target, action = rig
+    assert bake(action)
+    assert not bake(action)
+
+    change(source, target, action)
+    assert bake(action)
+    assert not bake(action)
+
+
+def test_baked_curves_do_not_count_as_changes(rig):
+    source, target, action = rig
+    assert bake(action)
+
+    # Curves of the baked bones are the bake's own output.
+    fcurve = next(fcurve for fcurve in get_action_fcurves(action) if fcurve.data_path.startswith('pose.bones["bone_1"]'))
+    fcurve.keyframe_points[0].co[1] += 0.1
+    assert not bake(action)
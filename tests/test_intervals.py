@@ -0,0 +1,117 @@
+from math import ceil
+
+import bpy
+import numpy as np
+import pytest
+
+from dlg_blender_addon.nla.intervals import (MaxTree, TrackIntervals, get_track_intervals,
+                                             invalidate_track_intervals)
+
+from conftest import add_strips
+
+
+def random_ranges(rng: np.random.Generator, count: int) -> list[tuple[int, float]]:
+    "Non-overlapping strips with whole start frames and fractional ends, some of them touching"
+    ranges = []
+    frame = int(rng.integers(-20, 20))
+    for _ in range(count):
+        start = frame + int(rng.integers(0, 8))
+        end = start + float(rng.choice([rng.integers(1, 12), rng.uniform(0.5, 12.0)]))
+        ranges.append((start, end))
+        frame = ceil(end)
+    return ranges
+
+
+def naive_overlapping(ranges, start: float, end: float) -> list[int]:
+    return [i for i, (strip_start, strip_end) in enumerate(ranges) if strip_start < end and strip_end > start]
+
+
+def naive_first_gap(ranges, length: float, after: float, margin: int) -> int:
+    "First whole frame checked one by one against every strip"
+    start = ceil(after)
+    while not all(start + length + margin <= strip_start or start >= ceil(strip_end) + margin
+                  for strip_start, strip_end in ranges):
+        start += 1
+    return start
+
+
+@pytest.mark.parametrize('seed', range(30))
+def test_queries_match_naive(scene, seed):
+    rng = np.random.default_rng(seed)
+    ranges = random_ranges(rng, int(rng.integers(0, 15)))
+    track = add_strips(scene, ranges)
+    intervals = TrackIntervals(track)
+
+    # Strips are created in time order, but the index must not depend on that.
+    ranges_by_index = [(strip.frame_start, strip.frame_end) for strip in track.strips]
+    low = ranges[0][0] - 10 if ranges else -10
+    high = ranges[-1][1] + 10 if ranges else 10
+
+    for _ in range(50):
+        start = float(rng.uniform(low, high))
+        end = start + float(rng.choice([0.0, rng.uniform(0.0, 20.0)]))
+        assert sorted(intervals.overlapping(start, end).tolist()) == naive_overlapping(ranges_by_index, start, end)
+        assert intervals.overlaps(start, end) == bool(naive_overlapping(ranges_by_index, start, end))
+
+        length = float(rng.choice([rng.integers(1, 15), rng.uniform(0.5, 15.0)]))
+        margin = int(rng.integers(0, 4))
+        assert intervals.first_gap(length, start, margin) == naive_first_gap(ranges_by_index, length, start, margin)
+
+
+def test_bounds(scene):
+    intervals = TrackIntervals(add_strips(scene, [(0, 10), (20, 30.5)]))
+    assert len(intervals) == 2
+    assert (intervals.start, intervals.end) == (0.0, 30.5)
+
+    empty = TrackIntervals(add_strips(scene, []))
+    assert (empty.start, empty.end) == (None, None)
+    assert empty.first_gap(10, 3.5, 2) == 4
+
+
+def test_touching_strips_do_not_overlap(scene):
+    intervals = TrackIntervals(add_strips(scene, [(0, 10), (20, 30)]))
+    assert not intervals.overlaps(10, 20)
+    assert intervals.overlapping(9.5, 20.5).tolist() == [0, 1]
+
+
+def test_max_tree_find_first():
+    values = np.array([3.0, 1.0, 7.0, 2.0, 7.0, 5.0])
+    tree = MaxTree(values)
+
+    for start in range(len(values) + 1):
+        for threshold in (0.0, 2.0, 5.0, 7.0, 8.0):
+            expected = next((i for i in range(start, len(values)) if values[i] >= threshold), -1)
+            assert tree.find_first(start, threshold) == expected
+
+
+def test_cache_reuses_intervals_until_strips_change(scene):
+    track = add_strips(scene, [(0, 10), (20, 30)])
+    intervals = get_track_intervals(track)
+    assert get_track_intervals(track) is intervals
+
+    # Adding a strip changes the count.
+    action = bpy.data.actions.new('added')
+    track.strips.new(action.name, 40, action)
+    added = get_track_intervals(track)
+    assert added is not intervals
+    assert added.end == track.strips[-1].frame_end
+
+    # Moving one keeps the count, the depsgraph update drops the cached intervals.
+    track.strips[0].frame_start_ui = 5
+    bpy.context.view_layer.update()
+    moved = get_track_intervals(track)
+    assert moved is not added
+    assert moved.start == 5.0
+
+    invalidate_track_intervals(track)
+    assert get_track_intervals(track) is not moved
+
+
+def test_cache_is_per_track(scene):
+    first, second = add_strips(scene, [(0, 10)]), add_strips(scene, [(0, 20)])
+    assert get_track_intervals(first).end == 10.0
+    assert get_track_intervals(second).end == 20.0
+
+    intervals = get_track_intervals(first)
+    invalidate_track_intervals()
+    assert get_track_intervals(first) is not intervals
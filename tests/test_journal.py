@@ -0,0 +1,136 @@
+import bpy
+import numpy as np
+
+from dlg_blender_addon.journal import KEYFRAME_ATTRIBUTES, ActionSnapshot, get_journal, read_keyframes
+from dlg_blender_addon.retarget.bake import get_action_fcurve_collections, get_action_fcurves
+
+BONE = 'pose.bones["bone"]'
+
+
+def make_action() -> bpy.types.Action:
+    "Action with one bone curve that uses non-default key, curve and modifier settings"
+    from bpy_extras.anim_utils import action_ensure_channelbag_for_slot
+
+    action = bpy.data.actions.new('snapshot')
+    slot = action.slots.new(id_type='OBJECT', name='rig')
+    fcurve = action_ensure_channelbag_for_slot(action, slot).fcurves.new(f'{BONE}.location', index=1, group_name='bone')
+
+    keyframe_points = fcurve.keyframe_points
+    for frame, value in ((0, 0.0), (10, 1.0), (20, -0.5)):
+        keyframe_points.insert(frame, value)
+
+    key = keyframe_points[1]
+    key.interpolation = 'BACK'
+    key.easing = 'EASE_OUT'
+    key.back = 2.5
+    key.amplitude = 0.3
+    key.period = 4.0
+    key.type = 'BREAKDOWN'
+    key.handle_left_type = 'FREE'
+    key.handle_left = (7.0, 3.0)
+
+    fcurve.extrapolation = 'LINEAR'
+    fcurve.mute = True
+    modifier = fcurve.modifiers.new('GENERATOR')
+    modifier.poly_order = 2
+    modifier.coefficients = (0.5, 1.0, -2.0)
+    modifier.use_additive = True
+    return action
+
+
+def describe(action: bpy.types.Action) -> list:
+    result = []
+    for fcurve in get_action_fcurves(action):
+        keys = read_keyframes(fcurve)
+        result.append((fcurve.data_path, fcurve.array_index, fcurve.group.name, fcurve.extrapolation, fcurve.mute,
+                       [(m.type, m.poly_order, tuple(m.coefficients[:3]), m.use_additive) for m in fcurve.modifiers],
+                       {attribute: keys[attribute].tolist() for attribute, _, _ in KEYFRAME_ATTRIBUTES}))
+    return result
+
+
+def test_restore_recreates_removed_curves(scene):
+    action = make_action()
+    before = describe(action)
+    snapshot = ActionSnapshot(action, {BONE})
+
+    fcurves = get_action_fcurve_collections(action)[0]
+    fcurves.remove(fcurves[0])
+    fcurves.new(f'{BONE}.rotation_quaternion', index=0)
+    snapshot.restore(action)
+
+    assert describe(action) == before
+
+
+def test_restore_writes_every_key_attribute(scene):
+    action = make_action()
+    before = describe(action)
+    snapshot = ActionSnapshot(action, {BONE})
+
+    fcurve = get_action_fcurves(action)[0]
+    fcurve.extrapolation = 'CONSTANT'
+    fcurve.keyframe_points.clear()
+    fcurve.keyframe_points.add(5)
+    fcurve.keyframe_points.foreach_set('co', np.arange(10, dtype=np.float32))
+    snapshot.restore(action)
+
+    assert describe(action) == before
+
+
+def bulk_retarget(target: bpy.types.Object, action: bpy.types.Action) -> None:
+    bpy.context.scene.dlg_props.bulk_mode = True
+    action.dlg_is_selected = True
+
+    with bpy.context.temp_override(object=target, active_object=target):
+        assert bpy.ops.dlg_retarget.actions_retarget() == {'FINISHED'}
+
+
+def test_revert_operator_restores_bulk_retarget(rig):
+    source, target, action = rig
+    before = describe(action)
+
+    bulk_retarget(target, action)
+    assert get_journal()
+    assert describe(action) != before
+
+    assert bpy.ops.dlg.bulk_revert() == {'FINISHED'}
+    assert describe(action) == before
+    assert not get_journal()
+    assert not bpy.ops.dlg.bulk_revert.poll()
+
+
+def test_revert_reports_removed_actions(rig):
+    source, target, action = rig
+    bulk_retarget(target, action)
+
+    name = action.name
+    bpy.data.actions.remove(action)
+    assert get_journal().revert() == [name]
+
+
+def test_bulk_mode_refuses_stream_removal(rig, tmp_path):
+    source, target, action = rig
+    pg = bpy.context.scene.dlg_props
+    pg.bulk_mode = True
+    pg.stream_output = True
+    pg.stream_directory = str(tmp_path)
+
+    with bpy.context.temp_override(object=target, active_object=target):
+        assert bpy.ops.dlg_retarget.actions_retarget.poll()
+        pg.stream_remove_actions = True
+        assert not bpy.ops.dlg_retarget.actions_retarget.poll()
+
+
+def test_undo_and_redo_clear_the_journal(rig):
+    source, target, action = rig
+    bpy.ops.ed.undo_push(message='Before')
+    bulk_retarget(target, action)
+    bpy.ops.ed.undo_push(message='Retarget')
+    assert get_journal()
+
+    # The journal recorded the retarget, which undo just took back.
+    assert bpy.ops.ed.undo() == {'FINISHED'}
+    assert not get_journal()
+
+    get_journal().begin('Recorded after the undo')
+    assert bpy.ops.ed.redo() == {'FINISHED'}
+    assert not get_journal()
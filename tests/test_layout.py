@@ -0,0 +1,64 @@
+import pytest
+
+from dlg_blender_addon.nla.intervals import TrackIntervals
+from dlg_blender_addon.nla.layout import LayoutError, get_block_offsets, plan_strip_starts
+
+from conftest import add_strips
+
+
+def plan(scene, ranges, durations, current_frame, gap_frames, placement) -> list[int]:
+    intervals = TrackIntervals(add_strips(scene, ranges))
+    return plan_strip_starts(durations, intervals, current_frame, gap_frames, placement)
+
+
+def test_block_offsets_round_fractional_ends_up():
+    offsets, length = get_block_offsets([2.5, 2.5, 2.5], 0)
+    assert offsets == [0, 3, 6]
+    assert length == 8.5
+
+    offsets, length = get_block_offsets([10.2, 4.0], 2)
+    assert offsets == [0, 13]
+    assert length == 17.0
+
+    assert get_block_offsets([], 2) == ([], 0.0)
+
+
+def test_current_frame(scene):
+    assert plan(scene, [(0, 10)], [5, 5.5, 5], 20, 1, 'CURRENT_FRAME') == [20, 26, 33]
+
+
+def test_current_frame_refuses_overlaps(scene):
+    # The first strip fits before the second existing one, the next does not.
+    with pytest.raises(LayoutError, match='frame 18'):
+        plan(scene, [(0, 10), (20, 30)], [5, 5], 12, 1, 'CURRENT_FRAME')
+
+
+def test_track_end(scene):
+    assert plan(scene, [(0, 10), (20, 30.5)], [5, 5], 0, 2, 'TRACK_END') == [33, 40]
+
+
+def test_track_end_of_empty_track_is_current_frame(scene):
+    assert plan(scene, [], [5, 5], 7, 2, 'TRACK_END') == [7, 14]
+
+
+@pytest.mark.parametrize('durations, current_frame, starts', [
+    # The whole block fits between the strips, `gap_frames` away from both.
+    ([5, 5], 0, [12, 19]),
+    ([5, 5], 15, [15, 22]),
+    # Too long for the gap, so it goes after the last strip.
+    ([10, 10], 0, [42, 54]),
+    # Past the gap already.
+    ([5, 5], 20, [42, 49]),
+])
+def test_first_gap(scene, durations, current_frame, starts):
+    assert plan(scene, [(0, 10), (30, 40)], durations, current_frame, 2, 'FIRST_GAP') == starts
+
+
+def test_first_gap_rounds_fractional_ends_up(scene):
+    assert plan(scene, [(0, 10.2), (30, 40)], [5], 0, 2, 'FIRST_GAP') == [13]
+    assert plan(scene, [(0, 10.2), (30, 40)], [2.5, 2.5], 0, 0, 'FIRST_GAP') == [11, 14]
+
+
+def test_unknown_placement(scene):
+    with pytest.raises(LayoutError, match='Unknown placement'):
+        plan(scene, [], [5], 0, 0, 'SOMEWHERE')
@@ -0,0 +1,63 @@
+import bpy
+
+from dlg_blender_addon.nla.markers import generate_markers, link_markers, sync_scene_markers
+from dlg_blender_addon.nla.operators import DLG_OT_markers_push_strips, DLG_OT_markers_push_tracks
+
+from conftest import add_strips
+
+
+def run_operator(idname: str, **override) -> None:
+    category, name = idname.split('.')
+    with bpy.context.temp_override(**override):
+        getattr(getattr(bpy.ops, category), name)()
+
+
+def test_replace_keeps_markers_between_strips(scene):
+    scene.dlg_props.marker_mode = 'REPLACE'
+    track = add_strips(scene, [(0, 10), (100, 110)])
+    scene.timeline_markers.new('gap', frame=50)
+    scene.timeline_markers.new('stale', frame=5)
+
+    run_operator(DLG_OT_markers_push_strips.bl_idname, selected_nla_strips=list(track.strips))
+
+    names = {marker.name for marker in scene.timeline_markers}
+    assert names == {'gap', 'strip_0', 'strip_1'}
+
+
+def test_replace_keeps_markers_between_track_strips(scene):
+    scene.dlg_props.marker_mode = 'REPLACE'
+    track = add_strips(scene, [(0, 10), (100, 110)])
+    scene.timeline_markers.new('gap', frame=50)
+    scene.timeline_markers.new('stale', frame=105)
+
+    track.select = True
+    run_operator(DLG_OT_markers_push_tracks.bl_idname, object=track.id_data)
+
+    names = {marker.name for marker in scene.timeline_markers}
+    assert names == {'gap', 'strip_0', 'strip_1'}
+
+
+def test_links_follow_renamed_object(scene):
+    track = add_strips(scene, [(0, 10)])
+    strips = [(strip, strip.frame_start) for strip in track.strips]
+    generate_markers(scene, strips)
+    link_markers(scene, strips)
+
+    track.id_data.name = 'Renamed'
+    track.strips[0].frame_start_ui = 20
+    stats = sync_scene_markers(scene)
+
+    assert stats.updated == 1
+    assert [(marker.name, marker.frame) for marker in scene.timeline_markers] == [('strip_0', 20)]
+
+
+def test_marker_names_use_synced_scene(scene):
+    other = bpy.data.scenes.new('Other')
+    other.dlg_props.marker_name_replace = 'strip'
+    other.dlg_props.marker_name_replace_with = 'clip'
+    track = add_strips(other, [(0, 10)])
+
+    generate_markers(other, [(strip, strip.frame_start) for strip in track.strips])
+
+    assert [marker.name for marker in other.timeline_markers] == ['clip_0']
+    assert not scene.timeline_markers
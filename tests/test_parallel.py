@@ -0,0 +1,100 @@
+import os
+
+import bpy
+import pytest
+
+from dlg_blender_addon.retarget import operators as retarget_ops
+from dlg_blender_addon.retarget.bake import get_action_fcurves
+from dlg_blender_addon.retarget.parallel import (ParallelRetargetError, merge_baked_actions,
+                                                 retarget_selected_actions_parallel, split_into_shards, stream_actions)
+from dlg_blender_addon.retarget.stream import ActionStream
+
+
+@pytest.mark.parametrize('count, shard_count, sizes', [
+    (10, 3, [4, 3, 3]),
+    (9, 3, [3, 3, 3]),
+    (2, 8, [1, 1]),
+    (5, 1, [5]),
+    (5, 0, [5]),
+])
+def test_split_into_shards(count, shard_count, sizes):
+    names = [f'action_{i}' for i in range(count)]
+    shards = split_into_shards(names, shard_count)
+
+    assert [len(shard) for shard in shards] == sizes
+    assert [name for shard in shards for name in shard] == names
+
+
+def make_action(name: str, value: float) -> bpy.types.Action:
+    from bpy_extras.anim_utils import action_ensure_channelbag_for_slot
+
+    action = bpy.data.actions.new(name)
+    slot = action.slots.new(id_type='OBJECT', name='rig')
+    fcurve = action_ensure_channelbag_for_slot(action, slot).fcurves.new('location', index=0)
+    fcurve.keyframe_points.insert(0, value)
+    return action
+
+
+def get_value(action: bpy.types.Action) -> float:
+    return get_action_fcurves(action)[0].keyframe_points[0].co[1]
+
+
+def test_merge_replaces_originals_in_place(scene, tmp_path):
+    library_path = str(tmp_path / 'shard.blend')
+    baked = [make_action(name, 1.0) for name in ('walk', 'run')]
+    bpy.data.libraries.write(library_path, set(baked), fake_user=True)
+
+    # The originals in the file, still holding the unbaked keys and used by an object.
+    for action in baked:
+        get_action_fcurves(action)[0].keyframe_points[0].co[1] = 0.0
+    baked[1].use_fake_user = True
+    user = bpy.data.objects.new('User', None)
+    user.animation_data_create().action = baked[0]
+
+    merged = merge_baked_actions(library_path, ['walk', 'run'])
+
+    assert [action.name for action in merged] == ['walk', 'run']
+    assert sorted(bpy.data.actions.keys()) == ['run', 'walk']
+    assert [get_value(action) for action in merged] == [1.0, 1.0]
+    assert user.animation_data.action == merged[0]
+    assert [action.use_fake_user for action in merged] == [False, True]
+
+
+def test_merge_rejects_missing_actions(scene, tmp_path):
+    library_path = str(tmp_path / 'shard.blend')
+    bpy.data.libraries.write(library_path, {make_action('walk', 1.0)}, fake_user=True)
+    make_action('run', 0.0)
+
+    with pytest.raises(ParallelRetargetError, match='missing 1 actions: run'):
+        merge_baked_actions(library_path, ['walk', 'run'])
+
+
+def test_stream_writes_baked_and_unwritten_skipped_actions(scene, tmp_path):
+    names = ['baked', 'skipped_written', 'skipped_new']
+    for name in names:
+        make_action(name, 0.0)
+
+    stream = ActionStream(str(tmp_path), remove_actions=False)
+    stream.write(bpy.data.actions['skipped_written'])
+    stream.written.clear()
+
+    stream_actions(stream, names, {'baked'})
+    assert stream.written == ['baked', 'skipped_new']
+
+
+def test_parallel_run_streams_unchanged_actions(rig, tmp_path):
+    source, target, action = rig
+    pg = bpy.context.scene.dlg_props
+    pg.skip_unchanged = True
+    action.dlg_is_selected = True
+    retarget_ops.retarget_selected_actions()
+
+    # Nothing changed since, so no worker runs, but the action has no stream file yet.
+    pg.stream_output = True
+    pg.stream_directory = str(tmp_path)
+    action.dlg_is_selected = True
+    with bpy.context.temp_override(object=target, active_object=target):
+        assert retarget_selected_actions_parallel(bpy.context, 2) == 0
+
+    assert os.listdir(tmp_path) == ['walk.blend']
+    assert retarget_ops.get_last_retarget_actions(bpy.context.scene) == [action]
@@ -0,0 +1,97 @@
+import os
+
+import bpy
+import numpy as np
+import pytest
+
+from dlg_blender_addon.retarget.bake import get_action_fcurves
+from dlg_blender_addon.retarget.posecache import SourcePoseCache
+
+from conftest import FRAME_END
+
+FRAMES = range(FRAME_END + 1)
+
+
+def evaluated_poses(source: bpy.types.Object, frames) -> np.ndarray:
+    scene = bpy.context.scene
+    poses = []
+    for frame in frames:
+        scene.frame_set(frame)
+        poses.append([np.array(pose_bone.matrix) for pose_bone in source.pose.bones])
+    return np.array(poses)
+
+
+def list_cache(directory) -> list[str]:
+    return sorted(os.listdir(directory))
+
+
+def test_miss_then_hit(rig, tmp_path):
+    source, target, action = rig
+    cache = SourcePoseCache(bpy.context.scene, source, str(tmp_path))
+
+    sampled = cache.get(action, FRAMES)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert len(list_cache(tmp_path)) == 1
+    np.testing.assert_allclose(sampled, evaluated_poses(source, FRAMES), atol=1e-6)
+
+    # Another cache on the same directory, like the next run or a retarget onto another rig.
+    cache = SourcePoseCache(bpy.context.scene, source, str(tmp_path))
+    assert np.array_equal(cache.get(action, FRAMES), sampled)
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_changed_source_curve_misses(rig, tmp_path):
+    source, target, action = rig
+    cache = SourcePoseCache(bpy.context.scene, source, str(tmp_path))
+    before = cache.get(action, FRAMES)
+
+    fcurve = next(fcurve for fcurve in get_action_fcurves(action) if fcurve.data_path.startswith('pose.bones["bone_1"]'))
+    fcurve.keyframe_points[1].co[1] += 0.2
+    fcurve.update()
+
+    after = cache.get(action, FRAMES)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert len(list_cache(tmp_path)) == 2
+    assert not np.allclose(after, before)
+
+
+def test_other_frames_miss(rig, tmp_path):
+    source, target, action = rig
+    cache = SourcePoseCache(bpy.context.scene, source, str(tmp_path))
+    cache.get(action, FRAMES)
+
+    frames = range(5, 10)
+    np.testing.assert_allclose(cache.get(action, frames), evaluated_poses(source, frames), atol=1e-6)
+    assert cache.misses == 2
+
+
+def test_unreadable_cache_is_sampled_again(rig, tmp_path):
+    source, target, action = rig
+    cache = SourcePoseCache(bpy.context.scene, source, str(tmp_path))
+    expected = cache.get(action, FRAMES)
+
+    (path,) = list_cache(tmp_path)
+    with open(tmp_path / path, 'wb') as file:
+        file.write(b'truncated')
+
+    assert np.array_equal(cache.get(action, FRAMES), expected)
+    assert cache.misses == 2
+
+
+def test_failed_save_keeps_the_previous_file(rig, tmp_path, monkeypatch):
+    source, target, action = rig
+    cache = SourcePoseCache(bpy.context.scene, source, str(tmp_path))
+    cache.get(action, FRAMES)
+    (path,) = list_cache(tmp_path)
+    contents = (tmp_path / path).read_bytes()
+
+    def fail(file, **arrays):
+        file.write(b'partial')
+        raise OSError('disk full')
+
+    monkeypatch.setattr(np, 'savez', fail)
+    with pytest.raises(OSError):
+        cache.save(str(tmp_path / path), np.asarray(FRAMES), np.zeros((len(FRAMES), 1, 3, 4)))
+
+    assert list_cache(tmp_path) == [path]
+    assert (tmp_path / path).read_bytes() == contents
@@ -0,0 +1,209 @@
+import bpy
+import numpy as np
+import pytest
+from mathutils import Matrix, Quaternion
+
+from dlg_blender_addon.psa.exporter import export_psa
+from dlg_blender_addon.psa.importer import import_psa
+from dlg_blender_addon.psa.reader import BONE, KEY, SEQUENCE, WXYZ, XYZW, PsaReader
+from dlg_blender_addon.psa.writer import PsaWriter, encode_name
+from dlg_blender_addon.retarget.bake import get_action_fcurves
+
+# Bone, parent, deforms. The control bone between two deform bones is left out of deform-only exports.
+BONES = (
+    ('root', None, True),
+    ('spine', 'root', True),
+    ('control', 'spine', False),
+    ('arm', 'control', True),
+    ('hand', 'arm', True),
+)
+
+FRAMES = range(0, 9)
+
+
+def build_armature(scene: bpy.types.Scene) -> bpy.types.Object:
+    armature = bpy.data.armatures.new('Rig')
+    armature_obj = bpy.data.objects.new('Rig', armature)
+    scene.collection.objects.link(armature_obj)
+    bpy.context.view_layer.objects.active = armature_obj
+
+    bpy.ops.object.mode_set(mode='EDIT')
+    for i, (name, parent, deform) in enumerate(BONES):
+        edit_bone = armature.edit_bones.new(name)
+        edit_bone.head = (0.1 * i, 0.05 * i * i, 0.3 * i)
+        edit_bone.tail = (0.1 * i + 0.2, 0.05 * i * i - 0.1, 0.3 * i + 0.25)
+        edit_bone.roll = 0.4 * i
+        edit_bone.use_deform = deform
+        if parent is not None:
+            edit_bone.parent = armature.edit_bones[parent]
+    bpy.ops.object.mode_set(mode='OBJECT')
+
+    return armature_obj
+
+
+def animate(armature_obj: bpy.types.Object) -> bpy.types.Action:
+    "Keys every bone, the control bone included, with rotations and translations off the rest pose"
+    armature_obj.animation_data_create()
+    rng = np.random.default_rng(0)
+
+    for frame in FRAMES:
+        for pose_bone in armature_obj.pose.bones:
+            pose_bone.rotation_mode = 'QUATERNION'
+            axis = rng.normal(size=3)
+            pose_bone.rotation_quaternion = Quaternion(axis / np.linalg.norm(axis), rng.uniform(-1.0, 1.0))
+            pose_bone.location = rng.uniform(-0.2, 0.2, size=3)
+            pose_bone.keyframe_insert('rotation_quaternion', frame=frame)
+            pose_bone.keyframe_insert('location', frame=frame)
+
+    return armature_obj.animation_data.action
+
+
+def get_pose_matrices(scene: bpy.types.Scene, armature_obj: bpy.types.Object, names) -> np.ndarray:
+    matrices = []
+    for frame in FRAMES:
+        scene.frame_set(frame)
+        matrices.append([np.array(armature_obj.pose.bones[name].matrix) for name in names])
+    return np.array(matrices)
+
+
+def get_deform_names() -> list[str]:
+    return [name for name, _, deform in BONES if deform]
+
+
+@pytest.fixture
+def exported(scene, tmp_path):
+    armature_obj = build_armature(scene)
+    action = animate(armature_obj)
+    action.name = 'Wave'
+
+    filepath = str(tmp_path / 'wave.psa')
+    export_psa(filepath, armature_obj, [action], deform_only=True)
+
+    return armature_obj, action, filepath
+
+
+def test_export_keys_are_relative_to_exported_parents(scene, exported):
+    armature_obj, _, filepath = exported
+    names = get_deform_names()
+    pose = get_pose_matrices(scene, armature_obj, names)
+
+    with PsaReader(filepath) as psa:
+        assert psa.bone_names == names
+        # The arm hangs off the spine, skipping the control bone that was left out.
+        assert list(psa.bones['parent_index']) == [0, 0, 1, 2]
+
+        keys = psa.get_sequence_keys(0)
+        key_rotations = keys['rotation'][..., WXYZ].astype(np.float64)
+        key_locations = keys['location'].astype(np.float64)
+
+    for b, name in enumerate(names):
+        parent = {'spine': 'root', 'arm': 'spine', 'hand': 'arm'}.get(name)
+        for f in range(len(FRAMES)):
+            if parent is None:
+                # Roots are stored in armature space.
+                expected = Matrix(pose[f, b])
+                rotation = Quaternion(key_rotations[f, b])
+            else:
+                # Children are stored in the space of their parent, with conjugated rotations.
+                expected = Matrix(np.linalg.inv(pose[f, names.index(parent)]) @ pose[f, b])
+                rotation = Quaternion(key_rotations[f, b]).conjugated()
+
+            assert rotation.rotation_difference(expected.to_quaternion()).angle == pytest.approx(0.0, abs=1e-3)
+            assert np.allclose(key_locations[f, b], expected.translation, atol=1e-4)
+
+
+def test_export_import_round_trip(scene, exported):
+    armature_obj, action, filepath = exported
+    names = get_deform_names()
+    expected = get_pose_matrices(scene, armature_obj, names)
+
+    action.name = 'Wave.original'
+    scene.dlg_props.source_armature = armature_obj
+
+    result = import_psa(filepath, armature_obj)
+    assert [imported.name for imported in result.actions] == ['Wave']
+
+    armature_obj.animation_data.action = result.actions[0]
+    # The control bone is not in the file and stays at rest.
+    armature_obj.pose.bones['control'].matrix_basis = Matrix.Identity(4)
+
+    assert np.allclose(get_pose_matrices(scene, armature_obj, names), expected, atol=1e-4)
+
+
+def write_psa(filepath: str, names, parents, sequences: dict[str, np.ndarray]) -> None:
+    "PSA file keyed from (frames, bones, 4, 4) armature-space pose matrices per sequence name"
+    bones = np.zeros(len(names), dtype=BONE)
+    for b, name in enumerate(names):
+        bones['name'][b] = encode_name(name)
+        bones['parent_index'][b] = max(parents[b], 0)
+
+    psa_sequences = np.zeros(len(sequences), dtype=SEQUENCE)
+    first_frame = 0
+    for s, (name, pose) in enumerate(sequences.items()):
+        psa_sequences['name'][s] = encode_name(name)
+        psa_sequences['bone_count'][s] = len(names)
+        psa_sequences['fps'][s] = bpy.context.scene.render.fps
+        psa_sequences['first_frame'][s] = first_frame
+        psa_sequences['frame_count'][s] = len(pose)
+        first_frame += len(pose)
+
+    with PsaWriter(filepath, bones, psa_sequences) as writer:
+        for pose in sequences.values():
+            keys = np.zeros(pose.shape[:2], dtype=KEY)
+
+            for b in range(len(names)):
+                for f in range(len(pose)):
+                    if parents[b] < 0:
+                        local = Matrix(pose[f, b])
+                        rotation = local.to_quaternion()
+                    else:
+                        local = Matrix(np.linalg.inv(pose[f, parents[b]]) @ pose[f, b])
+                        rotation = local.to_quaternion().conjugated()
+                    keys['rotation'][f, b] = np.array(rotation)[XYZW]
+                    keys['location'][f, b] = local.translation
+
+            writer.write_keys(keys.ravel())
+
+
+def get_parents() -> list[int]:
+    names = [name for name, _, _ in BONES]
+    return [names.index(parent) if parent else -1 for _, parent, _ in BONES]
+
+
+def test_import_matches_psa_convention(scene, tmp_path):
+    armature_obj = build_armature(scene)
+    animate(armature_obj)
+    names = [name for name, _, _ in BONES]
+    expected = get_pose_matrices(scene, armature_obj, names)
+
+    filepath = str(tmp_path / 'wave.psa')
+    write_psa(filepath, names, get_parents(), {'Wave': expected})
+
+    armature_obj.animation_data.action.name = 'Wave.original'
+    result = import_psa(filepath, armature_obj)
+    armature_obj.animation_data.action = result.actions[0]
+
+    assert np.allclose(get_pose_matrices(scene, armature_obj, names), expected, atol=1e-4)
+
+
+def test_import_sequences(scene, tmp_path):
+    "Sequences of the same length share curve layouts, replaced actions keep their identity"
+    armature_obj = build_armature(scene)
+    animate(armature_obj)
+    names = [name for name, _, _ in BONES]
+    pose = get_pose_matrices(scene, armature_obj, names)
+    sequences = {'Forward': pose, 'Backward': pose[::-1], 'Short': pose[:5], 'Again': pose}
+
+    filepath = str(tmp_path / 'sequences.psa')
+    write_psa(filepath, names, get_parents(), sequences)
+
+    armature_obj.animation_data.action.name = 'Original'
+    first = import_psa(filepath, armature_obj).actions
+    second = import_psa(filepath, armature_obj, replace_existing=True).actions
+    assert [action.name for action in first] == list(sequences)
+    assert second == first
+
+    for action, expected in zip(second, sequences.values()):
+        armature_obj.animation_data.action = action
+        assert all(key.interpolation == 'LINEAR' for fcurve in get_action_fcurves(action) for key in fcurve.keyframe_points)
+        assert np.allclose(get_pose_matrices(scene, armature_obj, names)[:len(expected)], expected, atol=1e-4)
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from dlg_blender_addon.psa.reader import BONE, KEY, SEQUENCE, PsaError, PsaReader
+from dlg_blender_addon.psa.writer import PsaWriter, encode_name
+
+BONE_COUNT = 3
+FRAME_COUNTS = (4, 6)
+
+
+def write_file(filepath: str, first_frames=None) -> None:
+    bones = np.zeros(BONE_COUNT, dtype=BONE)
+    for b in range(BONE_COUNT):
+        bones['name'][b] = encode_name(f'bone_{b}')
+
+    sequences = np.zeros(len(FRAME_COUNTS), dtype=SEQUENCE)
+    sequences['frame_count'] = FRAME_COUNTS
+    sequences['first_frame'] = first_frames if first_frames is not None else np.cumsum((0,) + FRAME_COUNTS[:-1])
+    for s in range(len(FRAME_COUNTS)):
+        sequences['name'][s] = encode_name(f'sequence_{s}')
+
+    keys = np.zeros(sum(FRAME_COUNTS) * BONE_COUNT, dtype=KEY)
+    keys['time'] = np.arange(len(keys))
+
+    with PsaWriter(filepath, bones, sequences) as writer:
+        writer.write_keys(keys)
+
+
+def test_read(tmp_path):
+    filepath = str(tmp_path / 'valid.psa')
+    write_file(filepath)
+
+    with PsaReader(filepath) as psa:
+        assert psa.bone_names == ['bone_0', 'bone_1', 'bone_2']
+        assert psa.sequence_names == ['sequence_0', 'sequence_1']
+        assert psa.get_sequence_keys(1).shape == (6, BONE_COUNT)
+        assert psa.get_sequence_keys(1)['time'][0, 0] == 4 * BONE_COUNT
+
+
+def test_truncated_file(tmp_path):
+    filepath = tmp_path / 'truncated.psa'
+    write_file(str(filepath))
+    filepath.write_bytes(filepath.read_bytes()[:-10])
+
+    with pytest.raises(PsaError, match='past the end'):
+        PsaReader(str(filepath))
+
+
+def test_empty_file(tmp_path):
+    filepath = tmp_path / 'empty.psa'
+    filepath.write_bytes(b'')
+
+    with pytest.raises(PsaError):
+        PsaReader(str(filepath))
+
+
+@pytest.mark.parametrize('first_frames', [(0, 5), (-1, 4), (0, 10)])
+def test_sequence_outside_keys(tmp_path, first_frames):
+    filepath = str(tmp_path / 'sequences.psa')
+    write_file(filepath, first_frames)
+
+    with pytest.raises(PsaError, match='sequence_'):
+        PsaReader(filepath)
+
+
+def test_negative_chunk_size(tmp_path):
+    filepath = tmp_path / 'negative.psa'
+    write_file(str(filepath))
+    data = bytearray(filepath.read_bytes())
+    # data_count of the bone chunk, which follows the empty header chunk.
+    offset = 32 + 28
+    data[offset:offset + 4] = np.int32(-1).tobytes()
+    filepath.write_bytes(bytes(data))
+
+    with pytest.raises(PsaError, match='negative'):
+        PsaReader(str(filepath))
@@ -0,0 +1,148 @@
+import bpy
+import numpy as np
+import pytest
+
+from dlg_blender_addon.retarget.bake import euler_to_matrix, matrix_to_quaternion, write_fcurve
+from dlg_blender_addon.retarget.reduce import CurveReducer, ReductionStats, reduce_keys
+
+TOLERANCE = 1e-3
+
+
+def reconstruct(frames: np.ndarray, values: np.ndarray, keep: np.ndarray) -> np.ndarray:
+    "Values of the reduced curve at every frame, with linear interpolation between the kept keys"
+    return np.interp(frames, frames[keep], values[keep])
+
+
+def test_straight_line_keeps_only_the_ends():
+    frames = np.arange(50, dtype=np.float64)
+    keep, error = reduce_keys(frames, 0.3 * frames - 2.0, TOLERANCE)
+
+    assert np.flatnonzero(keep).tolist() == [0, 49]
+    assert error == pytest.approx(0.0, abs=1e-12)
+
+
+def test_corners_are_kept():
+    frames = np.arange(31, dtype=np.float64)
+    values = np.interp(frames, [0, 10, 20, 30], [0.0, 1.0, -1.0, -1.0])
+    keep, error = reduce_keys(frames, values, TOLERANCE)
+
+    assert np.flatnonzero(keep).tolist() == [0, 10, 20, 30]
+
+
+def test_deviation_at_the_tolerance_is_dropped():
+    frames = np.arange(3, dtype=np.float64)
+
+    keep, error = reduce_keys(frames, np.array([0.0, TOLERANCE * 0.9, 0.0]), TOLERANCE)
+    assert keep.tolist() == [True, False, True]
+    assert error == pytest.approx(TOLERANCE * 0.9)
+
+    keep, error = reduce_keys(frames, np.array([0.0, TOLERANCE * 1.1, 0.0]), TOLERANCE)
+    assert keep.all()
+    assert error == 0.0
+
+
+@pytest.mark.parametrize('tolerance', [1e-2, 1e-3, 1e-4])
+def test_smooth_curve_error_stays_within_tolerance(tolerance):
+    frames = np.arange(200, dtype=np.float64)
+    values = np.sin(frames * 0.07) + 0.3 * np.sin(frames * 0.31)
+    keep, error = reduce_keys(frames, values, tolerance)
+
+    actual = np.abs(reconstruct(frames, values, keep) - values).max()
+    assert actual <= tolerance
+    assert error == pytest.approx(actual)
+    assert np.count_nonzero(keep) < len(frames)
+
+
+def test_tighter_tolerance_keeps_more_keys():
+    frames = np.arange(200, dtype=np.float64)
+    values = np.sin(frames * 0.05)
+    counts = [np.count_nonzero(reduce_keys(frames, values, tolerance)[0]) for tolerance in (1e-2, 1e-3, 1e-4)]
+
+    assert counts[0] < counts[1] < counts[2]
+
+
+def test_tolerance_per_channel():
+    reducer = CurveReducer(0.1, 0.2, 0.3)
+
+    assert reducer.get_tolerance('pose.bones["bone"].location') == 0.1
+    assert reducer.get_tolerance('pose.bones["bone"].rotation_quaternion') == 0.2
+    assert reducer.get_tolerance('pose.bones["bone"].rotation_euler') == 0.2
+    assert reducer.get_tolerance('pose.bones["bone"].rotation_axis_angle') == 0.2
+    assert reducer.get_tolerance('pose.bones["bone"].scale') == 0.3
+    assert reducer.get_tolerance('pose.bones["bone"]["scale"]') is None
+    assert reducer.get_tolerance('pose.bones["bone"].bbone_scalein') is None
+
+
+def test_channels_without_tolerance_keep_every_key():
+    reducer = CurveReducer(1.0, 1.0, 1.0)
+    stats = ReductionStats()
+    frames = np.arange(10, dtype=np.float64)
+
+    keep = reducer.reduce('pose.bones["bone"]["blend"]', frames, np.zeros(10), stats)
+    assert keep.all()
+    assert (stats.keys_before, stats.keys_after, stats.max_error) == (10, 10, 0.0)
+
+    keep = reducer.reduce('pose.bones["bone"].location', frames, np.zeros(10), stats)
+    assert np.count_nonzero(keep) == 2
+    assert (stats.keys_before, stats.keys_after) == (20, 12)
+
+
+def rotation_frames(count: int = 120) -> np.ndarray:
+    "Euler angles of a smooth rotation about all three axes"
+    t = np.arange(count, dtype=np.float64)[:, None]
+    return np.sin(t * np.array([0.05, 0.03, 0.08]) + np.array([0.0, 1.0, 2.0])) * np.array([1.2, 0.8, 2.0])
+
+
+def reduce_components(reducer: CurveReducer, data_path: str, values: np.ndarray) -> np.ndarray:
+    "Reduce each component as its own F-Curve, the way baked channels are, and sample the result at every frame"
+    frames = np.arange(len(values), dtype=np.float64)
+    stats = ReductionStats()
+    result = np.column_stack([reconstruct(frames, column, reducer.reduce(data_path, frames, column, stats))
+                              for column in values.T])
+
+    assert stats.keys_after < stats.keys_before
+    assert stats.max_error <= TOLERANCE
+    return result
+
+
+def test_euler_rotation_error_within_tolerance():
+    reducer = CurveReducer(1.0, TOLERANCE, 1.0)
+    euler = rotation_frames()
+    reduced = reduce_components(reducer, 'pose.bones["bone"].rotation_euler', euler)
+
+    assert np.abs(reduced - euler).max() <= TOLERANCE
+
+
+def test_quaternion_rotation_error_within_tolerance():
+    reducer = CurveReducer(1.0, TOLERANCE, 1.0)
+    quaternions = matrix_to_quaternion(euler_to_matrix(rotation_frames(), 'XYZ'))
+    reduced = reduce_components(reducer, 'pose.bones["bone"].rotation_quaternion', quaternions)
+
+    assert np.abs(reduced - quaternions).max() <= TOLERANCE
+
+    # Pose bones normalize quaternions. The rotation angle between them stays within a few tolerances.
+    reduced /= np.linalg.norm(reduced, axis=-1, keepdims=True)
+    angle = 2.0 * np.arccos(np.clip(np.abs(np.sum(reduced * quaternions, axis=-1)), 0.0, 1.0))
+    assert angle.max() <= 4.0 * TOLERANCE
+
+
+def test_reduce_fcurves_in_place(scene):
+    from bpy_extras.anim_utils import action_ensure_channelbag_for_slot
+
+    action = bpy.data.actions.new('reduce')
+    slot = action.slots.new(id_type='OBJECT', name='rig')
+    fcurves = action_ensure_channelbag_for_slot(action, slot).fcurves
+
+    frames = np.arange(100, dtype=np.float64)
+    values = np.sin(frames * 0.05)
+    location = fcurves.new('pose.bones["bone"].location', index=0)
+    custom = fcurves.new('pose.bones["bone"]["blend"]', index=0)
+    for fcurve in location, custom:
+        write_fcurve(fcurve, frames, values)
+
+    stats = CurveReducer(TOLERANCE, TOLERANCE, TOLERANCE).reduce_fcurves(fcurves)
+
+    assert len(custom.keyframe_points) == len(frames)
+    assert len(location.keyframe_points) == stats.keys_after < stats.keys_before == len(frames)
+    assert {key.interpolation for key in location.keyframe_points} == {'LINEAR'}
+    assert max(abs(location.evaluate(frame) - value) for frame, value in zip(frames, values)) <= TOLERANCE + 1e-6
@@ -0,0 +1,26 @@
+import re
+
+from dlg_blender_addon.nla.rename import get_unique_name, plan_renames
+
+
+class Strip:
+    "Stand-in with a name, planning does not touch Blender"
+    def __init__(self, name: str):
+        self.name = name
+
+
+def test_colliding_renames_get_lowest_free_suffixes():
+    strips = [Strip(f'walk_{i}') for i in range(50)]
+    names = {strip.name for strip in strips} | {'walk.002', 'walk.005'}
+
+    plan = plan_renames([(names, strips)], re.compile(r'_\d+$'), '')
+
+    taken = set(names) - {strip.name for strip in strips}
+    expected = []
+    for _ in strips:
+        name = get_unique_name('walk', taken) if 'walk' in taken else 'walk'
+        taken.add(name)
+        expected.append(name)
+
+    assert [entry.new_name for entry in plan.entries] == expected
+    assert plan.resolved == len(strips) - 1
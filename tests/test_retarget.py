@@ -0,0 +1,245 @@
+import bpy
+import pytest
+
+from types import SimpleNamespace
+
+from dlg_blender_addon.psa.reader import PsaReader
+from dlg_blender_addon.retarget import operators as retarget_ops
+from dlg_blender_addon.retarget.autoprop import AUTOPROP_PROPERTY, PropertyAutomation
+
+
+def add_bystander(scene: bpy.types.Scene) -> bpy.types.Object:
+    "Object the rigs do not depend on, which isolated evaluation hides"
+    bystander = bpy.data.objects.new('Bystander', bpy.data.meshes.new('Bystander'))
+    scene.collection.objects.link(bystander)
+    return bystander
+
+
+def test_session_restores_after_failed_setup(scene, rig, monkeypatch):
+    source, target, action = rig
+    track = target.animation_data.nla_tracks.new()
+    bystander = add_bystander(scene)
+    scene.dlg_props.isolate_evaluation = True
+
+    def fail(self):
+        raise RuntimeError('automation failed')
+
+    monkeypatch.setattr(PropertyAutomation, '__enter__', fail)
+
+    with pytest.raises(RuntimeError):
+        with retarget_ops.RetargetSession(bpy.context):
+            pass
+
+    assert not track.mute
+    assert not bystander.hide_viewport
+
+
+def test_session_restores_on_exit(scene, rig):
+    source, target, action = rig
+    track = target.animation_data.nla_tracks.new()
+    bystander = add_bystander(scene)
+    scene.dlg_props.isolate_evaluation = True
+
+    with retarget_ops.RetargetSession(bpy.context) as session:
+        assert track.mute
+        assert bystander.hide_viewport
+        session.bake_action(action)
+
+    assert not track.mute
+    assert not bystander.hide_viewport
+
+
+def test_automation_restores_after_failed_apply(scene, rig):
+    source, target, action = rig
+    applied, failing = target.pose.bones['bone_1'], target.pose.bones['bone_2']
+    for pose_bone in applied, failing:
+        pose_bone['ik_fk'] = 0.0
+        pose_bone[AUTOPROP_PROPERTY] = {'ik_fk': 1.0}
+
+    automation = PropertyAutomation(target)
+    # Not a value custom properties can hold, so setting it fails after the first bone is set.
+    automation.autoprops[failing.name]['ik_fk'] = object()
+
+    with pytest.raises(TypeError):
+        with automation:
+            pass
+
+    assert applied['ik_fk'] == 0.0
+    assert failing['ik_fk'] == 0.0
+    assert not automation.original_values
+
+
+def test_session_restores_every_view_layer(scene, rig):
+    source, target, action = rig
+    bystander = add_bystander(scene)
+    scene.dlg_props.isolate_evaluation = True
+
+    view_layer = bpy.context.view_layer
+    selected_layer = scene.view_layers.new('Selected')
+    hidden_layer = scene.view_layers.new('Hidden')
+    bystander.select_set(True, view_layer=view_layer)
+    bystander.select_set(True, view_layer=selected_layer)
+    bystander.hide_set(True, view_layer=hidden_layer)
+
+    with retarget_ops.RetargetSession(bpy.context) as session:
+        assert bystander.hide_viewport
+        session.bake_action(action)
+
+    assert not bystander.hide_viewport
+    assert bystander.select_get(view_layer=view_layer)
+    assert bystander.select_get(view_layer=selected_layer)
+    assert not bystander.select_get(view_layer=hidden_layer)
+    assert bystander.hide_get(view_layer=hidden_layer)
+    assert not bystander.hide_get(view_layer=selected_layer)
+
+
+def test_saved_time_counts_repeated_steps_only(scene, rig):
+    source, target, action = rig
+    actions = [action] + [action.copy() for _ in range(3)]
+
+    with retarget_ops.RetargetSession(bpy.context) as session:
+        for batch_action in actions:
+            session.bake_action(batch_action)
+
+    assert 0.0 < session.repeated_setup_time < session.setup_time
+    assert session.saved_time == pytest.approx(session.repeated_setup_time * (len(actions) - 1))
+
+
+def test_export_last_retarget(scene, rig, tmp_path):
+    source, target, action = rig
+    actions = [action, action.copy()]
+    bpy.data.actions.new('untouched')
+    for batch_action in actions:
+        batch_action.dlg_is_selected = True
+
+    retarget_ops.retarget_selected_actions()
+    assert not any(batch_action.dlg_is_selected for batch_action in actions)
+
+    filepath = str(tmp_path / 'last.psa')
+    with bpy.context.temp_override(object=target, active_object=target):
+        assert bpy.ops.dlg.psa_export(filepath=filepath, source='LAST_RETARGET') == {'FINISHED'}
+
+    with PsaReader(filepath) as psa:
+        assert psa.sequence_names == [batch_action.name for batch_action in actions]
+
+
+class ModalRetarget:
+    "The modal retarget operator's methods on a plain object, since only Blender can create registered operators"
+    operator = retarget_ops.DLG_OT_retarget_actions_apply
+    bl_label = operator.bl_label
+    invoke, modal, cancel, finish, execute, update_status = (operator.invoke, operator.modal, operator.cancel,
+                                                              operator.finish, operator.execute, operator.update_status)
+
+    def __init__(self):
+        self.reports: list[tuple[set[str], str]] = []
+
+    def report(self, type: set[str], message: str) -> None:
+        self.reports.append((type, message))
+
+
+class WindowManager:
+    def __init__(self):
+        self.handlers = []
+        self.timers = []
+
+    def modal_handler_add(self, operator) -> None:
+        self.handlers.append(operator)
+
+    def event_timer_add(self, time_step: float, window=None) -> object:
+        self.timers.append(object())
+        return self.timers[-1]
+
+    def event_timer_remove(self, timer: object) -> None:
+        self.timers.remove(timer)
+
+
+class Workspace:
+    status_text: str | None = None
+
+    def status_text_set(self, text: str | None) -> None:
+        self.status_text = text
+
+
+def modal_context(target: bpy.types.Object, window: bool = True) -> SimpleNamespace:
+    return SimpleNamespace(scene=bpy.context.scene, object=target, window=object() if window else None,
+                           window_manager=WindowManager(), workspace=Workspace())
+
+
+def make_event(type: str, ctrl: bool = False, shift: bool = False) -> SimpleNamespace:
+    return SimpleNamespace(type=type, value='PRESS', ctrl=ctrl, shift=shift, oskey=False)
+
+
+def select_batch(action: bpy.types.Action) -> list[bpy.types.Action]:
+    actions = [action, action.copy()]
+    for batch_action in actions:
+        batch_action.dlg_is_selected = True
+    return actions
+
+
+def test_modal_retarget_blocks_undo(scene, rig):
+    source, target, action = rig
+    actions = select_batch(action)
+    track = target.animation_data.nla_tracks.new()
+    context = modal_context(target)
+    operator = ModalRetarget()
+
+    assert operator.invoke(context, make_event('LEFTMOUSE')) == {'RUNNING_MODAL'}
+    assert track.mute
+    assert context.workspace.status_text.startswith('Retargeting 0/2')
+
+    assert operator.modal(context, make_event('Z', ctrl=True)) == {'RUNNING_MODAL'}
+    assert operator.modal(context, make_event('Z', ctrl=True, shift=True)) == {'RUNNING_MODAL'}
+    assert operator.modal(context, make_event('Z')) == {'PASS_THROUGH'}
+
+    results = [operator.modal(context, make_event('TIMER')) for _ in range(len(actions) + 1)]
+    assert results == [{'RUNNING_MODAL'}] * len(actions) + [{'FINISHED'}]
+
+    assert not track.mute
+    assert not context.window_manager.timers
+    assert context.workspace.status_text is None
+    assert not any(batch_action.dlg_is_selected for batch_action in actions)
+    assert operator.reports[-1][0] == {'INFO'}
+
+
+def test_modal_retarget_cancel_restores(scene, rig):
+    source, target, action = rig
+    actions = select_batch(action)
+    track = target.animation_data.nla_tracks.new()
+    context = modal_context(target)
+    operator = ModalRetarget()
+
+    operator.invoke(context, make_event('LEFTMOUSE'))
+    operator.modal(context, make_event('TIMER'))
+    operator.cancel(context)
+
+    assert not track.mute
+    assert not context.window_manager.timers
+    assert context.workspace.status_text is None
+    assert actions[1].dlg_is_selected
+    assert operator.reports[-1][0] == {'WARNING'}
+    assert 'Retargeted 1 of 2 actions (stopped)' in operator.reports[-1][1]
+
+
+def test_modal_retarget_cancel_after_rig_removed(scene, rig):
+    source, target, action = rig
+    select_batch(action)
+    context = modal_context(target)
+    operator = ModalRetarget()
+
+    operator.invoke(context, make_event('LEFTMOUSE'))
+    bpy.data.objects.remove(target)
+    operator.cancel(context)
+
+    assert not context.window_manager.timers
+    assert any('data was removed' in message for _, message in operator.reports)
+
+
+def test_modal_retarget_without_window_executes(scene, rig):
+    source, target, action = rig
+    actions = select_batch(action)
+    context = modal_context(target, window=False)
+    operator = ModalRetarget()
+
+    assert operator.invoke(context, make_event('LEFTMOUSE')) == {'FINISHED'}
+    assert not context.window_manager.handlers
+    assert not any(batch_action.dlg_is_selected for batch_action in actions)
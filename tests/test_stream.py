@@ -0,0 +1,20 @@
+import os
+
+import bpy
+
+from dlg_blender_addon.retarget.stream import ActionStream
+
+
+def test_colliding_file_names_get_suffixes(scene, tmp_path):
+    actions = [bpy.data.actions.new(name) for name in ('run/left', 'run_left', 'RUN_LEFT')]
+    stream = ActionStream(str(tmp_path), remove_actions=False)
+
+    paths = [stream.write(action) for action in actions]
+
+    assert len({path.casefold() for path in paths}) == len(actions)
+    assert stream.get_path(actions[0]) == paths[0]
+
+    for action, path in zip(actions, paths):
+        with bpy.data.libraries.load(path) as (data_from, data_to):
+            assert data_from.actions == [action.name]
+    assert sorted(os.listdir(tmp_path)) == sorted(os.path.basename(path) for path in paths)